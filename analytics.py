@@ -0,0 +1,143 @@
+import numpy as np
+
+SESSION_TYPES = ('work', 'short_break', 'long_break')
+SECONDS_PER_DAY = 86400
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+class SessionFrame:
+    """Session history held as NumPy columns for batched aggregation.
+
+    Columns: ``start`` (int64 seconds since the epoch, naive local time),
+    ``duration`` (int64 seconds), ``type`` (int8 index into SESSION_TYPES)
+    and ``user`` (int32 index into ``users``).
+    """
+
+    def __init__(self, start, duration, type_code, user_code, users):
+        self.start = start
+        self.duration = duration
+        self.type = type_code
+        self.user = user_code
+        self.users = users
+
+    @classmethod
+    def from_events(cls, events):
+        """Build a frame from session-log events."""
+        starts, durations, types, users = [], [], [], []
+        for event in events:
+            starts.append(event['start'])
+            durations.append(event['duration'])
+            types.append(event['type'])
+            users.append(event['user'])
+        user_names, user_code = np.unique(np.array(users, dtype=str), return_inverse=True)
+        type_lookup = {name: code for code, name in enumerate(SESSION_TYPES)}
+        return cls(
+            # NumPy parses ISO timestamps in one vectorized pass
+            np.array(starts, dtype='datetime64[s]').astype(np.int64),
+            np.array(durations, dtype=np.int64),
+            np.array([type_lookup.get(t, -1) for t in types], dtype=np.int8),
+            user_code.astype(np.int32),
+            list(user_names)
+        )
+
+    def __len__(self):
+        return len(self.start)
+
+    def _subset(self, mask):
+        return SessionFrame(self.start[mask], self.duration[mask], self.type[mask],
+                            self.user[mask], self.users)
+
+    def filter(self, user=None, session_type=None, start=None, end=None):
+        """Return the sessions matching every given condition.
+
+        ``start`` and ``end`` are ISO dates or datetimes; ``end`` is exclusive.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if user is not None:
+            if user not in self.users:
+                mask[:] = False
+            else:
+                mask &= self.user == self.users.index(user)
+        if session_type is not None:
+            mask &= self.type == SESSION_TYPES.index(session_type)
+        if start is not None:
+            mask &= self.start >= np.datetime64(start, 's').astype(np.int64)
+        if end is not None:
+            mask &= self.start < np.datetime64(end, 's').astype(np.int64)
+        return self._subset(mask)
+
+    @property
+    def minutes(self):
+        """Session durations in minutes."""
+        return self.duration / 60.0
+
+    @property
+    def day(self):
+        """Day number (days since the epoch) of every session."""
+        return self.start // SECONDS_PER_DAY
+
+    def _group(self, keys):
+        """Return (unique keys, session counts, minute totals)."""
+        unique, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(unique))
+        minutes = np.bincount(inverse, weights=self.minutes, minlength=len(unique))
+        return unique, counts, minutes
+
+    def by_day(self):
+        """Return (dates, sessions, minutes) for each day with sessions."""
+        days, counts, minutes = self._group(self.day)
+        return days.astype('datetime64[D]'), counts, minutes
+
+    def by_week(self):
+        """Return (week start dates, sessions, minutes), weeks starting on Monday."""
+        day = self.day
+        # 1970-01-01 was a Thursday, three days after a Monday
+        weeks, counts, minutes = self._group(day - (day + 3) % 7)
+        return weeks.astype('datetime64[D]'), counts, minutes
+
+    def by_hour(self):
+        """Return (sessions, minutes) arrays indexed by hour of day (0-23)."""
+        hour = (self.start % SECONDS_PER_DAY) // 3600
+        return (np.bincount(hour, minlength=24),
+                np.bincount(hour, weights=self.minutes, minlength=24))
+
+    def by_weekday(self):
+        """Return (sessions, minutes) arrays indexed by weekday (0 = Monday)."""
+        weekday = (self.day + 3) % 7
+        return (np.bincount(weekday, minlength=7),
+                np.bincount(weekday, weights=self.minutes, minlength=7))
+
+    def daily_series(self, end=None):
+        """Return (dates, minutes) for every day from the first to the last session.
+
+        ``end`` (an ISO date) extends the series with empty days up to it.
+        """
+        if not len(self):
+            return np.array([], dtype='datetime64[D]'), np.array([])
+        day = self.day
+        first = day.min()
+        last = day.max()
+        if end is not None:
+            last = max(last, np.datetime64(end, 'D').astype(np.int64))
+        minutes = np.bincount(day - first, weights=self.minutes, minlength=last - first + 1)
+        dates = np.arange(first, first + len(minutes)).astype('datetime64[D]')
+        return dates, minutes
+
+    def rolling(self, window=7, end=None):
+        """Return (dates, mean daily minutes over the trailing ``window`` days).
+
+        ``end`` is passed on to ``daily_series``.
+        """
+        dates, minutes = self.daily_series(end)
+        if not len(minutes):
+            return dates, minutes
+        cumulative = np.concatenate(([0.0], np.cumsum(minutes)))
+        lower = np.maximum(np.arange(1, len(minutes) + 1) - window, 0)
+        sums = cumulative[1:] - cumulative[lower]
+        return dates, sums / window
+
+    def percentiles(self, q=(50, 75, 90, 95, 99)):
+        """Return {percentile: session length in minutes}."""
+        if not len(self):
+            return {p: 0.0 for p in q}
+        return {p: float(v) for p, v in zip(q, np.percentile(self.minutes, q))}
@@ -0,0 +1,151 @@
+import heapq
+import itertools
+import os
+import select
+import sys
+import threading
+import time
+from keys import KeyReader
+
+ANIMATIONS = {
+    'growing': ['🌱', '🌿', '🌳', '🌲'],
+    'working': ['🌱', '🌿', '🌳', '🌲'],
+    'resting': ['💧', '💦', '🌊', '💧'],
+    'recharging': ['☀️', '🌤️', '⛅', '☀️']
+}
+
+
+class FrameScheduler:
+    """Plays animations and story reveals as timed frames on a background thread.
+
+    Callers queue frames and return at once; a worker thread prints each
+    frame when it is due, so the timer and menus keep running meanwhile.
+    Decorative frames (animations, pauses) are dropped when skipped, while
+    essential frames (story text) are printed at once, so skipping never
+    hides information. With animations disabled every call degrades to
+    printing the essential text immediately.
+    """
+
+    def __init__(self):
+        self.enabled = self._animations_allowed()
+        self._frames = []  # heap of (due, sequence, text, essential)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._tail = 0.0  # when the last queued frame is due
+        self._thread = None
+
+    @staticmethod
+    def _animations_allowed():
+        """False for scripted use: no terminal, or PRODOMO_NO_ANIMATION set."""
+        return sys.stdout.isatty() and not os.environ.get('PRODOMO_NO_ANIMATION')
+
+    def set_enabled(self, enabled):
+        """Turn animations on or off (they stay off when not allowed)."""
+        self.enabled = enabled and self._animations_allowed()
+        if not self.enabled:
+            self.skip()
+
+    def animate(self, animation_type, duration=0.5, repeat=2):
+        """Queue an animation; each cycle of frames takes ``duration`` seconds."""
+        frames = ANIMATIONS[animation_type]
+        interval = duration / len(frames)
+        self._queue([(f"\r{frame}", False, interval) for frame in frames] * repeat
+                    + [("\r", False, 0)])
+
+    def reveal(self, lines, interval=0.4):
+        """Queue lines of text to appear one after another."""
+        self._queue([(line + "\n", True, interval) for line in lines])
+
+    def print(self, *values, sep=' ', end='\n'):
+        """Print like ``print()``, but after any frames still queued.
+
+        Text that follows a reveal must go through here rather than
+        straight to stdout, or it would appear before the reveal finishes.
+        """
+        text = sep.join(str(value) for value in values) + end
+        with self._condition:
+            if self.enabled and (self._frames or self._tail > time.monotonic()):
+                self._queue([(text, True, 0)])
+                return
+        print(text, end="", flush=True)
+
+    def hold(self, seconds):
+        """Queue a pause before whatever is queued next."""
+        self._queue([("", False, seconds)])
+
+    def _queue(self, frames):
+        """Schedule (text, essential, delay after) frames after those already queued."""
+        if not self.enabled:
+            print(''.join(text for text, essential, _ in frames if essential), end="", flush=True)
+            return
+        with self._condition:
+            due = max(self._tail, time.monotonic())
+            for text, essential, delay in frames:
+                heapq.heappush(self._frames, (due, next(self._sequence), text, essential))
+                due += delay
+            self._tail = due
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _run(self):
+        """Print frames as they become due."""
+        with self._condition:
+            while True:
+                if not self._frames:
+                    self._condition.wait()
+                    continue
+                delay = self._frames[0][0] - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                _, _, text, _ = heapq.heappop(self._frames)
+                print(text, end="", flush=True)
+                if not self._frames:
+                    self._condition.notify_all()
+
+    @property
+    def busy(self):
+        """True while frames are queued or a trailing pause is running."""
+        with self._condition:
+            return bool(self._frames) or self._tail > time.monotonic()
+
+    def skip(self):
+        """Drop pending decorative frames and print pending text right away."""
+        with self._condition:
+            pending = sorted(self._frames)
+            self._frames = []
+            self._tail = 0.0
+            text = ''.join(frame[2] for frame in pending if frame[3])
+            if pending:
+                # Leave the cursor at the start of a clean line after an animation
+                print("\r" + text, end="", flush=True)
+            self._condition.notify_all()
+
+    def wait(self):
+        """Block until queued frames have played; a key press skips the rest."""
+        if not self.busy:
+            return
+        if not sys.stdin.isatty():
+            # Keep piped input for the prompts that follow
+            while self.busy:
+                time.sleep(max(0.0, self._tail - time.monotonic()))
+            return
+        with KeyReader() as keys:
+            fd = keys.fileno()
+            while self.busy:
+                remaining = max(0.0, self._tail - time.monotonic())
+                if fd is None:
+                    pressed = keys.read_keys()
+                    time.sleep(min(remaining, 0.05))
+                else:
+                    ready, _, _ = select.select([fd], [], [], remaining)
+                    pressed = keys.read_keys() if ready else ''
+                if pressed:
+                    self.skip()
+
+
+# Shared by the UI, the timer and the app so frames never interleave; text
+# printed right after queued frames goes through frames.print()
+frames = FrameScheduler()
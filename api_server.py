@@ -0,0 +1,361 @@
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from animation import frames
+from config import Config
+from locking import lock_stats
+from planner import parse_due, parse_estimate, parse_priority
+from scheduler import TimerScheduler, stats_recorder
+from session_runtime import PHASES, credited_minutes
+from stats import Statistics
+from storage import open_storage
+from task import TaskManager
+from ui import UI
+from user_data import UserData
+
+_USER = r'/users/(?P<username>[^/]+)'
+_TASK = _USER + r'/tasks/(?P<task_id>\d+)'
+
+# (method, path pattern, ProdomoAPI method)
+ROUTES = [
+    ('GET', _USER, 'get_profile'),
+    ('POST', _USER, 'create_user'),
+    ('GET', _USER + '/achievements', 'get_achievements'),
+    ('GET', _USER + '/tasks', 'get_tasks'),
+    ('POST', _USER + '/tasks', 'add_task'),
+    ('POST', _TASK + '/complete', 'complete_task'),
+    ('DELETE', _TASK, 'delete_task'),
+    ('GET', _USER + '/stats', 'get_stats'),
+    ('POST', _USER + '/sessions', 'record_session'),
+    ('GET', _USER + '/timer', 'get_timer'),
+    ('POST', _USER + '/timer', 'start_timer'),
+    ('POST', _USER + '/timer/pause', 'pause_timer'),
+    ('POST', _USER + '/timer/resume', 'resume_timer'),
+    ('POST', _USER + '/timer/stop', 'stop_timer'),
+]
+
+
+class ProdomoAPI:
+    """JSON over HTTP access to every user's tasks, profile and statistics.
+
+    Requests are served on threads, but all of them go through one lock
+    into a single set of managers, so the stores only ever see one caller
+    at a time. A user's ETag combines the changes made through the API
+    with the stores' on-disk versions, so it also changes when the CLI or
+    the daemon saves their data. GET responses carry it and are cached as
+    encoded bytes per URL, so a client polling with If-None-Match gets a
+    304 and an unchanged resource is never serialized twice.
+
+    Every user can also run a session timer on the server. All of them
+    are driven by one TimerScheduler thread, which credits a timer that
+    runs out to its user under the same lock.
+    """
+
+    def __init__(self, host=None, port=None, storage_backend=None):
+        ui = UI()
+        self.config = Config(ui)
+        frames.set_enabled(False)  # Nobody is watching the server's terminal
+        self.host = host or self.config.config['api_host']
+        self.port = self.config.config['api_port'] if port is None else port
+        self.storage = open_storage(storage_backend or self.config.config['storage_backend'])
+        self.user_data = UserData(self.storage.users)
+        self.task_manager = TaskManager(self.user_data, self.storage.tasks,
+                                        self.config.config['task_archive_days'], ui)
+        self.stats = Statistics(self.storage.stats, self.storage.sessions,
+                                self.config.config['stats_retention_days'], ui)
+        self.routes = [(method, re.compile(pattern), getattr(self, name))
+                       for method, pattern, name in ROUTES]
+        self._lock = threading.RLock()
+        # ETags from an earlier run must not match, as versions restart at 0
+        self._boot = format(time.time_ns(), 'x')
+        self._versions = {}  # username -> changes made through the API
+        self._disk_versions = {}  # username -> store version the cached profile was read at
+        self._cache = {}  # (path, status filter) -> (etag, encoded body)
+        self.scheduler = TimerScheduler(on_complete=self._timer_completed)
+        self._credit_session = stats_recorder(self.user_data, self.stats)
+
+    def serve_forever(self):
+        """Serve requests until interrupted."""
+        server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        server.daemon_threads = True
+        server.api = self
+        print(f"Prodomo API listening on http://{self.host}:{server.server_port}")
+        self.scheduler.start_thread()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.scheduler.close()
+            self.user_data.flush()
+            self.task_manager.close()
+            self.storage.close()
+            for line in lock_stats.report():
+                print("Storage contention: " + line)
+
+    def handle(self, method, target, body=b'', if_none_match=None):
+        """Answer one request; return (status, headers, body bytes)."""
+        url = urlsplit(target)
+        allowed = []
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(url.path)
+            if match:
+                allowed.append(route_method)
+                if route_method == method:
+                    break
+        else:
+            if allowed:
+                return 405, {'Allow': ', '.join(allowed)}, self._error("method not allowed")
+            return 404, {}, self._error(f"no such resource: {url.path}")
+        params = {key: unquote(value) for key, value in match.groupdict().items()}
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if method == 'GET':
+                key = (url.path, query.get('status'))
+                return self._get(handler, params, query, key, if_none_match)
+            try:
+                request = json.loads(body) if body else {}
+            except json.JSONDecodeError:
+                raise ValueError("the request body must be JSON")
+            if not isinstance(request, dict):
+                raise ValueError("the request body must be a JSON object")
+            with self._lock:
+                try:
+                    status, result = handler(params, request)
+                    return status, {}, self._encode({'ok': True, **result})
+                finally:
+                    username = params['username']
+                    self._versions[username] = self._versions.get(username, 0) + 1
+        except LookupError as e:
+            return 404, {}, self._error(e.args[0])
+        except ValueError as e:
+            return 400, {}, self._error(str(e))
+
+    def _etag(self, username):
+        """Return a user's ETag; call with the lock held."""
+        version = self.storage.data_version(username)
+        if self._disk_versions.get(username) != version:
+            # Saved elsewhere, e.g. by the CLI or the daemon: reload the profile
+            self.user_data.refresh(username)
+            version = self._disk_versions[username] = self.storage.data_version(username)
+        return f'"{self._boot}-{self._versions.get(username, 0)}-{version}"'
+
+    def _get(self, handler, params, query, key, if_none_match):
+        """Answer a GET from the cache when the user's data has not changed."""
+        with self._lock:
+            # Unknown users are a 404 whatever the preconditions say
+            self._user(params['username'])
+            etag = self._etag(params['username'])
+            if if_none_match and (if_none_match.strip() == '*' or
+                                  etag in (tag.strip() for tag in if_none_match.split(','))):
+                return 304, {'ETag': etag}, b''
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == etag:
+                return 200, {'ETag': etag}, cached[1]
+            # Encoded under the lock: the result may reference live store data
+            payload = self._encode({'ok': True, **handler(params, query)})
+            self._cache[key] = (etag, payload)
+        return 200, {'ETag': etag}, payload
+
+    @staticmethod
+    def _encode(document):
+        return json.dumps(document, separators=(',', ':')).encode()
+
+    def _error(self, message):
+        return self._encode({'ok': False, 'error': message})
+
+    def _user(self, username):
+        """Return an existing user's profile."""
+        profile = self.user_data.get_user(username)
+        if profile is None:
+            raise LookupError(f"no user named {username}")
+        return profile
+
+    def _task(self, username, task_id):
+        task = self.task_manager.store.find(username, int(task_id))
+        if task is None:
+            raise LookupError(f"no task with id {task_id}")
+        return task
+
+    def get_profile(self, params, query):
+        username = params['username']
+        profile = self._user(username)
+        return {'user': username, 'profile': profile,
+                'next_level_xp': profile['level'] * 100 - profile['experience']}
+
+    def create_user(self, params, request):
+        existed = self.user_data.get_user(params['username']) is not None
+        profile = self.user_data.get_user(params['username'], create=True)
+        return (200 if existed else 201), {'user': params['username'], 'profile': profile}
+
+    def get_achievements(self, params, query):
+        unlocked = self._user(params['username'])['achievements']
+        return {'achievements': [
+            {'id': achievement_id, 'name': achievement['name'],
+             'description': achievement['description'],
+             'unlocked': achievement_id in unlocked,
+             'unlocked_at': unlocked.get(achievement_id, {}).get('unlocked_at')}
+            for achievement_id, achievement in self.user_data.achievements.items()]}
+
+    def get_tasks(self, params, query):
+        username = params['username']
+        self._user(username)
+        status = query.get('status', 'all')
+        listing = {'all': self.task_manager.get_user_tasks,
+                   'active': self.task_manager.get_active_tasks,
+                   'completed': self.task_manager.get_completed_tasks}
+        if status not in listing:
+            raise ValueError(f"status must be one of: {', '.join(listing)}")
+        return {'tasks': listing[status](username)}
+
+    def add_task(self, params, request):
+        username = params['username']
+        self._user(username)
+        name = request.get('name')
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError("a task needs a non-empty 'name'")
+        plan = {}
+        for field, parse in (('priority', parse_priority), ('estimate', parse_estimate),
+                             ('due', parse_due)):
+            if request.get(field) is not None:
+                plan[field] = parse(request[field])
+        return 201, {'task': self.task_manager.add_task(username, name.strip(), notify=False, **plan)}
+
+    def complete_task(self, params, request):
+        username = params['username']
+        self._user(username)
+        task = self._task(username, params['task_id'])
+        if self.task_manager.complete_task(username, task['id'], notify=False):
+            self.user_data.update_tasks_completed(username=username)
+            self.stats.record_task_completed(username=username)
+        return 200, {'task': self._task(username, params['task_id'])}
+
+    def delete_task(self, params, request):
+        username = params['username']
+        self._user(username)
+        task = self._task(username, params['task_id'])
+        self.task_manager.delete_task(username, task['id'], notify=False)
+        return 200, {'deleted': task['id']}
+
+    def get_stats(self, params, query):
+        username = params['username']
+        self._user(username)
+        store = self.stats.store
+        return {'totals': store.totals(username),
+                'daily': dict(store.daily(username)),
+                'weekly': dict(store.weekly(username))}
+
+    def record_session(self, params, request):
+        """Record a finished session, e.g. one timed by another tool."""
+        username = params['username']
+        self._user(username)
+        session_type = self._session_type(request)
+        log_type, user_type, setting = PHASES[session_type]
+        minutes = self.config.config[setting]
+        duration = request.get('duration', minutes * 60)
+        if (not isinstance(duration, (int, float)) or isinstance(duration, bool)
+                or duration < 0):
+            raise ValueError("'duration' must be a number of seconds")
+        task_id = request.get('task')
+        if task_id is not None:
+            task_id = self._task(username, task_id)['id']
+            if session_type == 'WORK':
+                self.task_manager.record_pomodoro(username, task_id)
+        event = self.stats.record_session(log_type, duration, task_id=task_id, username=username)
+        self.user_data.update_user_stats(user_type, credited_minutes(duration), username=username)
+        return 201, {'session': event, 'profile': self.user_data.get_user(username)}
+
+    @staticmethod
+    def _session_type(request):
+        session_type = str(request.get('type', 'WORK')).upper()
+        if session_type not in PHASES:
+            raise ValueError(f"type must be one of: {', '.join(PHASES)}")
+        return session_type
+
+    def _timer(self, username):
+        """Return the state of a user's timer, or None if they never started one."""
+        status = self.scheduler.status(username)
+        if status is None:
+            return None
+        remaining = status.pop('remaining')
+        if status['state'] == 'running':
+            # Unlike the remaining time, the end stays valid until the timer changes
+            ends_at = datetime.now() + timedelta(seconds=remaining)
+            status['ends_at'] = ends_at.isoformat(timespec='seconds')
+        else:
+            status['remaining'] = round(remaining)
+        return status
+
+    def _timer_completed(self, session):
+        """Credit a timer that ran out to its user; runs on the scheduler thread."""
+        with self._lock:
+            self._credit_session(session)
+            username = session.username
+            self._versions[username] = self._versions.get(username, 0) + 1
+
+    def get_timer(self, params, query):
+        self._user(params['username'])
+        return {'timer': self._timer(params['username'])}
+
+    def start_timer(self, params, request):
+        """Start a session timer; its time is credited to the user when it runs out."""
+        username = params['username']
+        self._user(username)
+        session_type = self._session_type(request)
+        minutes = self.config.config[PHASES[session_type][2]]
+        self.scheduler.start(username, username, session_type, minutes * 60)
+        return 201, {'timer': self._timer(username)}
+
+    def pause_timer(self, params, request):
+        username = params['username']
+        self._user(username)
+        if not self.scheduler.pause(username):
+            raise ValueError("no running timer to pause")
+        return 200, {'timer': self._timer(username)}
+
+    def resume_timer(self, params, request):
+        username = params['username']
+        self._user(username)
+        if not self.scheduler.resume(username):
+            raise ValueError("no paused timer to resume")
+        return 200, {'timer': self._timer(username)}
+
+    def stop_timer(self, params, request):
+        """Stop a timer early and credit the time it ran."""
+        username = params['username']
+        self._user(username)
+        session = self.scheduler.stop(username)
+        if session is None:
+            raise ValueError("no timer to stop")
+        self._credit_session(session, session.elapsed(self.scheduler.clock()))
+        return 200, {'timer': self._timer(username)}
+
+class _Handler(BaseHTTPRequestHandler):
+    """Passes HTTP/1.1 keep-alive requests to the server's ProdomoAPI."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        status, headers, payload = self.server.api.handle(
+            self.command, self.path, body, self.headers.get('If-None-Match'))
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json')
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_DELETE = _respond
+
+    def log_message(self, format, *args):
+        """Keep the console quiet; a request line per poll is just noise."""
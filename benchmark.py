@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import shutil
+import stat
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+MENU_MARKER = b"Start Focus Session"
+
+# Limits the measurements must stay under (milliseconds / megabytes)
+DEFAULT_BUDGET = {
+    'import_ms': 150,
+    'construct_ms': 100,
+    'first_menu_ms': 300,
+    'rss_mb': 60,
+}
+
+CONSTRUCT_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+from pomodoro import ProdomoApp
+imported = time.perf_counter()
+app = ProdomoApp(animations=False)
+built = time.perf_counter()
+app.storage.close()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+rss_bytes = rss if sys.platform == 'darwin' else rss * 1024
+print(json.dumps({'import_s': imported - start, 'construct_s': built - imported, 'rss_bytes': rss_bytes}))
+"""
+
+
+def _env():
+    """Environment that lets subprocesses import the app from any directory."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPO_DIR, env.get('PYTHONPATH')]))
+    env['PRODOMO_NO_ANIMATION'] = '1'
+    return env
+
+
+def _special_files(directory, names):
+    """Names in ``directory`` that cannot be copied, such as the daemon's socket."""
+    modes = {name: os.lstat(os.path.join(directory, name)).st_mode for name in names}
+    return [name for name, mode in modes.items() if stat.S_ISSOCK(mode) or stat.S_ISFIFO(mode)]
+
+
+def measure_imports(workdir, module='pomodoro'):
+    """Return per-module import times for ``module``, as ``-X importtime`` reports them."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=workdir, env=_env(), capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules.append({'module': name.strip(), 'self_ms': int(own) / 1000,
+                        'cumulative_ms': int(cumulative) / 1000})
+    total = next(entry['cumulative_ms'] for entry in modules if entry['module'] == module)
+    return total, modules
+
+
+def measure_construction(workdir):
+    """Return (construction seconds, peak RSS bytes) of a ProdomoApp."""
+    result = subprocess.run([sys.executable, '-c', CONSTRUCT_SCRIPT], cwd=workdir, env=_env(),
+                            capture_output=True, text=True, check=True)
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    return data['construct_s'], data['rss_bytes']
+
+
+def measure_first_menu(workdir):
+    """Return seconds from launch until the main menu is printed."""
+    with open(os.path.join(workdir, 'config.json')) as f:
+        quick = bool(json.load(f).get('last_user'))
+    command = [sys.executable, os.path.join(REPO_DIR, 'pomodoro.py'), '--no-animation']
+    script = b"6\n"  # Exit from the main menu
+    if quick:
+        command.append('--quick')
+    else:
+        script = b"benchmark\n" + script
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, env=_env(), stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    process.stdin.write(script)
+    process.stdin.close()
+    seen = b''
+    elapsed = None
+    while True:
+        chunk = process.stdout.read1(65536)
+        if not chunk:
+            break
+        seen = seen[-len(MENU_MARKER):] + chunk
+        if elapsed is None and MENU_MARKER in seen:
+            elapsed = time.perf_counter() - start
+    process.wait()
+    if elapsed is None:
+        raise RuntimeError("the main menu never appeared")
+    return elapsed
+
+
+def run(workdir, runs=5):
+    """Measure startup ``runs`` times and return the median results."""
+    import_runs, construct_runs, menu_runs, rss_runs = [], [], [], []
+    modules = []
+    for _ in range(runs):
+        total, modules = measure_imports(workdir)
+        import_runs.append(total)
+        construct, rss = measure_construction(workdir)
+        construct_runs.append(construct * 1000)
+        rss_runs.append(rss / (1024 * 1024))
+        menu_runs.append(measure_first_menu(workdir) * 1000)
+    slowest = sorted(modules, key=lambda entry: entry['self_ms'], reverse=True)[:15]
+    return {
+        'python': sys.version.split()[0],
+        'runs': runs,
+        'import_ms': round(statistics.median(import_runs), 2),
+        'construct_ms': round(statistics.median(construct_runs), 2),
+        'first_menu_ms': round(statistics.median(menu_runs), 2),
+        'rss_mb': round(statistics.median(rss_runs), 2),
+        'slowest_imports': slowest,
+    }
+
+
+def check_budget(results, budget):
+    """Return a message for every measurement over its budget."""
+    return [f"{key}: {results[key]} > {limit}"
+            for key, limit in budget.items() if results.get(key, 0) > limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Prodomo startup time and memory")
+    parser.add_argument('--runs', type=int, default=5, help="repetitions; medians are reported")
+    parser.add_argument('--workdir',
+                        help="directory with the data to start against (default: a fresh one); "
+                             "a temporary copy is used, so it is left untouched")
+    parser.add_argument('--budget', help="JSON file of limits overriding the defaults")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    budget = dict(DEFAULT_BUDGET)
+    if args.budget:
+        with open(args.budget) as f:
+            budget.update(json.load(f))
+
+    with tempfile.TemporaryDirectory() as scratch:
+        workdir = scratch
+        if args.workdir:
+            # Launches write config.json and may create the benchmark user
+            workdir = os.path.join(scratch, 'data')
+            shutil.copytree(args.workdir, workdir, symlinks=True, ignore=_special_files)
+        config_file = os.path.join(workdir, 'config.json')
+        if not os.path.exists(config_file):
+            with open(config_file, 'w') as f:
+                json.dump({'last_user': 'benchmark'}, f)
+        # One untimed launch fills caches such as the rendered banner
+        measure_first_menu(workdir)
+        results = run(workdir, args.runs)
+
+    results['budget'] = budget
+    results['over_budget'] = check_budget(results, budget)
+    report = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + "\n")
+    print(report)
+    if results['over_budget']:
+        print("Over budget: " + "; ".join(results['over_budget']), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
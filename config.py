@@ -2,11 +2,12 @@ import json
 import os
 from colorama import Fore, Style
 from ui import UI
+from animation import frames
 
 class Config:
-    def __init__(self):
+    def __init__(self, ui=None):
         self.config_file = "config.json"
-        self.ui = UI()
+        self.ui = ui if ui is not None else UI()
         self.default_config = {
             'work_duration': 25,  # minutes
             'short_break_duration': 5,  # minutes
@@ -14,6 +15,16 @@ class Config:
             'sessions_before_long_break': 4,
             'enable_notifications': True,
             'enable_sound': True,
+            'enable_animations': True,
+            'progress_bar_width': 30,  # cells
+            'progress_refresh_rate': 4,  # progress bar redraws per second at most
+            'storage_backend': 'json',  # 'json' or 'sqlite'
+            'stats_retention_days': 90,  # daily statistics kept before archiving
+            'task_archive_days': 7,  # completed tasks kept before archiving
+            'daemon_socket': 'prodomo.sock',  # control socket of the background daemon
+            'api_host': '127.0.0.1',  # address the HTTP API listens on
+            'api_port': 8765,
+            'last_user': None,  # Gardener that --quick continues as
             'color_scheme': {
                 'work': 'green',
                 'short_break': 'blue',
@@ -24,13 +35,15 @@ class Config:
             }
         }
         self.config = self.load_config()
+        self.ui.progress_bar_width = self.config['progress_bar_width']
 
     def load_config(self):
         """Load configuration from the JSON file."""
         if os.path.exists(self.config_file):
             try:
                 with open(self.config_file, 'r') as f:
-                    return json.load(f)
+                    # Fill in settings added after the file was written
+                    return {**self.default_config, **json.load(f)}
             except json.JSONDecodeError:
                 return self.default_config
         return self.default_config
@@ -52,9 +65,10 @@ class Config:
             print(f"4. Sessions Before Long Break: {self.config['sessions_before_long_break']}")
             print(f"5. Enable Notifications: {'Yes' if self.config['enable_notifications'] else 'No'}")
             print(f"6. Enable Sound: {'Yes' if self.config['enable_sound'] else 'No'}")
-            print("7. Color Scheme")
-            print("8. Reset to Default")
-            print("9. Back to Main Menu")
+            print(f"7. Enable Animations: {'Yes' if self.config['enable_animations'] else 'No'}")
+            print("8. Color Scheme")
+            print("9. Reset to Default")
+            print("10. Back to Main Menu")
             
             choice = self.ui.get_user_input("\nEnter your choice: ")
             
@@ -71,10 +85,13 @@ class Config:
             elif choice == '6':
                 self._toggle_setting('enable_sound')
             elif choice == '7':
-                self._manage_color_scheme()
+                self._toggle_setting('enable_animations')
+                frames.set_enabled(self.config['enable_animations'])
             elif choice == '8':
-                self._reset_to_default()
+                self._manage_color_scheme()
             elif choice == '9':
+                self._reset_to_default()
+            elif choice == '10':
                 break
             else:
                 self.ui.display_error("Invalid choice. Please try again.")
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+from animation import frames
+from config import Config
+from locking import lock_stats
+from session_runtime import PHASES, credited_minutes
+from stats import Statistics
+from storage import open_storage
+from task import TaskManager
+from timer import Timer
+from ui import UI
+from user_data import UserData
+
+
+class ProdomoDaemon:
+    """Headless Prodomo that is driven over a Unix domain socket.
+
+    The daemon owns the timer and the stores for one user. Clients send
+    newline-delimited JSON commands such as ``{"cmd": "start", "type":
+    "WORK"}`` and get one JSON line back per command. Any number of clients
+    can be connected at once; they all share the same asyncio loop as the
+    running timer.
+    """
+
+    def __init__(self, username, socket_path=None, storage_backend=None):
+        ui = UI()
+        self.config = Config(ui)
+        frames.set_enabled(False)  # Nobody is watching the daemon's terminal
+        self.socket_path = socket_path or self.config.config['daemon_socket']
+        self.timer = Timer(self.config, quiet=True)
+        self.storage = open_storage(storage_backend or self.config.config['storage_backend'])
+        self.user_data = UserData(self.storage.users)
+        self.task_manager = TaskManager(self.user_data, self.storage.tasks,
+                                        self.config.config['task_archive_days'], ui)
+        self.stats = Statistics(self.storage.stats, self.storage.sessions,
+                                self.config.config['stats_retention_days'], ui)
+        self.username = username
+        self.user_data.get_or_create_user(username)
+        self.stats.set_user(username)
+        self.task_manager.archive_completed(username)
+        self.session = None  # asyncio.Task of the running phase
+        self.focus_task = None  # Task the running work phase is for
+        self.last_error = None  # Why the last phase failed, if it did
+        self.commands = {
+            'start': self.cmd_start,
+            'pause': self.cmd_pause,
+            'resume': self.cmd_resume,
+            'stop': self.cmd_stop,
+            'status': self.cmd_status,
+            'complete-task': self.cmd_complete_task,
+        }
+
+    def serve_forever(self):
+        """Listen on the socket until SIGINT or SIGTERM."""
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        self._remove_stale_socket()
+        server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopped.set)
+        print(f"Prodomo daemon for {self.username} listening on {self.socket_path}")
+        try:
+            async with server:
+                await stopped.wait()
+        finally:
+            if self.session is not None:
+                self.timer.stop()
+                await asyncio.wait([self.session])  # _phase_ended reports any error
+            self.user_data.flush()
+            self.task_manager.close()
+            self.storage.close()
+            for line in lock_stats.report():
+                print("Storage contention: " + line)
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def _remove_stale_socket(self):
+        """Remove a socket file left behind by a daemon that is gone."""
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except ConnectionRefusedError:
+            os.remove(self.socket_path)
+        else:
+            raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+        finally:
+            probe.close()
+
+    async def _handle_client(self, reader, writer):
+        """Answer every command line a client sends until it disconnects."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write((json.dumps(await self.dispatch(line)) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, line):
+        """Run one JSON command line and return the reply."""
+        try:
+            request = json.loads(line)
+            handler = self.commands[request['cmd']]
+        except (json.JSONDecodeError, TypeError, KeyError):
+            return {'ok': False, 'error': f"unknown command, expected one of: {', '.join(self.commands)}"}
+        try:
+            return {'ok': True, **await handler(request)}
+        except ValueError as e:
+            return {'ok': False, 'error': str(e)}
+
+    async def cmd_start(self, request):
+        session_type = str(request.get('type', 'WORK')).upper()
+        if session_type not in PHASES:
+            raise ValueError(f"type must be one of: {', '.join(PHASES)}")
+        if self.session is not None:
+            raise ValueError("a session is already running")
+        # Work sessions go to the planner's next task
+        self.focus_task = self.task_manager.next_task(self.username) if session_type == 'WORK' else None
+        self.last_error = None
+        self.session = asyncio.ensure_future(self._run_phase(session_type))
+        self.session.add_done_callback(self._phase_ended)
+        await asyncio.sleep(0)  # Let the phase start its countdown
+        return await self.cmd_status(request)
+
+    async def _run_phase(self, session_type):
+        """Run a phase and record it once it ends."""
+        await self.timer.run_async(session_type, on_tick=lambda: None)
+        log_type, user_type, _ = PHASES[session_type]
+        task_id = self.focus_task['id'] if self.focus_task else None
+        if task_id is not None and self.timer.remaining <= 0:
+            self.task_manager.record_pomodoro(self.username, task_id)
+        self.stats.record_session(log_type, self.timer.elapsed, self.timer.started_at, task_id)
+        self.user_data.update_user_stats(user_type, credited_minutes(self.timer.elapsed))
+        self.user_data.flush()
+
+    def _phase_ended(self, session):
+        """Done-callback of a phase: clear it, and log and keep its error if it failed."""
+        self.session = None
+        self.focus_task = None
+        if not session.cancelled() and session.exception() is not None:
+            error = session.exception()
+            self.last_error = f"{type(error).__name__}: {error}"
+            print(f"Error in {self.timer.current_session} session: {self.last_error}")
+
+    async def cmd_pause(self, request):
+        self.timer.pause()
+        return await self.cmd_status(request)
+
+    async def cmd_resume(self, request):
+        self.timer.resume()
+        return await self.cmd_status(request)
+
+    async def cmd_stop(self, request):
+        if self.timer.is_running:
+            self.timer.stop()
+        return await self.cmd_status(request)
+
+    async def cmd_status(self, request):
+        timer = self.timer
+        return {
+            'user': self.username,
+            'running': timer.is_running,
+            'paused': timer.is_paused,
+            'session': timer.current_session if timer.is_running else None,
+            'remaining': round(timer.remaining) if timer.is_running else 0,
+            'elapsed': round(timer.elapsed) if timer.is_running else 0,
+            'task': self.focus_task if timer.is_running else None,
+            'error': self.last_error,
+        }
+
+    async def cmd_complete_task(self, request):
+        task_id = request.get('id')
+        task = self.task_manager.store.find(self.username, task_id)
+        if task is None:
+            raise ValueError(f"no task with id {task_id}")
+        if self.task_manager.complete_task(self.username, task_id):
+            self.user_data.update_tasks_completed()
+            self.stats.record_task_completed()
+        return {'task': self.task_manager.store.find(self.username, task_id)}
@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+from locking import FileLock, lock_stats
+
+
+class Journal:
+    """JSON snapshot plus an append-only journal of mutation records.
+
+    Every mutation is written as one compact JSON line instead of rewriting
+    the whole snapshot. At load time the state is rebuilt from the snapshot
+    and the journal; once the journal grows past ``compact_threshold`` bytes
+    it is folded into a new snapshot on a background thread. A journal
+    smaller than the snapshot is left to grow, so that bulk appends do not
+    rewrite a large snapshot over and over.
+
+    ``apply_record(state, record)`` must be idempotent, since a crash during
+    compaction can replay records that are already part of the snapshot.
+    ``decode`` and ``encode`` convert between the snapshot JSON and the
+    in-memory state when the state is not a plain dict.
+
+    Several processes can share the files: every change happens under a
+    FileLock, and a process that finds the version moved on reloads the
+    state from disk before applying its record, so records from all of
+    them end up in the journal. ``rebase(state, record)``, if given, may
+    then adjust a record made against the older state.
+    """
+
+    def __init__(self, snapshot_file, apply_record, compact_threshold=256 * 1024,
+                 decode=None, encode=None, rebase=None):
+        self.snapshot_file = snapshot_file
+        self.journal_file = os.path.splitext(snapshot_file)[0] + ".journal"
+        self.pending_file = self.journal_file + ".old"
+        self.apply_record = apply_record
+        self.compact_threshold = compact_threshold
+        self.decode = decode or (lambda data: data)
+        self.encode = encode or (lambda state: state)
+        self.rebase = rebase
+        self._lock = FileLock(snapshot_file)
+        self._handle = None
+        self._compactor = None
+        self.reloads = 0  # times the state was reloaded after another process wrote
+        with self._lock:
+            self.version = self._lock.version()
+            self.state = self._load()
+            if os.path.exists(self.pending_file):
+                # A previous compaction did not finish; fold it in right away.
+                self.compact()
+
+    def _load(self):
+        """Rebuild the state from the snapshot and any journal files."""
+        state = {}
+        if os.path.exists(self.snapshot_file):
+            try:
+                with open(self.snapshot_file, 'r') as f:
+                    state = json.load(f)
+            except json.JSONDecodeError:
+                state = {}
+        state = self.decode(state)
+        for path in (self.pending_file, self.journal_file):
+            self._replay(path, state)
+        return state
+
+    def _replay(self, path, state):
+        """Apply every record of a journal file to the state."""
+        if not os.path.exists(path):
+            return
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn write from a crash; everything after it is lost anyway.
+                    break
+                self.apply_record(state, record)
+
+    def _sync(self):
+        """Reload the state if another process changed the files; call under the lock."""
+        version = self._lock.version()
+        if version == self.version:
+            return False
+        if self._handle is not None:
+            # The journal may have been compacted away under this handle
+            self._handle.close()
+            self._handle = None
+        self.state = self._load()
+        self.version = version
+        self.reloads += 1
+        return True
+
+    def refresh(self):
+        """Pick up changes made by other processes; cheap when there are none."""
+        if self._lock.version() != self.version:
+            with self._lock:
+                self._sync()
+
+    def append(self, record):
+        """Apply a record to the in-memory state and append it to the journal."""
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Apply several records and append them to the journal in one write."""
+        with self._lock:
+            if self._sync():
+                lock_stats.record_conflict(self.snapshot_file)
+            for record in records:
+                if self.rebase is not None:
+                    self.rebase(self.state, record)
+                self.apply_record(self.state, record)
+            if self._handle is None:
+                self._handle = open(self.journal_file, 'a')
+            self._handle.write("".join(json.dumps(record, separators=(',', ':')) + "\n"
+                                       for record in records))
+            self._handle.flush()
+            self.version = self._lock.bump()
+            size = self._handle.tell()
+            if size >= self.compact_threshold and size >= self._snapshot_size():
+                self._start_compaction()
+
+    def _snapshot_size(self):
+        try:
+            return os.path.getsize(self.snapshot_file)
+        except OSError:
+            return 0
+
+    def _start_compaction(self):
+        """Run a compaction on a background thread unless one is running."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+    def compact(self):
+        """Fold the journal into a new snapshot.
+
+        The whole fold runs under the lock, since another process may be
+        compacting the same files.
+        """
+        with self._lock:
+            self._sync()
+            data = json.dumps(self.encode(self.state), indent=4)
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            if os.path.exists(self.journal_file):
+                if os.path.exists(self.pending_file):
+                    # Keep records from an interrupted compaction ahead of the new ones.
+                    with open(self.pending_file, 'a') as dst, open(self.journal_file, 'r') as src:
+                        dst.write(src.read())
+                    os.remove(self.journal_file)
+                else:
+                    os.replace(self.journal_file, self.pending_file)
+            tmp_file = self.snapshot_file + ".tmp"
+            with open(tmp_file, 'w') as f:
+                f.write(data)
+            os.replace(tmp_file, self.snapshot_file)
+            if os.path.exists(self.pending_file):
+                os.remove(self.pending_file)
+            self.version = self._lock.bump()
+
+    def close(self):
+        """Wait for a running compaction and close the journal file."""
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+        self._lock.close()
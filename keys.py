@@ -0,0 +1,76 @@
+import os
+import sys
+
+# Key -> (action, label) for in-session commands, in display order
+SESSION_KEYS = {
+    'p': ('pause', 'pause'),
+    'r': ('resume', 'resume'),
+    's': ('stop', 'stop'),
+    't': ('tasks', 'tasks'),
+    '1': ('complete_1', 'complete task 1'),
+    '2': ('complete_2', 'complete task 2'),
+    '3': ('complete_3', 'complete task 3'),
+    'h': ('help', 'help'),
+    'q': ('quit', 'quit'),
+}
+
+
+class KeyReader:
+    """Single-key terminal input for the session loop.
+
+    While started, a POSIX terminal is switched to cbreak mode so every key
+    press is readable from stdin at once, without waiting for Enter or
+    echoing. ``fileno()`` can be registered with ``selectors``/``select``
+    (or an asyncio loop) and ``read_keys()`` returns whatever has arrived.
+    Windows consoles are read through msvcrt, which has no selectable file
+    descriptor; ``fileno()`` returns None there.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdin
+        self._saved_mode = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Switch the terminal to cbreak mode."""
+        fd = self.fileno()
+        if fd is not None and os.isatty(fd):
+            import termios
+            import tty
+            self._saved_mode = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+
+    def stop(self):
+        """Restore the terminal mode saved by ``start``."""
+        if self._saved_mode is not None:
+            import termios
+            termios.tcsetattr(self.fileno(), termios.TCSADRAIN, self._saved_mode)
+            self._saved_mode = None
+
+    def fileno(self):
+        """Return the selectable stdin descriptor, or None on Windows."""
+        if os.name == 'nt':
+            return None
+        try:
+            return self.stream.fileno()
+        except (AttributeError, ValueError, OSError):
+            return None
+
+    def read_keys(self):
+        """Return the keys that are ready to read, lower-cased ('' at end of input)."""
+        if os.name == 'nt':
+            import msvcrt
+            keys = []
+            while msvcrt.kbhit():
+                keys.append(msvcrt.getwch())
+            return ''.join(keys).lower()
+        # Read the raw bytes that are ready; never blocks after a readable event
+        data = os.read(self.fileno(), 64)
+        return data.decode(errors='ignore').lower()
+
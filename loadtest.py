@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import argparse
+import http.client
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import quote, urlsplit
+
+POLLED = ['', '/tasks', '/tasks?status=active', '/achievements', '/stats']
+
+
+def client(base, username, requests, write_ratio, use_etags, results, seed):
+    """Poll a user's resources like a dashboard, adding a task now and then."""
+    rng = random.Random(seed)
+    url = urlsplit(base)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+    prefix = f"/users/{quote(username, safe='')}"
+    etags = {}
+    latencies, statuses = [], Counter()
+    for i in range(requests):
+        if rng.random() < write_ratio:
+            method, path = 'POST', prefix + '/tasks'
+            body = json.dumps({'name': f"load test task {seed}-{i}"})
+            headers = {'Content-Type': 'application/json'}
+        else:
+            method, path, body = 'GET', prefix + rng.choice(POLLED), None
+            headers = {'If-None-Match': etags[path]} if use_etags and path in etags else {}
+        start = time.perf_counter()
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status] += 1
+        if method == 'GET' and response.getheader('ETag'):
+            etags[path] = response.getheader('ETag')
+    connection.close()
+    results.append((latencies, statuses))
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Prodomo HTTP API")
+    parser.add_argument('--url', default="http://127.0.0.1:8765", help="API base URL")
+    parser.add_argument('--user', default="loadtest", help="user to poll (created if missing)")
+    parser.add_argument('--clients', type=int, default=8, help="concurrent connections")
+    parser.add_argument('--requests', type=int, default=500, help="requests per client")
+    parser.add_argument('--write-ratio', type=float, default=0.02,
+                        help="share of requests that add a task")
+    parser.add_argument('--no-etag', action='store_true',
+                        help="poll without If-None-Match, forcing full responses")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    setup = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+    setup.request('POST', f"/users/{quote(args.user, safe='')}")
+    setup.getresponse().read()
+    setup.close()
+
+    results = []
+    threads = [threading.Thread(target=client, args=(args.url, args.user, args.requests,
+                                                     args.write_ratio, not args.no_etag,
+                                                     results, seed))
+               for seed in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    statuses = sum((client_statuses for _, client_statuses in results), Counter())
+    if not latencies:
+        print("No requests completed.", file=sys.stderr)
+        sys.exit(1)
+    report = {
+        'requests': len(latencies),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies) * 1000, 3),
+            'p50': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+        },
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    }
+    print(json.dumps(report, indent=4))
+    if any(status >= 400 for status in statuses):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
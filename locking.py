@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: threads are still serialized, processes are not
+    fcntl = None
+
+_MISSING = object()
+
+
+class LockStats:
+    """Contention counters for every FileLock in this process, by file."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files = {}
+
+    def _entry(self, path):
+        return self.files.setdefault(path, {'acquired': 0, 'contended': 0, 'wait_time': 0.0,
+                                            'max_wait': 0.0, 'conflicts': 0})
+
+    def record_acquire(self, path, waited=None):
+        """Count an acquisition; ``waited`` is the seconds spent blocked, if any."""
+        with self._lock:
+            entry = self._entry(path)
+            entry['acquired'] += 1
+            if waited is not None:
+                entry['contended'] += 1
+                entry['wait_time'] += waited
+                entry['max_wait'] = max(entry['max_wait'], waited)
+
+    def record_conflict(self, path):
+        """Count a write that found the file changed by another process."""
+        with self._lock:
+            self._entry(path)['conflicts'] += 1
+
+    def report(self):
+        """Return one line per file that saw contention or conflicts."""
+        with self._lock:
+            return [f"{path}: {entry['contended']}/{entry['acquired']} lock waits "
+                    f"({entry['wait_time'] * 1000:.1f} ms total, {entry['max_wait'] * 1000:.1f} ms max), "
+                    f"{entry['conflicts']} merged conflicts"
+                    for path, entry in sorted(self.files.items())
+                    if entry['contended'] or entry['conflicts']]
+
+
+lock_stats = LockStats()
+
+
+class FileLock:
+    """Exclusive advisory lock on ``path`` shared by threads and processes.
+
+    The lock is an ``fcntl.flock`` on ``path + ".lock"``, combined with a
+    thread lock since flock does not exclude threads of the same process.
+    It is reentrant. The lock file also holds a version counter that
+    writers bump after changing ``path``, so a process can tell whether the
+    file changed since it last read it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_file = path + ".lock"
+        self._fd = None
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+
+    def _open(self):
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.lock_file) or ".", exist_ok=True)
+            self._fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        self._depth += 1
+        if self._depth == 1 and fcntl is not None:
+            try:
+                fd = self._open()
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    lock_stats.record_acquire(self.path)
+                except BlockingIOError:
+                    start = time.perf_counter()
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                    lock_stats.record_acquire(self.path, time.perf_counter() - start)
+            except BaseException:
+                self._depth -= 1
+                self._thread_lock.release()
+                raise
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0 and fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def version(self):
+        """Return the version of ``path`` (0 before the first write)."""
+        if fcntl is None:
+            return 0
+        try:
+            return int(os.pread(self._open(), 32, 0) or 0)
+        except ValueError:
+            return 0  # Read while another process was rewriting it
+
+    def bump(self):
+        """Record a change to ``path``; call while holding the lock. Return the new version."""
+        if fcntl is None:
+            return 0
+        version = self.version() + 1
+        fd = self._open()
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, str(version).encode(), 0)
+        return version
+
+    def close(self):
+        """Close the lock file; it is reopened if the lock is used again."""
+        with self._thread_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def merge_changes(base, ours, theirs):
+    """Three-way merge of two JSON documents changed from a common ``base``.
+
+    A value changed on one side only takes that side. When both sides
+    changed a value, dictionaries are merged key by key, numbers combine
+    both changes (``theirs + ours - base``, so counters add up; a number
+    both sides added counts from 0) and anything else keeps ``ours``. A
+    key missing from one side only counts as deleted there.
+    """
+    if ours == base:
+        return theirs
+    if theirs == base or theirs is _MISSING:
+        return ours
+    if isinstance(ours, dict) and isinstance(theirs, dict):
+        base = base if isinstance(base, dict) else {}
+        merged = {}
+        for key in dict.fromkeys([*theirs, *ours, *base]):
+            value = merge_changes(base.get(key, _MISSING), ours.get(key, _MISSING),
+                                  theirs.get(key, _MISSING))
+            if value is not _MISSING:
+                merged[key] = value
+        return merged
+    if base is _MISSING:
+        base = 0
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool)
+           for value in (base, ours, theirs)):
+        return theirs + ours - base
+    return ours
@@ -0,0 +1,121 @@
+import heapq
+from datetime import date
+
+# Priority name -> stored value; lower values are planned first
+PRIORITIES = {'high': 1, 'medium': 2, 'low': 3}
+PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
+DEFAULT_PRIORITY = PRIORITIES['medium']
+# Planning fields of a task and their values for tasks created without them
+PLAN_DEFAULTS = {'priority': DEFAULT_PRIORITY, 'estimate': 1, 'due': None, 'pomodoros': 0}
+_NO_DUE = '9999-12-31'
+
+
+def plan_key(task):
+    """Heap key of an active task: priority, then due date, then age."""
+    return (task.get('priority', DEFAULT_PRIORITY), task.get('due') or _NO_DUE, task['id'])
+
+
+def remaining_pomodoros(task):
+    """Pomodoros left in a task's estimate; at least one while it is open."""
+    return max(task.get('estimate', 1) - task.get('pomodoros', 0), 1)
+
+
+def parse_priority(value):
+    """Return the stored priority for a name ('high') or number (1-3)."""
+    text = str(value).strip().lower()
+    if text in PRIORITIES:
+        return PRIORITIES[text]
+    if text.isdigit() and int(text) in PRIORITY_NAMES:
+        return int(text)
+    raise ValueError(f"priority must be high, medium or low, not {value!r}")
+
+
+def parse_estimate(value):
+    """Return an estimate in Pomodoros, a positive integer."""
+    text = str(value).strip()
+    if not text.isdigit() or int(text) < 1:
+        raise ValueError(f"estimate must be a whole number of Pomodoros, not {value!r}")
+    return int(text)
+
+
+def parse_due(value):
+    """Return a due date as YYYY-MM-DD, or None for no due date."""
+    if value in (None, ''):
+        return None
+    try:
+        return date.fromisoformat(str(value).strip()[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"due date must be YYYY-MM-DD, not {value!r}")
+
+
+class TaskPlanner:
+    """Min-heap of one user's active tasks, ordered by ``plan_key``.
+
+    Adding a task pushes it and ``next()`` peeks at the top, both in
+    O(log n). Completed or deleted tasks are only dropped from ``keys``
+    and skipped when they surface at the top; a changed task is pushed
+    again under its new key. The heap is rebuilt once half of it is stale.
+    """
+
+    def __init__(self, tasks=()):
+        self.keys = {task['id']: plan_key(task) for task in tasks}
+        self.heap = list(self.keys.values())
+        heapq.heapify(self.heap)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def sync(self, tasks):
+        """Re-plan from a user's current active tasks, e.g. after another process changed them."""
+        keys = {task['id']: plan_key(task) for task in tasks}
+        if keys != self.keys:
+            self.keys = keys
+            self.heap = list(keys.values())
+            heapq.heapify(self.heap)
+
+    def _live(self, key):
+        return self.keys.get(key[-1]) == key
+
+    def add(self, task):
+        """Plan a new task, or re-plan one whose priority or due date changed."""
+        key = plan_key(task)
+        if self.keys.get(task['id']) == key:
+            return
+        self.keys[task['id']] = key
+        heapq.heappush(self.heap, key)
+        self._compact()
+
+    def remove(self, task_id):
+        """Drop a completed or deleted task from the plan."""
+        if self.keys.pop(task_id, None) is not None:
+            self._compact()
+
+    def _compact(self):
+        if len(self.heap) > 2 * len(self.keys) + 32:
+            self.heap = list(self.keys.values())
+            heapq.heapify(self.heap)
+
+    def next(self):
+        """Return the ID of the task to work on next, or None."""
+        while self.heap and not self._live(self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0][-1] if self.heap else None
+
+    def upcoming(self, count):
+        """Return the IDs of the next ``count`` planned tasks, in order.
+
+        Walks the heap best-first from its root instead of sorting it, so
+        this costs O(count log count) plus the stale entries passed over.
+        """
+        result = []
+        seen = set()
+        frontier = [(self.heap[0], 0)] if self.heap else []
+        while frontier and len(result) < count:
+            key, position = heapq.heappop(frontier)
+            if self._live(key) and key[-1] not in seen:
+                seen.add(key[-1])
+                result.append(key[-1])
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(self.heap):
+                    heapq.heappush(frontier, (self.heap[child], child))
+        return result
@@ -1,32 +1,33 @@
 #!/usr/bin/env python3
-import os
+import argparse
 import sys
 import time
-from datetime import datetime
-from colorama import init, Fore, Back, Style
-import pyfiglet
-from art import text2art
+from colorama import Fore, Style
 from timer import Timer
 from ui import UI
 from task import TaskManager
 from stats import Statistics
 from config import Config
 from user_data import UserData
-import select
-import threading
-from pynput import keyboard
-import pyautogui
-import pydirectinput
+from storage import BACKENDS, open_storage
+from animation import ANIMATIONS, frames
+from locking import lock_stats
+from task_io import FORMATS, detect_format, open_task_file, read_rows, write_tasks
 
 class ProdomoApp:
-    def __init__(self):
-        init()  # Initialize colorama
-        self.config = Config()
+    def __init__(self, storage_backend=None, animations=None):
+        # One UI (which initializes colorama) and one Config shared by every component
         self.ui = UI()
-        self.timer = Timer()
-        self.user_data = UserData()
-        self.task_manager = TaskManager(self.user_data)
-        self.stats = Statistics()
+        self.config = Config(self.ui)
+        frames.set_enabled(self.config.config['enable_animations'] if animations is None else animations)
+        self.timer = Timer(self.config)
+        self.storage = open_storage(storage_backend or self.config.config['storage_backend'])
+        self.user_data = UserData(self.storage.users)
+        self.task_manager = TaskManager(self.user_data, self.storage.tasks,
+                                        self.config.config['task_archive_days'], self.ui)
+        self.stats = Statistics(self.storage.stats, self.storage.sessions,
+                                self.config.config['stats_retention_days'], self.ui)
+        self._runtime = None
         self.running = False
         self.current_session = 0
         self.total_sessions = 0
@@ -41,56 +42,66 @@ class ProdomoApp:
             'tree': '🌲',
             'forest': '🌳🌲🌳'
         }
-        self.animations = {
-            'growing': ['🌱', '🌿', '🌳', '🌲'],
-            'working': ['🌱', '🌿', '🌳', '🌲'],
-            'resting': ['💧', '💦', '🌊', '💧'],
-            'recharging': ['☀️', '🌤️', '⛅', '☀️']
-        }
+        self.animations = ANIMATIONS
         self.animation_frame = 0
 
+    @property
+    def runtime(self):
+        """The session event loop, created (and asyncio imported) with the first session."""
+        if self._runtime is None:
+            from session_runtime import SessionRuntime
+            self._runtime = SessionRuntime(self)
+        return self._runtime
+
     def _animate(self, animation_type, duration=0.5):
-        """Display an animated sequence."""
-        frames = self.animations[animation_type]
-        for _ in range(2):  # Show animation twice
-            for frame in frames:
-                print(f"\r{frame}", end="", flush=True)
-                time.sleep(duration / len(frames))
-        print("\r", end="", flush=True)
+        """Queue an animated sequence without blocking."""
+        frames.animate(animation_type, duration)
 
     def display_welcome(self):
         """Display the welcome screen with epic story introduction."""
         self.ui.clear_screen()
-        title = text2art("PRODOMO", font="block")
-        print(Fore.CYAN + title)
-        print("\nWelcome to the Garden of Productivity!")
-        print("\nIn this mystical garden, every moment of focus plants a seed.")
-        print("Every completed task waters the soil.")
-        print("Every achievement makes the garden flourish.")
-        print("\nYou are the Gardener of your own destiny.")
-        print("Will you nurture your garden to greatness?")
-        time.sleep(2)
+        print(Fore.CYAN + self.ui.banner("PRODOMO"))
+        frames.reveal([
+            "\nWelcome to the Garden of Productivity!",
+            "\nIn this mystical garden, every moment of focus plants a seed.",
+            "Every completed task waters the soil.",
+            "Every achievement makes the garden flourish.",
+            "\nYou are the Gardener of your own destiny.",
+            "Will you nurture your garden to greatness?"
+        ])
 
     def get_username(self):
         """Get username from user and load/create user data."""
         while True:
+            frames.wait()
             username = input("\nEnter your name, Gardener: ").strip()
             if username:
-                user_data = self.user_data.get_or_create_user(username)
-                self.level = user_data['level']
-                self.last_level = self.level
-                self.experience_points = user_data['experience']
-                self.total_sessions = user_data['total_sessions']
-                self.current_user = username
-                return username
+                return self.login(username)
             print(Fore.RED + "Every Gardener needs a name. Please try again." + Style.RESET_ALL)
 
+    def login(self, username):
+        """Load or create a Gardener's data and make them the current user."""
+        user_data = self.user_data.get_or_create_user(username)
+        self.level = user_data['level']
+        self.last_level = self.level
+        self.experience_points = user_data['experience']
+        self.total_sessions = user_data['total_sessions']
+        self.current_user = username
+        self.stats.set_user(username)
+        self.task_manager.archive_completed(username)
+        if self.config.config['last_user'] != username:
+            # Remembered so that --quick can skip the name prompt
+            self.config.config['last_user'] = username
+            self.config.save_config()
+        return username
+
     def main_menu(self):
         """Display the main menu and handle user input."""
         while True:
             self.ui.display_menu()
             self._display_level_info()
             self._display_achievements()
+            frames.wait()
             choice = input("\nEnter your choice: ").strip()
             
             if choice == '1':
@@ -114,11 +125,11 @@ class ProdomoApp:
         """Display current level and experience points with story elements."""
         user_data = self.user_data.get_user_stats()
         if user_data:
-            print(Fore.YELLOW + "\nLevel: " + str(user_data['level']))
-            print("Experience: " + str(user_data['experience']))
-            print("Next Level: " + str(user_data['level'] * 100 - user_data['experience']) + " XP needed")
+            frames.print(Fore.YELLOW + "\nLevel: " + str(user_data['level']))
+            frames.print("Experience: " + str(user_data['experience']))
+            frames.print("Next Level: " + str(user_data['level'] * 100 - user_data['experience']) + " XP needed")
             streak = user_data.get('streak', 0)  # Safely get streak with default value
-            print("Current Streak: " + str(streak) + " days" + Style.RESET_ALL)
+            frames.print("Current Streak: " + str(streak) + " days" + Style.RESET_ALL)
             
             # Check for level up
             if user_data['level'] > self.last_level:
@@ -134,13 +145,14 @@ class ProdomoApp:
         if user_data and 'achievements' in user_data:
             achievements = user_data['achievements']
             if achievements:
-                print(Fore.CYAN + "\nAchievements:")
-                print("-" * 50)
+                # Queued behind the story reveals, so each story follows its own header
+                frames.print(Fore.CYAN + "\nAchievements:")
+                frames.print("-" * 50)
                 for achievement_id, data in achievements.items():
                     achievement = self.user_data.achievements[achievement_id]
-                    print(f"🏆 {achievement['name']}: {achievement['description']}")
+                    frames.print(f"🏆 {achievement['name']}: {achievement['description']}")
                     self.ui.display_achievement_story(achievement_id)
-                print("-" * 50 + Style.RESET_ALL)
+                frames.print("-" * 50 + Style.RESET_ALL)
 
     def start_pomodoro(self):
         """Start a Pomodoro session with story elements."""
@@ -148,30 +160,28 @@ class ProdomoApp:
         self.current_session += 1
         
         while self.running:
-            # Display active tasks
-            active_tasks = self.task_manager.get_active_tasks(self.current_user)
-            self.ui.display_tasks(active_tasks)
+            # The planner's next task (or the best search match) is this session's focus
+            active_tasks = self.pick_session_tasks()
+            focus_task = active_tasks[0] if active_tasks else None
             
             # Work session
             self.ui.display_session_info("WORK", self.current_session)
+            self.ui.display_focus(focus_task)
+            self.ui.display_tasks(active_tasks)
             self.ui.display_session_commands()
-            self.timer.start_work_session()
-            self.user_data.update_user_stats("WORK", 25)
-            
-            # Handle session commands
-            self._handle_session_commands(active_tasks)
+            self.runtime.run_phase("WORK", active_tasks, focus_task)
+            if not self.running:
+                self.user_data.flush()
+                break
             
             # Short break or long break
-            if self.current_session % 4 == 0:
-                self.ui.display_session_info("LONG BREAK", self.current_session)
-                self.timer.start_long_break()
-                self.user_data.update_user_stats("LONG_BREAK", 15)
-            else:
-                self.ui.display_session_info("SHORT BREAK", self.current_session)
-                self.timer.start_short_break()
-                self.user_data.update_user_stats("SHORT_BREAK", 5)
+            break_type = "LONG BREAK" if self.current_session % 4 == 0 else "SHORT BREAK"
+            self.ui.display_session_info(break_type, self.current_session)
+            # Tasks completed during the work phase are gone from the runtime's list
+            self.runtime.run_phase(break_type, self.runtime.active_tasks)
             
             self.total_sessions += 1
+            self.user_data.flush()  # Persist the cycle's coalesced updates
             
             # Display random quote
             self.ui.display_quote()
@@ -188,73 +198,54 @@ class ProdomoApp:
             if not self.ask_to_continue():
                 break
 
-    def _handle_session_commands(self, active_tasks):
-        """Handle commands during a session."""
-        def input_thread():
-            while self.timer.is_running:
-                try:
-                    # Check for key presses
-                    if pydirectinput.keyDown('p'):
-                        self.timer.pause()
-                        time.sleep(0.2)  # Prevent multiple triggers
-                    elif pydirectinput.keyDown('r'):
-                        self.timer.resume()
-                        time.sleep(0.2)
-                    elif pydirectinput.keyDown('s'):
-                        self.timer.stop()
-                        break
-                    elif pydirectinput.keyDown('t'):
-                        self.ui.display_tasks(active_tasks)
-                        time.sleep(0.2)
-                    elif pydirectinput.keyDown('q'):
-                        self.timer.stop()
-                        self.running = False
-                        break
-                    elif pydirectinput.keyDown('h'):
-                        self.ui.display_session_commands()
-                        time.sleep(0.2)
-                    elif pydirectinput.keyDown('1') and len(active_tasks) >= 1:
-                        task_id = active_tasks[0]['id']
-                        self.task_manager.complete_task(self.current_user, task_id)
-                        self.user_data.update_tasks_completed()
-                        active_tasks = self.task_manager.get_active_tasks(self.current_user)
-                        self.ui.display_tasks(active_tasks)
-                        time.sleep(0.2)
-                    elif pydirectinput.keyDown('2') and len(active_tasks) >= 2:
-                        task_id = active_tasks[1]['id']
-                        self.task_manager.complete_task(self.current_user, task_id)
-                        self.user_data.update_tasks_completed()
-                        active_tasks = self.task_manager.get_active_tasks(self.current_user)
-                        self.ui.display_tasks(active_tasks)
-                        time.sleep(0.2)
-                    elif pydirectinput.keyDown('3') and len(active_tasks) >= 3:
-                        task_id = active_tasks[2]['id']
-                        self.task_manager.complete_task(self.current_user, task_id)
-                        self.user_data.update_tasks_completed()
-                        active_tasks = self.task_manager.get_active_tasks(self.current_user)
-                        self.ui.display_tasks(active_tasks)
-                        time.sleep(0.2)
-                except Exception as e:
-                    print(f"Error handling key press: {e}")
-                time.sleep(0.1)
-        
-        # Start input thread
-        input_handler = threading.Thread(target=input_thread)
-        input_handler.daemon = True
-        input_handler.start()
-        
-        # Wait for timer to finish or be stopped
-        while self.timer.is_running:
-            time.sleep(0.1)
-        
-        # Clean up
-        input_handler.join(timeout=0.1)
+    def pick_session_tasks(self):
+        """Return up to three active tasks for the next session, the first being its focus.
+
+        They come from the task planner; with more tasks than keys, a
+        search can pick others instead.
+        """
+        planned = self.task_manager.planned_tasks(self.current_user, 4)
+        if len(planned) <= 3:
+            return planned
+        query = self.ui.get_user_input("\nSearch for this session's tasks (Enter for the plan): ").strip()
+        if not query:
+            return planned[:3]
+        matches = self.task_manager.search_tasks(self.current_user, query, limit=3, active_only=True)
+        if not matches:
+            self.ui.display_error(f"No active tasks match '{query}', following the plan.")
+            return planned[:3]
+        return matches
 
     def ask_to_continue(self):
         """Ask user if they want to continue with another session."""
+        frames.wait()
         choice = input("\nContinue tending to your garden? (y/n): ").lower().strip()
         return choice == 'y'
 
+    def import_tasks(self, username, path, fmt=None):
+        """Bulk-import tasks from a JSONL or CSV file ('-' for stdin) and report on it."""
+        fmt = fmt or detect_format(path)
+        with open_task_file(path) as f:
+            report = self.task_manager.import_tasks(username, read_rows(f, fmt))
+        for line, error in report['errors']:
+            self.ui.display_error(f"Line {line}: {error}")
+        self.ui.display_success(
+            f"Imported {report['imported']} of {report['rows']} rows for {username} "
+            f"({report['duplicates']} duplicates, {report['invalid']} invalid) "
+            f"in {report['seconds']:.2f}s: {report['rows_per_second']:,.0f} rows/s")
+        return report
+
+    def export_tasks(self, username, path, fmt=None, include_archived=False):
+        """Stream a user's tasks to a JSONL or CSV file ('-' for stdout)."""
+        fmt = fmt or detect_format(path)
+        start = time.perf_counter()
+        with open_task_file(path, 'w') as f:
+            count = write_tasks(self.task_manager.export_tasks(username, include_archived), f, fmt)
+        seconds = time.perf_counter() - start
+        print(f"Exported {count} tasks of {username} in {seconds:.2f}s: "
+              f"{count / seconds if seconds else 0:,.0f} rows/s", file=sys.stderr)
+        return count
+
     def quit_app(self):
         """Handle application exit with story elements."""
         user_data = self.user_data.get_user_stats()
@@ -265,13 +256,75 @@ class ProdomoApp:
         print(f"🌳 Experience Points: {user_data['experience']}")
         print(f"🌲 Current Streak: {user_data['streak']} days")
         print("\nMay your garden continue to grow and flourish!")
-        time.sleep(2)
+        self.user_data.flush()
+        if self._runtime is not None:
+            self._runtime.close()
+        self.task_manager.close()
+        self.storage.close()
+        for line in lock_stats.report():
+            # Another Prodomo shared these files with this one
+            print(Style.DIM + "Storage contention: " + line + Style.RESET_ALL)
+        frames.hold(2)
+        frames.wait()
 
 def main():
-    app = ProdomoApp()
-    app.display_welcome()
-    username = app.get_username()
-    app.main_menu()
+    parser = argparse.ArgumentParser(description="Prodomo - The Epic Productivity Garden")
+    parser.add_argument('--storage', choices=BACKENDS,
+                        help="storage backend to use (overrides config.json)")
+    parser.add_argument('--daemon', metavar='USER',
+                        help="run headless for USER, controlled with prodomoctl.py")
+    parser.add_argument('--socket', help="daemon socket (overrides config.json)")
+    parser.add_argument('--api', action='store_true',
+                        help="serve every user's data as a JSON HTTP API instead of the menus")
+    parser.add_argument('--port', type=int, help="API port (overrides config.json)")
+    parser.add_argument('--import-tasks', metavar='FILE',
+                        help="add tasks from a JSONL or CSV file ('-' for stdin) and exit")
+    parser.add_argument('--export-tasks', metavar='FILE',
+                        help="write tasks to a JSONL or CSV file ('-' for stdout) and exit")
+    parser.add_argument('--user', help="Gardener to import for or export (default: the last one)")
+    parser.add_argument('--format', choices=FORMATS,
+                        help="task file format (default: from the file extension, else jsonl)")
+    parser.add_argument('--include-archived', action='store_true',
+                        help="also export archived completed tasks")
+    parser.add_argument('--no-animation', action='store_true',
+                        help="print story text at once and skip animations (for scripts and SSH)")
+    parser.add_argument('--quick', action='store_true',
+                        help="skip the welcome screen and continue as the last Gardener")
+    args = parser.parse_args()
+    if args.daemon:
+        from daemon import ProdomoDaemon
+        ProdomoDaemon(args.daemon, args.socket, args.storage).serve_forever()
+        return
+    if args.api:
+        from api_server import ProdomoAPI
+        ProdomoAPI(port=args.port, storage_backend=args.storage).serve_forever()
+        return
+    if args.import_tasks or args.export_tasks:
+        app = ProdomoApp(storage_backend=args.storage, animations=False)
+        username = args.user or app.config.config['last_user']
+        if not username:
+            parser.error("--user is required until a Gardener has logged in")
+        try:
+            if args.import_tasks:
+                app.import_tasks(username, args.import_tasks, args.format)
+            if args.export_tasks:
+                app.export_tasks(username, args.export_tasks, args.format, args.include_archived)
+        finally:
+            app.task_manager.close()
+            app.storage.close()
+        return
+    app = ProdomoApp(storage_backend=args.storage,
+                     animations=False if args.no_animation else None)
+    try:
+        if args.quick and app.config.config['last_user']:
+            app.login(app.config.config['last_user'])
+        else:
+            app.display_welcome()
+            app.get_username()
+        app.main_menu()
+    except KeyboardInterrupt:
+        app.user_data.flush()
+        raise
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,85 @@
+from datetime import date
+
+FIELDS = ('sessions', 'time', 'tasks_completed')
+
+
+class PrefixSumIndex:
+    """Day-indexed cumulative totals for O(1) date-range queries.
+
+    ``sums[field][i]`` is the total of ``field`` from ``origin`` through
+    ``origin + i`` days, inclusive. Adding to the most recent day is O(1);
+    adding to an earlier day shifts the later sums.
+    """
+
+    def __init__(self, origin=None, sums=None):
+        self.origin = origin  # date ordinal of index 0
+        self.sums = sums if sums is not None else {field: [] for field in FIELDS}
+
+    @classmethod
+    def from_json(cls, data):
+        """Build an index from its saved form."""
+        return cls(data['origin'], data['sums'])
+
+    def to_json(self):
+        """Return the saved form of the index."""
+        return {'origin': self.origin, 'sums': self.sums}
+
+    @classmethod
+    def from_daily(cls, daily):
+        """Build an index from (ISO date, {field: value}) pairs in any order."""
+        index = cls()
+        for day, entry in sorted(daily):
+            index.add(date.fromisoformat(day), **{field: entry.get(field, 0) for field in FIELDS})
+        return index
+
+    def daily(self, field):
+        """Yield (ISO date, amount) for each day with a nonzero ``field``."""
+        previous = 0
+        for position, total in enumerate(self.sums[field]):
+            if total != previous:
+                yield date.fromordinal(self.origin + position).isoformat(), total - previous
+                previous = total
+
+    def __len__(self):
+        return len(self.sums[FIELDS[0]])
+
+    def add(self, day, **amounts):
+        """Add ``amounts`` (e.g. sessions=1, time=25) to ``day``."""
+        ordinal = day.toordinal()
+        if self.origin is None:
+            self.origin = ordinal
+        if ordinal < self.origin:
+            # Back-filling before the first day: prepend empty days
+            padding = self.origin - ordinal
+            for field in FIELDS:
+                self.sums[field][:0] = [0] * padding
+            self.origin = ordinal
+        position = ordinal - self.origin
+        for field in FIELDS:
+            column = self.sums[field]
+            if position >= len(column):
+                # Days without activity carry the running total forward
+                column.extend([column[-1] if column else 0] * (position + 1 - len(column)))
+            amount = amounts.get(field, 0)
+            if amount:
+                for i in range(position, len(column)):
+                    column[i] += amount
+
+    def _cumulative(self, field, ordinal):
+        """Total of ``field`` up to and including the given day ordinal."""
+        position = ordinal - self.origin
+        if position < 0:
+            return 0
+        column = self.sums[field]
+        return column[min(position, len(column) - 1)]
+
+    def total(self, start, end, field):
+        """Total of ``field`` from ``start`` through ``end`` (dates, inclusive)."""
+        if self.origin is None or end < start:
+            return 0
+        return (self._cumulative(field, end.toordinal())
+                - self._cumulative(field, start.toordinal() - 1))
+
+    def totals(self, start, end):
+        """Return {field: total} for ``start`` through ``end`` inclusive."""
+        return {field: self.total(start, end, field) for field in FIELDS}
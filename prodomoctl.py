@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import socket
+import sys
+from config import Config
+
+
+def send(request, socket_path):
+    """Send one command to the daemon and return its reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(request) + "\n").encode())
+        with sock.makefile('r') as replies:
+            return json.loads(replies.readline())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Control a running Prodomo daemon")
+    parser.add_argument('--socket', help="daemon socket (default: daemon_socket in config.json)")
+    commands = parser.add_subparsers(dest='cmd', required=True)
+    start = commands.add_parser('start', help="start a session")
+    start.add_argument('type', nargs='?', default='WORK', choices=['work', 'short-break', 'long-break'],
+                       type=str.lower)
+    commands.add_parser('pause', help="pause the running session")
+    commands.add_parser('resume', help="resume a paused session")
+    commands.add_parser('stop', help="stop the running session")
+    commands.add_parser('status', help="show the timer state")
+    complete = commands.add_parser('complete-task', help="mark a task as completed")
+    complete.add_argument('id', type=int)
+    args = parser.parse_args()
+
+    request = {'cmd': args.cmd}
+    if args.cmd == 'start':
+        request['type'] = args.type.replace('-', ' ').upper()
+    elif args.cmd == 'complete-task':
+        request['id'] = args.id
+    socket_path = args.socket or Config().config['daemon_socket']
+    try:
+        reply = send(request, socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"No Prodomo daemon is listening on {socket_path}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(reply))
+    sys.exit(0 if reply.get('ok') else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import time
+
+
+class ProgressBar:
+    """A text progress bar with every visible state built up front.
+
+    The ``width + 1`` possible bars are rendered once when the bar is
+    created, so an update is a list lookup. ``update`` only writes when the
+    line on screen would change, and no more than ``max_rate`` times a
+    second (the final state is always written).
+    """
+
+    def __init__(self, total, width=30, fill='█', empty='░', max_rate=None):
+        self.total = total
+        self.width = width
+        self.bars = [fill * filled + empty * (width - filled) for filled in range(width + 1)]
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self._shown = None
+        self._written_at = 0.0
+
+    def render(self, done, label=''):
+        """Return the bar line for ``done`` out of ``total``."""
+        if done >= self.total:
+            filled = self.width
+        else:
+            filled = max(0, int(self.width * done / self.total))
+        bar = self.bars[filled]
+        return f"[{bar}] {label}" if label else f"[{bar}]"
+
+    def update(self, done, label=''):
+        """Redraw the bar in place if it changed; return True if it was written."""
+        line = self.render(done, label)
+        if line == self._shown:
+            return False
+        now = time.monotonic()
+        if now - self._written_at < self.min_interval and done < self.total:
+            return False
+        print(f"\r{line}", end="", flush=True)
+        self._shown = line
+        self._written_at = now
+        return True
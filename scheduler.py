@@ -0,0 +1,202 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+from session_runtime import PHASES, credited_minutes
+
+
+class ScheduledSession:
+    """State of one session driven by a TimerScheduler."""
+
+    __slots__ = ('key', 'username', 'session_type', 'duration', 'started_at',
+                 'deadline', 'paused_at', 'state', 'generation')
+
+    def __init__(self, key, username, session_type, duration, now):
+        self.key = key
+        self.username = username
+        self.session_type = session_type
+        self.duration = duration  # seconds
+        self.started_at = datetime.now()
+        self.deadline = now + duration
+        # Monotonic time the countdown was frozen at, while paused or once stopped
+        self.paused_at = None
+        self.state = 'running'  # running, paused, stopped or completed
+        # Bumped whenever the deadline moves; heap entries from an older
+        # generation are stale and skipped when they come up.
+        self.generation = 0
+
+    def remaining(self, now):
+        """Seconds left at monotonic time ``now``."""
+        if self.state == 'completed':
+            return 0.0
+        return max(0.0, self.deadline - (self.paused_at if self.paused_at is not None else now))
+
+    def elapsed(self, now):
+        """Seconds counted down at monotonic time ``now``."""
+        return self.duration - self.remaining(now)
+
+
+class TimerScheduler:
+    """Drives any number of session timers from one heap on one thread.
+
+    Only deadlines live in the heap, so the thread sleeps until the next
+    session ends no matter how many are running; nothing ticks per
+    session. Pausing or resuming pushes a new heap entry and leaves the old
+    one to be discarded lazily, keeping every operation O(log n). The
+    sessions and the heap are only touched under one condition lock.
+
+    ``on_complete(session)`` is called on the scheduler thread for every
+    session that runs to its deadline, outside the lock.
+    """
+
+    def __init__(self, on_complete=None, clock=time.monotonic):
+        self.on_complete = on_complete
+        self.clock = clock
+        self.sessions = {}
+        self._heap = []
+        self._sequence = itertools.count()  # tie-breaker for equal deadlines
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def start(self, key, username, session_type, duration):
+        """Start a session of ``duration`` seconds under ``key``."""
+        with self._condition:
+            current = self.sessions.get(key)
+            if current is not None and current.state in ('running', 'paused'):
+                raise ValueError(f"session {key!r} is already running")
+            session = ScheduledSession(key, username, session_type, duration, self.clock())
+            self.sessions[key] = session
+            self._push(session)
+            return session
+
+    def pause(self, key):
+        """Pause a running session; return False if it is not running."""
+        with self._condition:
+            session = self.sessions.get(key)
+            if session is None or session.state != 'running':
+                return False
+            session.paused_at = self.clock()
+            session.state = 'paused'
+            session.generation += 1
+            return True
+
+    def resume(self, key):
+        """Resume a paused session; return False if it is not paused."""
+        with self._condition:
+            session = self.sessions.get(key)
+            if session is None or session.state != 'paused':
+                return False
+            session.deadline += self.clock() - session.paused_at
+            session.paused_at = None
+            session.state = 'running'
+            self._push(session)
+            return True
+
+    def stop(self, key):
+        """Stop a session without completing it; return it, or None if it had ended."""
+        with self._condition:
+            session = self.sessions.get(key)
+            if session is None or session.state not in ('running', 'paused'):
+                return None
+            if session.paused_at is None:
+                session.paused_at = self.clock()
+            session.state = 'stopped'
+            session.generation += 1
+            return session
+
+    def remaining(self, key):
+        """Seconds left in a session."""
+        with self._condition:
+            return self.sessions[key].remaining(self.clock())
+
+    def status(self, key):
+        """Return a session's state, type and remaining seconds, or None."""
+        with self._condition:
+            session = self.sessions.get(key)
+            if session is None:
+                return None
+            return {'state': session.state, 'type': session.session_type,
+                    'remaining': session.remaining(self.clock())}
+
+    def discard(self, key):
+        """Forget a session that has ended."""
+        with self._condition:
+            session = self.sessions.get(key)
+            if session is not None and session.state in ('stopped', 'completed'):
+                del self.sessions[key]
+
+    def _push(self, session):
+        heapq.heappush(self._heap, (session.deadline, next(self._sequence),
+                                    session.generation, session))
+        # Wake the scheduler thread in case this is now the earliest deadline
+        self._condition.notify()
+
+    def _pop_due(self, now):
+        """Remove and return the sessions whose deadline has passed."""
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, _, generation, session = heapq.heappop(heap)
+            if generation == session.generation and session.state == 'running':
+                session.state = 'completed'
+                due.append(session)
+        return due
+
+    def run_due(self):
+        """Complete every session whose deadline has passed; return them."""
+        with self._condition:
+            due = self._pop_due(self.clock())
+        # Callbacks run outside the lock so they may start new sessions
+        for session in due:
+            if self.on_complete is not None:
+                try:
+                    self.on_complete(session)
+                except Exception as e:
+                    print(f"\nError completing session {session.key!r}: {e}")
+        return due
+
+    def run_forever(self):
+        """Complete sessions as their deadlines pass until ``close``."""
+        while True:
+            with self._condition:
+                while not self._closed:
+                    # Drop stale entries so the wait targets a live deadline
+                    while self._heap and self._heap[0][2] != self._heap[0][3].generation:
+                        heapq.heappop(self._heap)
+                    if self._heap and self._heap[0][0] <= self.clock():
+                        break
+                    timeout = self._heap[0][0] - self.clock() if self._heap else None
+                    self._condition.wait(timeout)
+                if self._closed:
+                    return
+            self.run_due()
+
+    def start_thread(self):
+        """Run the scheduler on a background thread."""
+        self._thread = threading.Thread(target=self.run_forever, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def close(self):
+        """Stop the scheduler thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def stats_recorder(user_data, stats):
+    """Return a callback that credits a session's counted-down time to its user.
+
+    Call it with the session and the seconds it ran; as ``on_complete`` it
+    credits the whole duration.
+    """
+    def record(session, seconds=None):
+        log_type, user_type, _ = PHASES[session.session_type]
+        seconds = session.duration if seconds is None else seconds
+        user_data.update_user_stats(user_type, credited_minutes(seconds), username=session.username)
+        stats.record_session(log_type, seconds, session.started_at, username=session.username)
+    return record
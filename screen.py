@@ -0,0 +1,228 @@
+import os
+import re
+import shutil
+import sys
+import threading
+import unicodedata
+
+# Escape sequence, control character or run of printable text
+_TOKEN = re.compile(r'\x1b\[[0-9;?]*[ -/]*[@-~]|[\x00-\x1f\x7f]|[^\x00-\x1f\x7f]+')
+BLANK = (' ', '')  # (text, SGR style) of an empty cell
+RUN_GAP = 6  # unchanged cells bridged rather than paying for a cursor move
+LINE_DELAY = 0.01  # seconds completed lines may wait to share one write
+
+
+def _width(char):
+    """Terminal columns taken by a character."""
+    if unicodedata.combining(char) or unicodedata.category(char) in ('Mn', 'Me', 'Cf'):
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+
+
+class Screen:
+    """Stand-in for sys.stdout that redraws the terminal differentially.
+
+    After ``clear()`` everything written is applied to an in-memory grid of
+    cells instead of going to the terminal. On ``flush()`` (``print(...,
+    flush=True)`` or ``input()``) the grid is compared with what is on
+    screen and only the changed cells are sent, positioned with ANSI
+    escapes, in a single write. Like a line-buffered terminal, completed
+    lines also show up without a flush; a background thread renders them
+    after LINE_DELAY so a burst of prints still goes out as one write. A
+    frame taller than the terminal is written as plain text so it can
+    scroll; diffing resumes with the next clear.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.RLock()
+        self._lines_waiting = threading.Condition(self._lock)
+        self._pending = False  # completed lines not rendered yet
+        self._flusher = threading.Thread(target=self._flush_lines, daemon=True)
+        self._flusher.start()
+        self.active = False  # False: pass writes straight through
+        self.size = None
+        self.rows = []  # frame being built: rows of (text, style) cells
+        self.shown = []  # cells currently on the terminal
+        # Row -> first column whose on-screen content is unknown, e.g.
+        # where input() echoed what the user typed
+        self.uncertain = {}
+        self.row = self.col = 0
+        self.style = ''
+        self._sgr = []
+        self._raw = []  # text of the frame, for the scrolling fallback
+        self._bells = ''
+        self._repaint = True
+        self._changed = False  # written to since the last render
+
+    @classmethod
+    def install(cls):
+        """Wrap sys.stdout once; return the Screen or None for non-terminals."""
+        if isinstance(sys.stdout, cls):
+            return sys.stdout
+        if os.name == 'nt' or not sys.stdout.isatty() or os.environ.get('TERM') == 'dumb':
+            return None
+        sys.stdout = cls(sys.stdout)
+        return sys.stdout
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    def clear(self):
+        """Start a new, empty frame."""
+        with self._lock:
+            if not self.active:
+                self.active = True
+                self._repaint = True
+            self.rows = []
+            self.row = self.col = 0
+            self._raw = []
+            self._changed = True
+            self.size = shutil.get_terminal_size()
+
+    def write(self, text):
+        with self._lock:
+            if not self.active:
+                return self.stream.write(text)
+            self._raw.append(text)
+            self._changed = True
+            for token in _TOKEN.findall(text):
+                self._apply(token)
+            if '\n' in text and not self._pending:
+                self._pending = True
+                self._lines_waiting.notify()
+            return len(text)
+
+    def flush(self):
+        with self._lock:
+            self._pending = False
+            if self.active:
+                self._render()
+            self.stream.flush()
+
+    def _flush_lines(self):
+        """Render completed lines that nobody flushed."""
+        with self._lock:
+            while True:
+                while not self._pending:
+                    self._lines_waiting.wait()
+                # Give the rest of a burst of prints time to arrive
+                self._lines_waiting.wait(LINE_DELAY)
+                if self._pending:
+                    self.flush()
+
+    def _apply(self, token):
+        """Apply one token to the frame grid."""
+        if token.startswith('\x1b['):
+            if token.endswith('m'):
+                if token in ('\x1b[m', '\x1b[0m'):
+                    self._sgr = []
+                else:
+                    self._sgr = self._sgr[-3:] + [token]
+                self.style = ''.join(self._sgr)
+        elif token == '\n':
+            self.row += 1
+            self.col = 0
+        elif token == '\r':
+            self.col = 0
+        elif token == '\b':
+            self.col = max(0, self.col - 1)
+        elif token == '\t':
+            self.col = (self.col // 8 + 1) * 8
+        elif token == '\a':
+            self._bells += token
+        elif token[0] >= ' ' and token != '\x7f':
+            for char in token:
+                self._put(char)
+
+    def _line(self, row):
+        while len(self.rows) <= row:
+            self.rows.append([])
+        return self.rows[row]
+
+    def _put(self, char):
+        """Place a printable character at the cursor."""
+        width = _width(char)
+        cells = self._line(self.row)
+        if width == 0:
+            # Combining marks and variation selectors join the previous cell
+            index = self.col - 1
+            if index > 0 and cells[index][0] == '':
+                index -= 1
+            if 0 <= index < len(cells):
+                text, style = cells[index]
+                cells[index] = (text + char, style)
+            return
+        if self.col + width > self.size.columns:
+            self.row += 1
+            self.col = 0
+            cells = self._line(self.row)
+        cells.extend([BLANK] * (self.col + width - len(cells)))
+        cells[self.col] = (char, self.style)
+        if width == 2:
+            cells[self.col + 1] = ('', self.style)  # covered by the wide character
+        self.col += width
+
+    def _render(self):
+        """Send the difference between the frame and the screen in one write."""
+        size = shutil.get_terminal_size()
+        if size != self.size:
+            # Resizing reflows the terminal, so nothing on it can be trusted
+            self.size = size
+            self._repaint = True
+        if not (self._changed or self._repaint):
+            return
+        self._changed = False
+        out = []
+        if self._repaint:
+            out.append('\x1b[H\x1b[2J')
+            self.shown = []
+            self.uncertain = {}
+            self._repaint = False
+        if len(self.rows) >= size.lines:
+            if not out:
+                # Part of the frame may be on screen already; write all of it from the top
+                out.append('\x1b[0m\x1b[H\x1b[2J')
+            out.append(''.join(self._raw))
+            self.stream.write(''.join(out))
+            self.active = False
+            return
+        for row, cells in enumerate(self.rows):
+            self._diff_row(row, cells, out)
+        end = len(self.rows)
+        if len(self.shown) > end or any(row >= end for row in self.uncertain):
+            out.append(f'\x1b[0m\x1b[{end + 1};1H\x1b[J')
+        if out or self._bells:
+            out.append(f'\x1b[0m{self.style}\x1b[{self.row + 1};{self.col + 1}H{self._bells}')
+            self.stream.write(''.join(out))
+        self._bells = ''
+        self.shown = [list(cells) for cells in self.rows]
+        # input() may echo what is typed after the cursor
+        self.uncertain = {self.row: self.col}
+
+    def _diff_row(self, row, cells, out):
+        """Append the escapes that turn the shown row into ``cells``."""
+        old = self.shown[row] if row < len(self.shown) else []
+        unknown = self.uncertain.get(row)
+        changed = [i for i, cell in enumerate(cells)
+                   if (unknown is not None and i >= unknown)
+                   or (old[i] if i < len(old) else BLANK) != cell]
+        style = None
+        runs = []
+        for i in changed:
+            if runs and i - runs[-1][1] <= RUN_GAP:
+                runs[-1][1] = i
+            else:
+                runs.append([i, i])
+        for start, end in runs:
+            if cells[start][0] == '' and start > 0:
+                start -= 1  # redraw the wide character this cell belongs to
+            out.append(f'\x1b[{row + 1};{start + 1}H')
+            for text, cell_style in cells[start:end + 1]:
+                if cell_style != style:
+                    out.append('\x1b[0m' + cell_style)
+                    style = cell_style
+                out.append(text)
+        stale_tail = any(cell != BLANK for cell in old[len(cells):])
+        if stale_tail or unknown is not None:
+            out.append(f'\x1b[0m\x1b[{row + 1};{len(cells) + 1}H\x1b[K')
@@ -0,0 +1,171 @@
+import asyncio
+import os
+from animation import frames
+from keys import KeyReader, SESSION_KEYS
+
+# Session type -> (session-log type, UserData type, Config setting of its length in minutes)
+PHASES = {
+    'WORK': ('work', 'WORK', 'work_duration'),
+    'SHORT BREAK': ('short_break', 'SHORT_BREAK', 'short_break_duration'),
+    'LONG BREAK': ('long_break', 'LONG_BREAK', 'long_break_duration'),
+}
+
+
+def credited_minutes(seconds):
+    """Minutes a session is credited with in the profile: the time it actually ran."""
+    return round(seconds / 60, 1)
+
+
+class SessionRuntime:
+    """Runs Pomodoro phases as tasks on a single asyncio event loop.
+
+    The timer, the input reader, the renderer and the persistence worker
+    are coroutines that sleep until they have work: the timer until the
+    next second boundary, the key reader until stdin is readable, the renderer
+    until a tick asks for a redraw and the persistence worker until a
+    write is queued.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+        self.active_tasks = []
+        self.focus_task = None
+        self._redraw = None
+        self._writes = None
+
+    def run_phase(self, session_type, active_tasks, focus_task=None):
+        """Run one work or break phase to completion.
+
+        A work phase is recorded against ``focus_task`` and, if it runs to
+        its end, counts towards the task's estimate.
+        """
+        self.active_tasks = active_tasks
+        self.focus_task = focus_task
+        self.loop.run_until_complete(self._phase(session_type))
+
+    def close(self):
+        """Close the event loop."""
+        self.loop.close()
+
+    async def _phase(self, session_type):
+        timer = self.app.timer
+        self._redraw = asyncio.Event()
+        self._writes = asyncio.Queue()
+        workers = [
+            asyncio.create_task(self._render()),
+            asyncio.create_task(self._persist()),
+        ]
+        stop_input = self._start_input()
+        try:
+            await timer.run_async(session_type, on_tick=self._redraw.set)
+        finally:
+            stop_input()
+        log_type, user_type, _ = PHASES[session_type]
+        elapsed, started_at = timer.elapsed, timer.started_at
+        task_id = self.focus_task['id'] if self.focus_task and session_type == 'WORK' else None
+        self._queue_write(self.app.stats.record_session, log_type, elapsed, started_at, task_id)
+        if task_id is not None and timer.remaining <= 0:
+            self._queue_write(self.app.task_manager.record_pomodoro, self.app.current_user, task_id)
+        self._queue_write(self.app.user_data.update_user_stats, user_type,
+                          credited_minutes(elapsed))
+        await self._writes.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _render(self):
+        """Redraw the timer whenever a tick asks for it."""
+        while True:
+            await self._redraw.wait()
+            self._redraw.clear()
+            self.app.timer._display_time()
+
+    def _queue_write(self, func, *args):
+        """Queue a store update for the persistence worker."""
+        self._writes.put_nowait((func, args))
+
+    async def _persist(self):
+        """Apply queued store updates in order."""
+        while True:
+            func, args = await self._writes.get()
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"\nError saving session data: {e}")
+            finally:
+                self._writes.task_done()
+
+    def _start_input(self):
+        """Start reading session keys; return a function that stops it."""
+        keys = KeyReader()
+        keys.start()
+        fd = keys.fileno()
+        if fd is not None:
+            try:
+                self.loop.add_reader(fd, self._on_keys, keys)
+                return lambda: self._stop_input(keys, fd)
+            except (NotImplementedError, ValueError, OSError):
+                pass  # Not selectable (e.g. a regular file)
+        reader = asyncio.create_task(self._poll_console(keys))
+        return lambda: (reader.cancel(), keys.stop())
+
+    def _stop_input(self, keys, fd):
+        self.loop.remove_reader(fd)
+        keys.stop()
+
+    def _on_keys(self, keys):
+        """Dispatch every key that has arrived on stdin."""
+        pressed = keys.read_keys()
+        if not pressed:
+            # End of input: stop watching a descriptor that stays readable
+            self.loop.remove_reader(keys.fileno())
+        for key in pressed:
+            self.handle_key(key)
+
+    async def _poll_console(self, keys):
+        if os.name != 'nt':
+            return
+        while True:
+            for key in keys.read_keys():
+                self.handle_key(key)
+            await asyncio.sleep(0.05)
+
+    def handle_key(self, key):
+        """Run the session action bound to ``key``, if any."""
+        frames.skip()  # Any key cuts a running animation short
+        binding = SESSION_KEYS.get(key)
+        if binding is None:
+            return
+        action = binding[0]
+        timer = self.app.timer
+        if action == 'pause':
+            timer.pause()
+        elif action == 'resume':
+            timer.resume()
+        elif action == 'stop':
+            timer.stop()
+        elif action == 'tasks':
+            self.app.ui.display_tasks(self.active_tasks)
+        elif action == 'quit':
+            timer.stop()
+            self.app.running = False
+        elif action == 'help':
+            self.app.ui.display_session_commands()
+        elif action.startswith('complete_'):
+            position = int(action[len('complete_'):])
+            if len(self.active_tasks) >= position:
+                self._complete_task(self.active_tasks[position - 1]['id'])
+
+    def _complete_task(self, task_id):
+        app = self.app
+        self._queue_write(self._record_completion, app.current_user, task_id)
+        self.active_tasks = [task for task in self.active_tasks if task['id'] != task_id]
+        app.ui.display_tasks(self.active_tasks)
+
+    def _record_completion(self, username, task_id):
+        """Complete a task and count it, unless it was completed already."""
+        app = self.app
+        if app.task_manager.complete_task(username, task_id):
+            app.user_data.update_tasks_completed()
+            app.stats.record_task_completed()
@@ -1,95 +1,146 @@
-import json
-import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from prefix_index import PrefixSumIndex
+from storage import JsonSessionLog, JsonStatsStore, StatsArchive
 from ui import UI
 
 class Statistics:
-    def __init__(self):
-        self.stats_file = "stats.json"
-        self.ui = UI()
-        self.stats = {
-            'total_sessions': 0,
-            'total_time': 0,
-            'tasks_completed': 0,
-            'daily_stats': {},
-            'weekly_stats': {},
-            'productivity_score': 0
-        }
-        self.load_stats()
-
-    def load_stats(self):
-        """Load statistics from the JSON file."""
-        if os.path.exists(self.stats_file):
-            try:
-                with open(self.stats_file, 'r') as f:
-                    self.stats = json.load(f)
-            except json.JSONDecodeError:
-                self.stats = self._init_stats()
-
-    def save_stats(self):
-        """Save statistics to the JSON file."""
-        with open(self.stats_file, 'w') as f:
-            json.dump(self.stats, f, indent=4)
-
-    def _init_stats(self):
-        """Initialize statistics with default values."""
-        return {
-            'total_sessions': 0,
-            'total_time': 0,
-            'tasks_completed': 0,
-            'daily_stats': {},
-            'weekly_stats': {},
-            'productivity_score': 0
+    # Nominal lengths (in minutes) used when a caller only knows the session type
+    DEFAULT_DURATIONS = {'work': 25, 'short_break': 5, 'long_break': 15}
+
+    def __init__(self, store=None, log=None, retention_days=90, ui=None):
+        self.store = store if store is not None else JsonStatsStore()
+        # The session log is the source of truth; the store only holds
+        # rollups that can be rebuilt from it.
+        self.log = log if log is not None else JsonSessionLog()
+        # Days older than the retention window live in the cold archive
+        self.retention_days = retention_days
+        self.archive = StatsArchive()
+        self.ui = ui if ui is not None else UI()
+        self.current_user = ''
+        # Username -> (store data version, PrefixSumIndex) of the range indexes in use
+        self._indexes = {}
+
+    def set_user(self, username):
+        """Select the user whose statistics are recorded and displayed."""
+        self.current_user = username
+        self.apply_retention()
+
+    def apply_retention(self):
+        """Move daily detail older than the retention window into the archive."""
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        cutoff_day = cutoff.strftime('%Y-%m-%d')
+        expired = [(day, entry) for day, entry in self.store.daily(self.current_user)
+                   if day < cutoff_day]
+        if not expired:
+            return
+        self.archive.fold(self.current_user, expired)
+        self.store.drop_before(self.current_user, cutoff_day, cutoff.strftime('%Y-W%W'))
+
+    def _prefix_index(self, username):
+        """Return a user's range index, loading it only after the store changed elsewhere."""
+        version = self.store.data_version()
+        cached = self._indexes.get(username)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        index = self.store.load_prefix_index(username)
+        if index is None:
+            # Built once from the daily rollups, e.g. for data older than the index
+            index = PrefixSumIndex.from_daily(self.store.daily(username))
+            if len(index):
+                self.store.save_prefix_index(username, index)
+        self._indexes[username] = (self.store.data_version(), index)
+        return index
+
+    def _add_to_index(self, username, day, **amounts):
+        """Add to a user's range index and save the days that changed."""
+        index = self._prefix_index(username)
+        index.add(day, **amounts)
+        self.store.save_prefix_index(username, index, since=day)
+        self._indexes[username] = (self.store.data_version(), index)
+
+    def range_totals(self, start, end):
+        """Return sessions, time and tasks completed from ``start`` through ``end``.
+
+        Both ends are inclusive dates; the answer takes two lookups per field.
+        """
+        return self._prefix_index(self.current_user).totals(start, end)
+
+    def record_task_completed(self, count=1, username=None):
+        """Count completed tasks for today (for ``username``, default the current user)."""
+        username = self.current_user if username is None else username
+        now = datetime.now()
+        self._add_to_index(username, now.date(), tasks_completed=count)
+        self.store.add_tasks_completed(username, now.strftime('%Y-%m-%d'),
+                                       now.strftime('%Y-W%W'), count)
+
+    def update_stats(self, session_count, session_type, username=None):
+        """Update statistics after a session of nominal length."""
+        minutes = self.DEFAULT_DURATIONS.get(session_type, self.DEFAULT_DURATIONS['short_break'])
+        self.record_session(session_type, minutes * 60, username=username)
+
+    def record_session(self, session_type, duration, start=None, task_id=None, username=None):
+        """Log a finished session and update the rollups from it.
+
+        ``duration`` is the time actually spent, in seconds. ``username``
+        defaults to the current user.
+        """
+        if start is None:
+            start = datetime.now() - timedelta(seconds=duration)
+        event = {
+            'user': self.current_user if username is None else username,
+            'type': session_type,
+            'start': start.isoformat(timespec='seconds'),
+            'duration': int(round(duration)),
+            'task': task_id
         }
+        self.log.append(event)
+        self._apply_event(event)
+        return event
 
-    def update_stats(self, session_count, session_type):
-        """Update statistics after a session."""
-        today = datetime.now().strftime('%Y-%m-%d')
-        week = datetime.now().strftime('%Y-W%W')
-        
-        # Update daily stats
-        if today not in self.stats['daily_stats']:
-            self.stats['daily_stats'][today] = {
-                'sessions': 0,
-                'time': 0,
-                'tasks_completed': 0
-            }
-        
-        # Update weekly stats
-        if week not in self.stats['weekly_stats']:
-            self.stats['weekly_stats'][week] = {
-                'sessions': 0,
-                'time': 0,
-                'tasks_completed': 0
-            }
-        
-        # Update session counts
-        self.stats['total_sessions'] += 1
-        self.stats['daily_stats'][today]['sessions'] += 1
-        self.stats['weekly_stats'][week]['sessions'] += 1
-        
-        # Update time (in minutes)
-        time_spent = 25 if session_type == "work" else (15 if session_type == "long_break" else 5)
-        self.stats['total_time'] += time_spent
-        self.stats['daily_stats'][today]['time'] += time_spent
-        self.stats['weekly_stats'][week]['time'] += time_spent
-        
-        # Calculate productivity score
-        self._calculate_productivity_score()
-        
-        self.save_stats()
+    def _apply_event(self, event, save=True, index=True):
+        """Fold one session event into the daily, weekly and overall rollups."""
+        start = datetime.fromisoformat(event['start'])
+        minutes = round(event['duration'] / 60, 1)
+        if index:
+            self._add_to_index(event['user'], start.date(), sessions=1, time=minutes)
+        totals = self.store.totals(event['user'])
+        totals['total_sessions'] += 1
+        totals['total_time'] += minutes
+        self.store.add_session(event['user'], start.strftime('%Y-%m-%d'), start.strftime('%Y-W%W'),
+                               minutes, self._calculate_productivity_score(totals), save=save)
+
+    def rebuild(self):
+        """Recompute the current user's rollups from the session log.
 
-    def _calculate_productivity_score(self):
+        Task completions are not logged, so their counts are kept.
+        """
+        previous = self._prefix_index(self.current_user)
+        hot_days = {day for day, _ in self.store.daily(self.current_user)}
+        self.store.reset(self.current_user)
+        self.archive.reset(self.current_user)
+        for event in self.log.events(self.current_user):
+            self._apply_event(event, save=False, index=False)
+        daily = {day: dict(entry) for day, entry in self.store.daily(self.current_user)}
+        # Archived days lost their daily rows; the old index still has their completions
+        for day, count in previous.daily('tasks_completed'):
+            if day not in hot_days:
+                entry = daily.setdefault(day, {'sessions': 0, 'time': 0, 'tasks_completed': 0})
+                entry['tasks_completed'] = count
+        index = PrefixSumIndex.from_daily(daily.items())
+        self.store.save_prefix_index(self.current_user, index)
+        self._indexes[self.current_user] = (self.store.data_version(), index)
+        self.apply_retention()
+
+    def _calculate_productivity_score(self, totals):
         """Calculate the overall productivity score."""
-        if self.stats['total_sessions'] == 0:
-            self.stats['productivity_score'] = 0
-            return
+        if totals['total_sessions'] == 0:
+            return 0
         
         # Calculate based on completed tasks and time spent
-        task_completion_rate = (self.stats['tasks_completed'] / self.stats['total_sessions']) * 100
-        time_efficiency = min(100, (self.stats['total_time'] / (self.stats['total_sessions'] * 25)) * 100)
+        task_completion_rate = (totals['tasks_completed'] / totals['total_sessions']) * 100
+        time_efficiency = min(100, (totals['total_time'] / (totals['total_sessions'] * 25)) * 100)
         
-        self.stats['productivity_score'] = int((task_completion_rate + time_efficiency) / 2)
+        return int((task_completion_rate + time_efficiency) / 2)
 
     def display_statistics(self):
         """Display the statistics menu and show statistics."""
@@ -99,7 +150,13 @@ class Statistics:
             print("1. View Daily Statistics")
             print("2. View Weekly Statistics")
             print("3. View Overall Statistics")
-            print("4. Back to Main Menu")
+            print("4. Focus by Hour of Day")
+            print("5. Focus by Weekday")
+            print("6. Focus Trend (7-day average)")
+            print("7. Session Length Percentiles")
+            print("8. Totals for a Date Range")
+            print("9. Monthly and Yearly History")
+            print("10. Back to Main Menu")
             
             choice = self.ui.get_user_input("\nEnter your choice: ")
             
@@ -110,6 +167,18 @@ class Statistics:
             elif choice == '3':
                 self._display_overall_stats()
             elif choice == '4':
+                self._display_hourly_focus()
+            elif choice == '5':
+                self._display_weekday_focus()
+            elif choice == '6':
+                self._display_focus_trend()
+            elif choice == '7':
+                self._display_session_percentiles()
+            elif choice == '8':
+                self._display_range_totals()
+            elif choice == '9':
+                self._display_history()
+            elif choice == '10':
                 break
             else:
                 self.ui.display_error("Invalid choice. Please try again.")
@@ -121,7 +190,7 @@ class Statistics:
         self.ui.clear_screen()
         print("\nDaily Statistics:")
         print("=" * 50)
-        for date, stats in sorted(self.stats['daily_stats'].items(), reverse=True):
+        for date, stats in self.store.daily(self.current_user):
             print(f"\nDate: {date}")
             print(f"Sessions: {stats['sessions']}")
             print(f"Time Spent: {stats['time']} minutes")
@@ -132,7 +201,7 @@ class Statistics:
         self.ui.clear_screen()
         print("\nWeekly Statistics:")
         print("=" * 50)
-        for week, stats in sorted(self.stats['weekly_stats'].items(), reverse=True):
+        for week, stats in self.store.weekly(self.current_user):
             print(f"\nWeek: {week}")
             print(f"Sessions: {stats['sessions']}")
             print(f"Time Spent: {stats['time']} minutes")
@@ -143,7 +212,106 @@ class Statistics:
         self.ui.clear_screen()
         print("\nOverall Statistics:")
         print("=" * 50)
-        print(f"Total Sessions: {self.stats['total_sessions']}")
-        print(f"Total Time Spent: {self.stats['total_time']} minutes")
-        print(f"Total Tasks Completed: {self.stats['tasks_completed']}")
-        print(f"Productivity Score: {self.stats['productivity_score']}%") 
\ No newline at end of file
+        totals = self.store.totals(self.current_user)
+        print(f"Total Sessions: {totals['total_sessions']}")
+        print(f"Total Time Spent: {totals['total_time']} minutes")
+        print(f"Total Tasks Completed: {totals['tasks_completed']}")
+        print(f"Productivity Score: {totals['productivity_score']}%") 
+
+    def _display_history(self):
+        """Display monthly and yearly totals, including archived days."""
+        self.ui.clear_screen()
+        print("\nMonthly and Yearly History:")
+        print("=" * 50)
+        months = {month: dict(stats) for month, stats in self.archive.monthly(self.current_user)}
+        for day, stats in self.store.daily(self.current_user):
+            totals = months.setdefault(day[:7], {'sessions': 0, 'time': 0, 'tasks_completed': 0})
+            for field in totals:
+                totals[field] += stats[field]
+        years = {}
+        for month, stats in months.items():
+            totals = years.setdefault(month[:4], {'sessions': 0, 'time': 0, 'tasks_completed': 0})
+            for field in totals:
+                totals[field] += stats[field]
+        for label, buckets in (("Month", months), ("Year", years)):
+            for key, stats in sorted(buckets.items(), reverse=True):
+                print(f"\n{label}: {key}")
+                print(f"Sessions: {stats['sessions']}")
+                print(f"Time Spent: {stats['time']} minutes")
+                print(f"Tasks Completed: {stats['tasks_completed']}")
+
+    def _display_range_totals(self):
+        """Display totals between two dates entered by the user."""
+        self.ui.clear_screen()
+        print("\nTotals for a Date Range:")
+        print("=" * 50)
+        try:
+            start = date.fromisoformat(self.ui.get_user_input("Start date (YYYY-MM-DD): ").strip())
+            end = date.fromisoformat(self.ui.get_user_input("End date (YYYY-MM-DD): ").strip())
+        except ValueError:
+            self.ui.display_error("Please enter dates as YYYY-MM-DD.")
+            return
+        totals = self.range_totals(start, end)
+        print(f"\nSessions: {totals['sessions']}")
+        print(f"Time Spent: {totals['time']} minutes")
+        print(f"Tasks Completed: {totals['tasks_completed']}")
+
+    def _session_frame(self, days=90):
+        """Load the current user's recent work sessions as NumPy columns."""
+        try:
+            from analytics import SessionFrame
+        except ImportError:
+            self.ui.display_error("These reports need NumPy (pip install numpy).")
+            return None
+        since = (datetime.now() - timedelta(days=days)).date().isoformat()
+        frame = SessionFrame.from_events(self.log.events(self.current_user, since=since))
+        return frame.filter(session_type='work')
+
+    def _display_bars(self, labels, minutes):
+        """Print one bar per label, scaled to the largest value."""
+        peak = max(minutes.max(), 1) if len(minutes) else 1
+        for label, value in zip(labels, minutes):
+            print(f"{label:>10} {'█' * int(30 * value / peak):<30} {value:.0f} min")
+
+    def _display_hourly_focus(self):
+        """Display focus minutes per hour of day over the last 90 days."""
+        self.ui.clear_screen()
+        print("\nFocus by Hour of Day (last 90 days):")
+        print("=" * 50)
+        frame = self._session_frame()
+        if frame is not None:
+            _, minutes = frame.by_hour()
+            self._display_bars([f"{hour:02d}:00" for hour in range(24)], minutes)
+
+    def _display_weekday_focus(self):
+        """Display focus minutes per weekday over the last 90 days."""
+        self.ui.clear_screen()
+        print("\nFocus by Weekday (last 90 days):")
+        print("=" * 50)
+        frame = self._session_frame()
+        if frame is not None:
+            from analytics import WEEKDAYS
+            _, minutes = frame.by_weekday()
+            self._display_bars(WEEKDAYS, minutes)
+
+    def _display_focus_trend(self):
+        """Display the rolling 7-day average of daily focus minutes."""
+        self.ui.clear_screen()
+        print("\nFocus Trend, 7-day average (last 30 days):")
+        print("=" * 50)
+        frame = self._session_frame(days=37)
+        if frame is not None:
+            # Days since the last session count as zero, so the trend ends today
+            dates, averages = frame.rolling(window=7, end=date.today().isoformat())
+            self._display_bars([str(date) for date in dates[-30:]], averages[-30:])
+
+    def _display_session_percentiles(self):
+        """Display percentiles of focus session length."""
+        self.ui.clear_screen()
+        print("\nFocus Session Length (last 90 days):")
+        print("=" * 50)
+        frame = self._session_frame()
+        if frame is not None:
+            print(f"Sessions: {len(frame)}")
+            for percentile, minutes in frame.percentiles().items():
+                print(f"p{percentile}: {minutes:.1f} minutes")
@@ -0,0 +1,1307 @@
+import copy
+import gzip
+import json
+import os
+import sqlite3
+import threading
+from datetime import date
+from urllib.parse import quote, unquote
+from journal import Journal
+from locking import FileLock, lock_stats, merge_changes
+from planner import PLAN_DEFAULTS
+from prefix_index import FIELDS, PrefixSumIndex
+
+BACKENDS = ('json', 'sqlite')
+
+
+def _empty_stats():
+    """Return an empty statistics document for one user."""
+    return {
+        'total_sessions': 0,
+        'total_time': 0,
+        'tasks_completed': 0,
+        'daily_stats': {},
+        'weekly_stats': {},
+        'productivity_score': 0
+    }
+
+
+def _load_json(path):
+    """Load a JSON file, returning an empty dict if it is missing or corrupt."""
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+    return {}
+
+
+# ---------------------------------------------------------------- JSON files
+
+def _shard_path(directory, username):
+    """Return the shard file of a user inside a store directory."""
+    return os.path.join(directory, quote(username, safe='') + ".json")
+
+
+def _shard_users(directory):
+    """Return the users that have a shard in a store directory."""
+    if not os.path.isdir(directory):
+        return []
+    users = set()
+    for name in os.listdir(directory):
+        stem, ext = os.path.splitext(name)
+        # A journaled shard may not have been compacted into a snapshot yet
+        if ext in (".json", ".journal"):
+            users.add(unquote(stem))
+    return sorted(users)
+
+
+def _write_json(path, data):
+    """Write a JSON file atomically."""
+    tmp_file = path + ".tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_file, path)
+
+
+class _PlainShard:
+    """A shard that is rewritten in full on every mutation.
+
+    Like Journal, it reloads from disk before a mutation when another
+    process has written the shard since.
+    """
+
+    def __init__(self, snapshot_file, apply_record, decode=None, encode=None, rebase=None):
+        self.snapshot_file = snapshot_file
+        self.apply_record = apply_record
+        self.decode = decode or (lambda data: data)
+        self.encode = encode or (lambda state: state)
+        self.rebase = rebase
+        self._lock = FileLock(snapshot_file)
+        self.reloads = 0
+        with self._lock:
+            self.version = self._lock.version()
+            self.state = self.decode(_load_json(snapshot_file))
+
+    def _sync(self):
+        """Reload the state if another process wrote the shard; call under the lock."""
+        version = self._lock.version()
+        if version == self.version:
+            return False
+        self.state = self.decode(_load_json(self.snapshot_file))
+        self.version = version
+        self.reloads += 1
+        return True
+
+    def refresh(self):
+        """Pick up changes made by other processes."""
+        if self._lock.version() != self.version:
+            with self._lock:
+                self._sync()
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        with self._lock:
+            if self._sync():
+                lock_stats.record_conflict(self.snapshot_file)
+            for record in records:
+                if self.rebase is not None:
+                    self.rebase(self.state, record)
+                self.apply_record(self.state, record)
+            _write_json(self.snapshot_file, self.encode(self.state))
+            self.version = self._lock.bump()
+
+    def close(self):
+        self._lock.close()
+
+
+class TaskIndex:
+    """In-memory index over one user's tasks.
+
+    Tasks are kept in an id -> task map plus ordered active and completed
+    sets, so lookups and completions are O(1) and list reads are
+    proportional to the result. ``next_id`` only ever grows, so IDs are
+    never reused after a delete.
+    """
+
+    def __init__(self, username, tasks=(), next_id=1):
+        self.username = username
+        self.by_id = {}
+        self.active = {}
+        self.completed = {}
+        self.next_id = next_id
+        self._id_lock = threading.Lock()
+        for task in tasks:
+            self._insert(task)
+
+    def _insert(self, task):
+        for field, default in PLAN_DEFAULTS.items():
+            task.setdefault(field, default)
+        self.by_id[task['id']] = task
+        (self.completed if task['completed'] else self.active)[task['id']] = task
+        self.next_id = max(self.next_id, task['id'] + 1)
+
+    @classmethod
+    def from_json(cls, username, data):
+        """Build an index from a shard snapshot."""
+        if 'tasks' in data:
+            return cls(username, data['tasks'], data.get('next_id', 1))
+        # Shards written before the index held {username: [tasks]}
+        return cls(username, data.get(username, []))
+
+    def to_json(self):
+        """Return the shard snapshot of this index."""
+        return {'user': self.username, 'next_id': self.next_id, 'tasks': list(self.by_id.values())}
+
+    def allocate_id(self):
+        """Reserve and return the next task ID."""
+        return self.allocate_ids(1)[0]
+
+    def allocate_ids(self, count):
+        """Reserve ``count`` consecutive task IDs and return them as a range."""
+        with self._id_lock:
+            first = self.next_id
+            self.next_id += count
+            return range(first, first + count)
+
+    def apply(self, record):
+        """Apply a single mutation record."""
+        if record['op'] == 'add':
+            if record['task']['id'] not in self.by_id:
+                self._insert(record['task'])
+        elif record['op'] == 'complete':
+            task = self.active.pop(record['id'], None)
+            if task is not None:
+                task['completed'] = True
+                task['completed_at'] = record['at']
+                self.completed[task['id']] = task
+        elif record['op'] == 'update':
+            task = self.by_id.get(record['id'])
+            if task is not None:
+                task.update(record['fields'])
+        elif record['op'] == 'delete':
+            task = self.by_id.pop(record['id'], None)
+            if task is not None:
+                self.active.pop(task['id'], None)
+                self.completed.pop(task['id'], None)
+
+
+class JsonTaskStore:
+    """Tasks persisted as one JSON shard per user under ``tasks_dir``.
+
+    A shard is loaded the first time its user is touched and only that
+    shard is written when the user's tasks change. Each loaded shard is
+    held as a TaskIndex.
+    """
+
+    def __init__(self, tasks_dir=os.path.join("data", "tasks"), journaled=True,
+                 legacy_file="tasks.json"):
+        self.tasks_dir = tasks_dir
+        # In journaled mode each mutation appends one record instead of
+        # rewriting the whole shard.
+        self.journaled = journaled
+        self.shards = {}
+        if not os.path.isdir(self.tasks_dir):
+            self._split_legacy_file(legacy_file)
+
+    def _split_legacy_file(self, legacy_file):
+        """Split a single-file tasks.json into per-user shards."""
+        os.makedirs(self.tasks_dir, exist_ok=True)
+        if not os.path.exists(legacy_file):
+            return
+
+        def decode(data):
+            return {username: TaskIndex(username, tasks) for username, tasks in data.items()}
+
+        def apply_record(indexes, record):
+            indexes.setdefault(record['user'], TaskIndex(record['user'])).apply(record)
+
+        legacy = Journal(legacy_file, apply_record, decode=decode)
+        legacy.close()
+        for username, index in legacy.state.items():
+            _write_json(_shard_path(self.tasks_dir, username), index.to_json())
+
+    def _shard(self, username):
+        """Return the loaded shard of a user, loading it on first use."""
+        shard = self.shards.get(username)
+        if shard is None:
+            shard_cls = Journal if self.journaled else _PlainShard
+            shard = shard_cls(_shard_path(self.tasks_dir, username), self._apply_record,
+                              decode=lambda data: TaskIndex.from_json(username, data),
+                              encode=TaskIndex.to_json, rebase=self._rebase_record)
+            self.shards[username] = shard
+        return shard
+
+    def _index(self, username):
+        """Return the TaskIndex of a user, with changes from other processes."""
+        shard = self._shard(username)
+        shard.refresh()
+        return shard.state
+
+    @staticmethod
+    def _apply_record(index, record):
+        """Apply a single mutation record to a user's index."""
+        index.apply(record)
+
+    @staticmethod
+    def _rebase_record(index, record):
+        """Give a new task a fresh ID if another process already used its ID."""
+        if record['op'] == 'add' and record['task']['id'] in index.by_id:
+            record['task']['id'] = index.allocate_id()
+
+    def _commit(self, record):
+        """Apply a mutation record and persist it to the user's shard."""
+        self._shard(record['user']).append(record)
+
+    def all_tasks(self):
+        """Return every user's tasks, loading all shards."""
+        return {username: self.user_tasks(username) for username in _shard_users(self.tasks_dir)}
+
+    def data_version(self, username):
+        """Return a token that changes when another process writes a user's shard.
+
+        Like SQLite's data_version, this store's own writes leave it alone.
+        """
+        shard = self._shard(username)
+        shard.refresh()
+        return shard.reloads
+
+    def user_tasks(self, username):
+        """Return all tasks of a user."""
+        return list(self._index(username).by_id.values())
+
+    def active_tasks(self, username):
+        """Return the incomplete tasks of a user."""
+        return list(self._index(username).active.values())
+
+    def completed_tasks(self, username):
+        """Return the completed tasks of a user."""
+        return list(self._index(username).completed.values())
+
+    def find(self, username, task_id):
+        """Return a task by ID, or None."""
+        return self._index(username).by_id.get(task_id)
+
+    def allocate_id(self, username):
+        """Reserve and return the ID for a new task of a user."""
+        return self._index(username).allocate_id()
+
+    def allocate_ids(self, username, count):
+        """Reserve ``count`` IDs for new tasks of a user, as a range."""
+        return self._index(username).allocate_ids(count)
+
+    def add(self, username, task):
+        """Store a new task."""
+        self._commit({'op': 'add', 'user': username, 'task': task})
+
+    def add_many(self, username, tasks):
+        """Store several new tasks with a single write."""
+        self._shard(username).append_many([{'op': 'add', 'user': username, 'task': task}
+                                           for task in tasks])
+
+    def complete(self, username, task_id, completed_at):
+        """Mark a task as completed; return False if it does not exist or already was."""
+        task = self.find(username, task_id)
+        if task is None or task['completed']:
+            return False
+        self._commit({'op': 'complete', 'user': username, 'id': task_id, 'at': completed_at})
+        return True
+
+    def update(self, username, task_id, fields):
+        """Change planning fields of a task; return False if it does not exist."""
+        if self.find(username, task_id) is None:
+            return False
+        self._commit({'op': 'update', 'user': username, 'id': task_id, 'fields': fields})
+        return True
+
+    def delete(self, username, task_id):
+        """Delete a task; return False if it does not exist."""
+        if self.find(username, task_id) is None:
+            return False
+        self._commit({'op': 'delete', 'user': username, 'id': task_id})
+        return True
+
+    def delete_many(self, username, task_ids):
+        """Delete several tasks with a single write; missing IDs are ignored."""
+        self._shard(username).append_many([{'op': 'delete', 'user': username, 'id': task_id}
+                                           for task_id in task_ids])
+
+    def close(self):
+        """Flush pending work."""
+        for shard in self.shards.values():
+            shard.close()
+
+
+class TaskArchive:
+    """Compressed, append-only archive of completed tasks.
+
+    Tasks are grouped into one gzip segment per user and month of
+    completion; every archive pass appends a new gzip member, so nothing
+    already written is rewritten. Date-range reads open only the segments
+    that can overlap the range.
+    """
+
+    def __init__(self, archive_dir=os.path.join("data", "archive", "tasks")):
+        self.archive_dir = archive_dir
+
+    def _user_dir(self, username):
+        return os.path.join(self.archive_dir, quote(username, safe=''))
+
+    def append(self, username, tasks):
+        """Append completed tasks to their monthly segments.
+
+        Tasks already in their segment, e.g. from a pass that was
+        interrupted before deleting them from the store, are skipped.
+        """
+        by_month = {}
+        for task in tasks:
+            by_month.setdefault(task['completed_at'][:7], []).append(task)
+        user_dir = self._user_dir(username)
+        os.makedirs(user_dir, exist_ok=True)
+        for month, month_tasks in by_month.items():
+            archived = {(task['id'], task.get('created_at'))
+                        for task in self.tasks(username, month + '-01', month + '-31')}
+            month_tasks = [task for task in month_tasks
+                           if (task['id'], task.get('created_at')) not in archived]
+            if not month_tasks:
+                continue
+            lines = "".join(json.dumps(task, separators=(',', ':')) + "\n" for task in month_tasks)
+            with gzip.open(os.path.join(user_dir, month + ".jsonl.gz"), 'at') as f:
+                f.write(lines)
+
+    def tasks(self, username, start=None, end=None):
+        """Yield archived tasks completed from ``start`` through ``end`` (ISO dates)."""
+        user_dir = self._user_dir(username)
+        if not os.path.isdir(user_dir):
+            return
+        for name in sorted(os.listdir(user_dir)):
+            month = name[:7]
+            if (start and month < start[:7]) or (end and month > end[:7]):
+                continue
+            with gzip.open(os.path.join(user_dir, name), 'rt') as f:
+                for line in f:
+                    task = json.loads(line)
+                    day = task['completed_at'][:10]
+                    if (start and day < start) or (end and day > end):
+                        continue
+                    yield task
+
+
+def _earned_xp(profile):
+    """Experience a profile earned in total, including what level-ups used up."""
+    return profile['experience'] + sum(level * 100 for level in range(1, profile['level']))
+
+
+def _merge_profile(base, ours, theirs):
+    """Merge two processes' changes to a user profile.
+
+    Counters add up as in merge_changes. Level and experience are
+    recomputed from the combined experience earned, and the streak and
+    story progress keep the larger value when both sides changed them.
+    An empty ``base`` stands for a profile both sides created.
+    """
+    merged = merge_changes(base, ours, theirs)
+    if all('level' in profile and 'experience' in profile for profile in (ours, theirs)):
+        experience = _earned_xp(ours) + _earned_xp(theirs) - (_earned_xp(base) if base else 0)
+        level = 1
+        while experience >= level * 100:
+            experience -= level * 100
+            level += 1
+        merged['level'], merged['experience'] = level, experience
+    for field in ('streak', 'story_progress'):
+        if field in ours and field in theirs and ours[field] != base.get(field, 0) != theirs[field]:
+            merged[field] = max(ours[field], theirs[field])
+    return merged
+
+
+class JsonUserStore:
+    """User profiles persisted as one JSON shard per user under ``users_dir``.
+
+    Each shard has a FileLock. When another process saved a profile after
+    it was read here, ``put`` merges this process's changes into the saved
+    version instead of overwriting it.
+    """
+
+    def __init__(self, users_dir=os.path.join("data", "users"), legacy_file="user_data.json"):
+        self.users_dir = users_dir
+        self.user_data = {}
+        self._locks = {}
+        self._bases = {}  # username -> profile as last read or written
+        self._versions = {}
+        if not os.path.isdir(self.users_dir):
+            # Split a single-file user_data.json into per-user shards.
+            os.makedirs(self.users_dir, exist_ok=True)
+            for username, profile in _load_json(legacy_file).items():
+                _write_json(_shard_path(self.users_dir, username), profile)
+
+    def all_users(self):
+        """Return every user's profile, loading all shards."""
+        return {username: self.get(username) for username in _shard_users(self.users_dir)}
+
+    def _lock(self, username):
+        lock = self._locks.get(username)
+        if lock is None:
+            lock = self._locks[username] = FileLock(_shard_path(self.users_dir, username))
+        return lock
+
+    def get(self, username):
+        """Return a user's profile, or None."""
+        if username not in self.user_data:
+            path = _shard_path(self.users_dir, username)
+            if not os.path.exists(path):
+                return None
+            lock = self._lock(username)
+            with lock:
+                self.user_data[username] = _load_json(path)
+                self._bases[username] = copy.deepcopy(self.user_data[username])
+                self._versions[username] = lock.version()
+        return self.user_data[username]
+
+    def data_version(self, username):
+        """Return the version of a user's shard as saved by any process."""
+        return self._lock(username).version()
+
+    def refresh(self, username):
+        """Return a user's profile, re-read if another process saved it since."""
+        lock = self._lock(username)
+        with lock:
+            if lock.version() != self._versions.get(username, 0):
+                self.user_data.pop(username, None)
+            return self.get(username)
+
+    def put(self, username, profile):
+        """Store a user's profile, writing only that user's shard.
+
+        Returns the profile as stored, which includes changes another
+        process saved meanwhile.
+        """
+        path = _shard_path(self.users_dir, username)
+        lock = self._lock(username)
+        with lock:
+            if lock.version() != self._versions.get(username, 0):
+                lock_stats.record_conflict(path)
+                theirs = _load_json(path)
+                if theirs:
+                    profile = _merge_profile(self._bases.get(username, {}), profile, theirs)
+            _write_json(path, profile)
+            self._versions[username] = lock.bump()
+            self._bases[username] = copy.deepcopy(profile)
+        self.user_data[username] = profile
+        return profile
+
+    def close(self):
+        """Close the lock files."""
+        for lock in self._locks.values():
+            lock.close()
+
+
+class JsonStatsStore:
+    """Per-user statistics persisted to stats.json.
+
+    Saves take a FileLock on the file. If another process saved it since it
+    was read here, the changes made here are merged into its version: the
+    counters of both add up.
+    """
+
+    def __init__(self, stats_file="stats.json"):
+        self.stats_file = stats_file
+        self._lock = FileLock(stats_file)
+        with self._lock:
+            self.version = self._lock.version()
+            self.stats = self._read()
+        self._base = copy.deepcopy(self.stats)  # stats as last read or written
+
+    def _read(self):
+        stats = _load_json(self.stats_file)
+        if 'daily_stats' in stats:
+            # Older files held a single global document.
+            stats = {'': stats}
+        return stats
+
+    def _user(self, username):
+        return self.stats.setdefault(username, _empty_stats())
+
+    def save(self):
+        """Write stats.json, merging in what other processes saved meanwhile."""
+        with self._lock:
+            if self._lock.version() != self.version:
+                lock_stats.record_conflict(self.stats_file)
+                merged = self._merge(self._read())
+                self.stats.clear()
+                self.stats.update(merged)
+            _write_json(self.stats_file, self.stats)
+            self.version = self._lock.bump()
+        self._base = copy.deepcopy(self.stats)
+
+    def refresh(self):
+        """Merge in what other processes saved since stats.json was last read or written here."""
+        with self._lock:
+            version = self._lock.version()
+            if version == self.version:
+                return
+            theirs = self._read()
+            base = copy.deepcopy(theirs)
+            merged = self._merge(theirs)
+            self.stats.clear()
+            self.stats.update(merged)
+            self.version = version
+        self._base = base
+
+    def _merge(self, theirs):
+        """Merge the changes made here since the last save into ``theirs``."""
+        merged = merge_changes(self._base, self.stats, theirs)
+        for username, stats in merged.items():
+            if username in self.stats and username in theirs:
+                # A score, not a counter: the latest one wins
+                stats['productivity_score'] = self.stats[username]['productivity_score']
+            indexes = [side.get(username, {}).get('extra', {}).get('prefix_index')
+                       for side in (self._base, self.stats, theirs)]
+            base_index, our_index, their_index = indexes
+            if our_index is None or our_index == base_index or their_index == base_index:
+                continue
+            # Cumulative sums cannot be merged value by value; add the
+            # other side's daily changes to this side's index instead
+            index = PrefixSumIndex.from_json(copy.deepcopy(our_index))
+            base_days = self._base.get(username, {}).get('daily_stats', {})
+            for day, entry in theirs.get(username, {}).get('daily_stats', {}).items():
+                before = base_days.get(day, {})
+                amounts = {field: entry.get(field, 0) - before.get(field, 0) for field in FIELDS}
+                if any(amounts.values()):
+                    index.add(date.fromisoformat(day), **amounts)
+            stats['extra']['prefix_index'] = index.to_json()
+        return merged
+
+    def all_stats(self):
+        """Return every user's statistics document."""
+        return self.stats
+
+    def totals(self, username):
+        """Return the overall counters of a user."""
+        stats = self._user(username)
+        return {key: stats[key] for key in
+                ('total_sessions', 'total_time', 'tasks_completed', 'productivity_score')}
+
+    def add_session(self, username, day, week, minutes, productivity_score, save=True):
+        """Count one session of ``minutes`` in the daily, weekly and overall totals.
+
+        ``save=False`` defers the write to a later save() call.
+        """
+        stats = self._user(username)
+        for bucket, key in ((stats['daily_stats'], day), (stats['weekly_stats'], week)):
+            entry = bucket.setdefault(key, {'sessions': 0, 'time': 0, 'tasks_completed': 0})
+            entry['sessions'] += 1
+            entry['time'] += minutes
+        stats['total_sessions'] += 1
+        stats['total_time'] += minutes
+        stats['productivity_score'] = productivity_score
+        if save:
+            self.save()
+
+    def add_tasks_completed(self, username, day, week, count, save=True):
+        """Count completed tasks in the daily, weekly and overall totals."""
+        stats = self._user(username)
+        for bucket, key in ((stats['daily_stats'], day), (stats['weekly_stats'], week)):
+            entry = bucket.setdefault(key, {'sessions': 0, 'time': 0, 'tasks_completed': 0})
+            entry['tasks_completed'] += count
+        stats['tasks_completed'] += count
+        if save:
+            self.save()
+
+    def reset(self, username):
+        """Drop a user's session rollups so they can be rebuilt.
+
+        Task completions are not part of the session log, so they are kept.
+        """
+        stats = self._user(username)
+        for bucket in (stats['daily_stats'], stats['weekly_stats']):
+            for entry in bucket.values():
+                entry['sessions'] = 0
+                entry['time'] = 0
+        stats['total_sessions'] = 0
+        stats['total_time'] = 0
+        stats['productivity_score'] = 0
+
+    def drop_before(self, username, day, week):
+        """Remove daily rows before ``day`` and weekly rows before ``week``."""
+        stats = self._user(username)
+        for bucket, cutoff in ((stats['daily_stats'], day), (stats['weekly_stats'], week)):
+            for key in [key for key in bucket if key < cutoff]:
+                del bucket[key]
+        self.save()
+
+    def get_extra(self, username, key):
+        """Return an auxiliary document saved with a user's statistics, or None."""
+        return self._user(username).get('extra', {}).get(key)
+
+    def put_extra(self, username, key, value, save=True):
+        """Save an auxiliary document with a user's statistics."""
+        self._user(username).setdefault('extra', {})[key] = value
+        if save:
+            self.save()
+
+    def data_version(self):
+        """Pick up other processes' saves; return a token that changes with every save or merge."""
+        self.refresh()
+        return self.version
+
+    def load_prefix_index(self, username):
+        """Return a user's saved PrefixSumIndex, or None."""
+        data = self.get_extra(username, 'prefix_index')
+        return PrefixSumIndex.from_json(data) if data is not None else None
+
+    def save_prefix_index(self, username, index, since=None):
+        """Keep ``index`` as a user's prefix index.
+
+        The stored document shares the index's lists, so an index changed
+        from day ``since`` on is written with the next save(); a whole new
+        index (``since`` None) is saved right away.
+        """
+        self.put_extra(username, 'prefix_index', index.to_json(), save=since is None)
+
+    def daily(self, username):
+        """Return (date, stats) pairs, newest first."""
+        return sorted(self._user(username)['daily_stats'].items(), reverse=True)
+
+    def weekly(self, username):
+        """Return (week, stats) pairs, newest first."""
+        return sorted(self._user(username)['weekly_stats'].items(), reverse=True)
+
+    def close(self):
+        """Close the lock file."""
+        self._lock.close()
+
+
+_START_FIELD = '"start":"'  # How a session's start time appears in a log line
+
+
+class JsonSessionLog:
+    """Append-only log of finished sessions, one compact JSON line each.
+
+    Each line goes out in a single append-mode write, so several processes
+    can share the log without locking.
+    """
+
+    def __init__(self, log_file=os.path.join("data", "sessions.log")):
+        self.log_file = log_file
+        self._lock = threading.Lock()
+        self._handle = None
+
+    def append(self, event):
+        """Append one session event."""
+        with self._lock:
+            if self._handle is None:
+                os.makedirs(os.path.dirname(self.log_file) or ".", exist_ok=True)
+                self._handle = open(self.log_file, 'a')
+            self._handle.write(json.dumps(event, separators=(',', ':')) + "\n")
+            self._handle.flush()
+
+    def events(self, username=None, since=None):
+        """Yield the logged events, oldest first, optionally for one user.
+
+        ``since`` (an ISO date or datetime) skips sessions that started
+        before it; their lines are passed over without being decoded.
+        """
+        if not os.path.exists(self.log_file):
+            return
+        with open(self.log_file, 'r') as f:
+            for line in f:
+                if since is not None:
+                    position = line.find(_START_FIELD)
+                    if position >= 0:
+                        position += len(_START_FIELD)
+                        if line[position:line.find('"', position)] < since:
+                            continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if username is None or event['user'] == username:
+                    yield event
+
+    def close(self):
+        """Close the log file."""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+
+class StatsArchive:
+    """Cold storage of old statistics, downsampled to months and years.
+
+    The file is only read when a long-range report or a retention pass
+    needs it.
+    """
+
+    def __init__(self, archive_file="stats_archive.json"):
+        self.archive_file = archive_file
+        self._data = None
+        self._lock = FileLock(archive_file)
+        self._version = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._version = self._lock.version()
+            self._data = _load_json(self.archive_file)
+        return self._data
+
+    def _sync(self):
+        """Reread the file if another process changed it; call under the lock."""
+        if self._data is not None and self._lock.version() != self._version:
+            self._data = None
+
+    def fold(self, username, daily):
+        """Add (ISO date, stats) rows to the monthly and yearly buckets."""
+        with self._lock:
+            self._sync()
+            user = self.data.setdefault(username, {'monthly': {}, 'yearly': {}})
+            for day, entry in daily:
+                for bucket, key in ((user['monthly'], day[:7]), (user['yearly'], day[:4])):
+                    totals = bucket.setdefault(key, {'sessions': 0, 'time': 0, 'tasks_completed': 0})
+                    for field in totals:
+                        totals[field] += entry.get(field, 0)
+            _write_json(self.archive_file, self.data)
+            self._version = self._lock.bump()
+
+    def reset(self, username):
+        """Drop a user's archived session totals so they can be rebuilt.
+
+        Task completions are not part of the session log, so they are kept.
+        """
+        with self._lock:
+            self._sync()
+            user = self.data.get(username)
+            if user is None:
+                return
+            for bucket in (user['monthly'], user['yearly']):
+                for totals in bucket.values():
+                    totals['sessions'] = 0
+                    totals['time'] = 0
+            _write_json(self.archive_file, self.data)
+            self._version = self._lock.bump()
+
+    def monthly(self, username):
+        """Return (YYYY-MM, stats) pairs, newest first."""
+        return sorted(self.data.get(username, {}).get('monthly', {}).items(), reverse=True)
+
+    def yearly(self, username):
+        """Return (YYYY, stats) pairs, newest first."""
+        return sorted(self.data.get(username, {}).get('yearly', {}).items(), reverse=True)
+
+
+# ------------------------------------------------------------------- SQLite
+
+class SqliteDatabase:
+    """Shared SQLite connection in WAL mode."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS tasks (
+            username TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT,
+            completed_at TEXT,
+            priority INTEGER NOT NULL DEFAULT 2,
+            estimate INTEGER NOT NULL DEFAULT 1,
+            due TEXT,
+            pomodoros INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_user_id ON tasks (username, id);
+        CREATE INDEX IF NOT EXISTS idx_tasks_user_completed ON tasks (username, completed);
+        CREATE TABLE IF NOT EXISTS task_counters (username TEXT PRIMARY KEY, next_id INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, profile TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS stats_totals (
+            username TEXT PRIMARY KEY,
+            total_sessions INTEGER NOT NULL DEFAULT 0,
+            total_time REAL NOT NULL DEFAULT 0,
+            tasks_completed INTEGER NOT NULL DEFAULT 0,
+            productivity_score INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS stats_daily (
+            username TEXT NOT NULL,
+            date TEXT NOT NULL,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            time REAL NOT NULL DEFAULT 0,
+            tasks_completed INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_stats_daily_user_date ON stats_daily (username, date);
+        CREATE TABLE IF NOT EXISTS stats_prefix (
+            username TEXT NOT NULL,
+            day INTEGER NOT NULL,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            time REAL NOT NULL DEFAULT 0,
+            tasks_completed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (username, day)
+        );
+        CREATE TABLE IF NOT EXISTS stats_extra (
+            username TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (username, key)
+        );
+        CREATE TABLE IF NOT EXISTS sessions (
+            username TEXT NOT NULL,
+            type TEXT NOT NULL,
+            start TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            task INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_user_start ON sessions (username, start);
+    """
+    # Columns added to tables after their first release, for older databases
+    ADDED_COLUMNS = {
+        'tasks': {
+            'priority': "INTEGER NOT NULL DEFAULT 2",
+            'estimate': "INTEGER NOT NULL DEFAULT 1",
+            'due': "TEXT",
+            'pomodoros': "INTEGER NOT NULL DEFAULT 0",
+        },
+    }
+
+    def __init__(self, db_file="prodomo.db"):
+        self.db_file = db_file
+        # The session key handler runs on its own thread, so the connection
+        # is shared and every statement is serialized through the lock.
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        for table, columns in self.ADDED_COLUMNS.items():
+            existing = {row['name'] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            for column, definition in columns.items():
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def execute(self, sql, params=()):
+        """Run a statement and return all result rows."""
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def data_version(self):
+        """Token that changes when another connection commits to the database."""
+        return self.execute("PRAGMA data_version")[0][0]
+
+    def transaction(self, statements):
+        """Run several (sql, params) statements atomically."""
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                for sql, params in statements:
+                    self.conn.execute(sql, params)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def get_meta(self, key):
+        """Return a value from the meta table, or None."""
+        rows = self.execute("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0]['value'] if rows else None
+
+    def set_meta(self, key, value):
+        """Store a value in the meta table."""
+        self.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        """Close the connection."""
+        with self.lock:
+            self.conn.close()
+
+
+def _task_from_row(row):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'completed': bool(row['completed']),
+        'created_at': row['created_at'],
+        'completed_at': row['completed_at'],
+        'priority': row['priority'],
+        'estimate': row['estimate'],
+        'due': row['due'],
+        'pomodoros': row['pomodoros']
+    }
+
+
+_INSERT_TASK = ("INSERT OR REPLACE INTO tasks (username, id, name, completed, created_at, completed_at, "
+                "priority, estimate, due, pomodoros) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def _task_params(username, task):
+    """Parameters of ``_INSERT_TASK`` for a task."""
+    return (username, task['id'], task['name'], int(task['completed']),
+            task.get('created_at'), task.get('completed_at'),
+            *(task.get(field, default) for field, default in PLAN_DEFAULTS.items()))
+
+
+class SqliteTaskStore:
+    """Tasks stored in the SQLite ``tasks`` table."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def user_tasks(self, username):
+        """Return all tasks of a user."""
+        rows = self.db.execute("SELECT * FROM tasks WHERE username = ? ORDER BY id", (username,))
+        return [_task_from_row(row) for row in rows]
+
+    def data_version(self, username):
+        """Token that changes when another connection commits to the database."""
+        return self.db.data_version()
+
+    def active_tasks(self, username):
+        """Return the incomplete tasks of a user."""
+        rows = self.db.execute(
+            "SELECT * FROM tasks WHERE username = ? AND completed = 0 ORDER BY id", (username,))
+        return [_task_from_row(row) for row in rows]
+
+    def completed_tasks(self, username):
+        """Return the completed tasks of a user."""
+        rows = self.db.execute(
+            "SELECT * FROM tasks WHERE username = ? AND completed = 1 ORDER BY id", (username,))
+        return [_task_from_row(row) for row in rows]
+
+    def find(self, username, task_id):
+        """Return a task by ID, or None."""
+        rows = self.db.execute(
+            "SELECT * FROM tasks WHERE username = ? AND id = ?", (username, task_id))
+        return _task_from_row(rows[0]) if rows else None
+
+    def allocate_id(self, username):
+        """Reserve and return the ID for a new task of a user."""
+        return self.allocate_ids(username, 1)[0]
+
+    def allocate_ids(self, username, count):
+        """Reserve ``count`` IDs for new tasks of a user, as a range."""
+        # The counter starts after the highest ID imported for the user and
+        # only grows, so deleted IDs are never handed out again.
+        rows = self.db.execute(
+            "INSERT INTO task_counters (username, next_id) "
+            "SELECT ?, COALESCE(MAX(id), 0) + 1 + ? FROM tasks WHERE username = ? "
+            "ON CONFLICT (username) DO UPDATE SET next_id = next_id + ? "
+            "RETURNING next_id - ? AS first_id", (username, count, username, count, count))
+        first = rows[0]['first_id']
+        return range(first, first + count)
+
+    def add(self, username, task):
+        """Store a new task."""
+        self.add_many(username, [task])
+
+    def add_many(self, username, tasks):
+        """Store several new tasks in one transaction."""
+        self.db.transaction((_INSERT_TASK, _task_params(username, task)) for task in tasks)
+
+    def complete(self, username, task_id, completed_at):
+        """Mark a task as completed; return False if it does not exist or already was."""
+        with self.db.lock:
+            cursor = self.db.conn.execute(
+                "UPDATE tasks SET completed = 1, completed_at = ? "
+                "WHERE username = ? AND id = ? AND completed = 0",
+                (completed_at, username, task_id))
+            return cursor.rowcount > 0
+
+    def update(self, username, task_id, fields):
+        """Change planning fields of a task; return False if it does not exist."""
+        columns = [column for column in fields if column in PLAN_DEFAULTS]
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        with self.db.lock:
+            cursor = self.db.conn.execute(
+                f"UPDATE tasks SET {assignments} WHERE username = ? AND id = ?",
+                (*(fields[column] for column in columns), username, task_id))
+            return cursor.rowcount > 0
+
+    def delete(self, username, task_id):
+        """Delete a task; return False if it does not exist."""
+        with self.db.lock:
+            cursor = self.db.conn.execute(
+                "DELETE FROM tasks WHERE username = ? AND id = ?", (username, task_id))
+            return cursor.rowcount > 0
+
+    def delete_many(self, username, task_ids):
+        """Delete several tasks in one transaction; missing IDs are ignored."""
+        self.db.transaction(("DELETE FROM tasks WHERE username = ? AND id = ?", (username, task_id))
+                            for task_id in task_ids)
+
+    def close(self):
+        """Flush pending work."""
+
+
+class SqliteUserStore:
+    """User profiles stored in the SQLite ``users`` table."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def get(self, username):
+        """Return a user's profile, or None."""
+        rows = self.db.execute("SELECT profile FROM users WHERE username = ?", (username,))
+        return json.loads(rows[0]['profile']) if rows else None
+
+    def refresh(self, username):
+        """Return a user's profile as currently stored."""
+        return self.get(username)
+
+    def put(self, username, profile):
+        """Store a user's profile and return it."""
+        self.db.execute("INSERT OR REPLACE INTO users (username, profile) VALUES (?, ?)",
+                        (username, json.dumps(profile, separators=(',', ':'))))
+        return profile
+
+    def close(self):
+        """Flush pending work."""
+
+
+class SqliteStatsStore:
+    """Per-user statistics stored in the SQLite ``stats_*`` tables."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def totals(self, username):
+        """Return the overall counters of a user."""
+        rows = self.db.execute("SELECT * FROM stats_totals WHERE username = ?", (username,))
+        if not rows:
+            stats = _empty_stats()
+            return {key: stats[key] for key in
+                    ('total_sessions', 'total_time', 'tasks_completed', 'productivity_score')}
+        row = rows[0]
+        return {key: row[key] for key in
+                ('total_sessions', 'total_time', 'tasks_completed', 'productivity_score')}
+
+    def add_session(self, username, day, week, minutes, productivity_score, save=True):
+        """Count one session of ``minutes`` in the daily and overall totals.
+
+        Every call is committed on its own, so ``save`` has no effect here.
+        """
+        self.db.transaction([
+            ("INSERT INTO stats_daily (username, date, sessions, time) VALUES (?, ?, 1, ?) "
+             "ON CONFLICT (username, date) DO UPDATE SET "
+             "sessions = sessions + 1, time = time + excluded.time",
+             (username, day, minutes)),
+            ("INSERT INTO stats_totals (username, total_sessions, total_time, productivity_score) "
+             "VALUES (?, 1, ?, ?) ON CONFLICT (username) DO UPDATE SET "
+             "total_sessions = total_sessions + 1, total_time = total_time + excluded.total_time, "
+             "productivity_score = excluded.productivity_score",
+             (username, minutes, productivity_score)),
+        ])
+
+    def add_tasks_completed(self, username, day, week, count, save=True):
+        """Count completed tasks in the daily and overall totals."""
+        self.db.transaction([
+            ("INSERT INTO stats_daily (username, date, tasks_completed) VALUES (?, ?, ?) "
+             "ON CONFLICT (username, date) DO UPDATE SET "
+             "tasks_completed = tasks_completed + excluded.tasks_completed",
+             (username, day, count)),
+            ("INSERT INTO stats_totals (username, tasks_completed) VALUES (?, ?) "
+             "ON CONFLICT (username) DO UPDATE SET "
+             "tasks_completed = tasks_completed + excluded.tasks_completed",
+             (username, count)),
+        ])
+
+    def reset(self, username):
+        """Drop a user's session rollups so they can be rebuilt.
+
+        Task completions are not part of the session log, so they are kept.
+        """
+        self.db.transaction([
+            ("UPDATE stats_daily SET sessions = 0, time = 0 WHERE username = ?", (username,)),
+            ("UPDATE stats_totals SET total_sessions = 0, total_time = 0, productivity_score = 0 "
+             "WHERE username = ?", (username,)),
+        ])
+
+    def drop_before(self, username, day, week):
+        """Remove daily rows before ``day``; weeks are derived from them."""
+        self.db.execute("DELETE FROM stats_daily WHERE username = ? AND date < ?", (username, day))
+
+    def get_extra(self, username, key):
+        """Return an auxiliary document saved with a user's statistics, or None."""
+        rows = self.db.execute(
+            "SELECT value FROM stats_extra WHERE username = ? AND key = ?", (username, key))
+        return json.loads(rows[0]['value']) if rows else None
+
+    def put_extra(self, username, key, value, save=True):
+        """Save an auxiliary document with a user's statistics."""
+        self.db.execute(
+            "INSERT OR REPLACE INTO stats_extra (username, key, value) VALUES (?, ?, ?)",
+            (username, key, json.dumps(value, separators=(',', ':'))))
+
+    def data_version(self):
+        """Token that changes when another connection commits to the database."""
+        return self.db.data_version()
+
+    def load_prefix_index(self, username):
+        """Return a user's PrefixSumIndex from its cumulative rows, or None."""
+        rows = self.db.execute(
+            "SELECT day, sessions, time, tasks_completed FROM stats_prefix "
+            "WHERE username = ? ORDER BY day", (username,))
+        if rows:
+            return PrefixSumIndex(rows[0]['day'],
+                                  {field: [row[field] for row in rows] for field in FIELDS})
+        # Indexes used to be saved as one JSON document
+        legacy = self.get_extra(username, 'prefix_index')
+        if legacy is None:
+            return None
+        index = PrefixSumIndex.from_json(legacy)
+        self.save_prefix_index(username, index)
+        self.db.execute("DELETE FROM stats_extra WHERE username = ? AND key = 'prefix_index'",
+                        (username,))
+        return index
+
+    def save_prefix_index(self, username, index, since=None):
+        """Write the rows of ``index`` from day ``since`` on, or replace all of them."""
+        statements = []
+        start = 0
+        if since is None:
+            statements.append(("DELETE FROM stats_prefix WHERE username = ?", (username,)))
+        elif index.origin is not None:
+            start = max(0, since.toordinal() - index.origin)
+        statements.extend(
+            ("INSERT OR REPLACE INTO stats_prefix (username, day, sessions, time, tasks_completed) "
+             "VALUES (?, ?, ?, ?, ?)",
+             (username, index.origin + position, *(index.sums[field][position] for field in FIELDS)))
+            for position in range(start, len(index)))
+        self.db.transaction(statements)
+
+    def save(self):
+        """Nothing to do; every update is committed immediately."""
+
+    def daily(self, username):
+        """Return (date, stats) pairs, newest first."""
+        rows = self.db.execute(
+            "SELECT date, sessions, time, tasks_completed FROM stats_daily "
+            "WHERE username = ? ORDER BY date DESC", (username,))
+        return [(row['date'], {'sessions': row['sessions'], 'time': row['time'],
+                               'tasks_completed': row['tasks_completed']}) for row in rows]
+
+    def weekly(self, username):
+        """Return (week, stats) pairs, newest first."""
+        # Weeks are rolled up from the (username, date) index; '%Y-W%W'
+        # matches the keys Statistics uses for the JSON store.
+        rows = self.db.execute(
+            "SELECT strftime('%Y-W%W', date) AS week, SUM(sessions) AS sessions, "
+            "SUM(time) AS time, SUM(tasks_completed) AS tasks_completed FROM stats_daily "
+            "WHERE username = ? GROUP BY week ORDER BY week DESC", (username,))
+        return [(row['week'], {'sessions': row['sessions'], 'time': row['time'],
+                               'tasks_completed': row['tasks_completed']}) for row in rows]
+
+    def close(self):
+        """Flush pending work."""
+
+
+class SqliteSessionLog:
+    """Session events stored in the SQLite ``sessions`` table."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def append(self, event):
+        """Append one session event."""
+        self.db.execute(
+            "INSERT INTO sessions (username, type, start, duration, task) VALUES (?, ?, ?, ?, ?)",
+            (event['user'], event['type'], event['start'], event['duration'], event['task']))
+
+    def events(self, username=None, since=None):
+        """Yield the logged events, oldest first, optionally for one user.
+
+        ``since`` (an ISO date or datetime) skips sessions that started before it.
+        """
+        conditions, params = [], []
+        if username is not None:
+            conditions.append("username = ?")
+            params.append(username)
+        if since is not None:
+            conditions.append("start >= ?")
+            params.append(since)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.db.execute(f"SELECT * FROM sessions{where} ORDER BY start", params)
+        for row in rows:
+            yield {'user': row['username'], 'type': row['type'], 'start': row['start'],
+                   'duration': row['duration'], 'task': row['task']}
+
+    def close(self):
+        """Flush pending work."""
+
+
+def import_json_data(db, stats_file="stats.json"):
+    """Copy the JSON stores into a fresh SQLite database once."""
+    if db.get_meta('json_imported'):
+        return
+    statements = []
+    json_stores = Storage(JsonTaskStore(), JsonUserStore(), JsonStatsStore(stats_file),
+                          JsonSessionLog())
+    try:
+        for username, tasks in json_stores.tasks.all_tasks().items():
+            for task in tasks:
+                statements.append((_INSERT_TASK, _task_params(username, task)))
+        for username, profile in json_stores.users.all_users().items():
+            statements.append(("INSERT OR REPLACE INTO users (username, profile) VALUES (?, ?)",
+                               (username, json.dumps(profile, separators=(',', ':')))))
+        for username, stats in json_stores.stats.all_stats().items():
+            statements.append((
+                "INSERT OR REPLACE INTO stats_totals "
+                "(username, total_sessions, total_time, tasks_completed, productivity_score) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (username, stats.get('total_sessions', 0), stats.get('total_time', 0),
+                 stats.get('tasks_completed', 0), stats.get('productivity_score', 0))))
+            for day, entry in stats.get('daily_stats', {}).items():
+                statements.append((
+                    "INSERT OR REPLACE INTO stats_daily (username, date, sessions, time, tasks_completed) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (username, day, entry['sessions'], entry['time'], entry['tasks_completed'])))
+            for key, value in stats.get('extra', {}).items():
+                statements.append((
+                    "INSERT OR REPLACE INTO stats_extra (username, key, value) VALUES (?, ?, ?)",
+                    (username, key, json.dumps(value, separators=(',', ':')))))
+        for event in json_stores.sessions.events():
+            statements.append((
+                "INSERT INTO sessions (username, type, start, duration, task) VALUES (?, ?, ?, ?, ?)",
+                (event['user'], event['type'], event['start'], event['duration'], event['task'])))
+        statements.append(("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', '1')", ()))
+    finally:
+        json_stores.close()
+    db.transaction(statements)
+
+
+class Storage:
+    """The task, user, statistics and session-log stores of one backend."""
+
+    def __init__(self, tasks, users, stats, sessions, db=None):
+        self.tasks = tasks
+        self.users = users
+        self.stats = stats
+        self.sessions = sessions
+        self.db = db
+
+    def data_version(self, username):
+        """Return a token that changes whenever a user's data is saved, by any process."""
+        if self.db is not None:
+            return str(self.db.data_version())
+        return '.'.join(str(version) for version in (
+            self.tasks.data_version(username), self.users.data_version(username),
+            self.stats.data_version()))
+
+    def close(self):
+        """Flush and close every store."""
+        for store in (self.tasks, self.users, self.stats, self.sessions):
+            store.close()
+        if self.db is not None:
+            self.db.close()
+
+
+def open_storage(backend='json', db_file="prodomo.db"):
+    """Open the stores for the chosen backend ('json' or 'sqlite')."""
+    if backend == 'json':
+        return Storage(JsonTaskStore(), JsonUserStore(), JsonStatsStore(), JsonSessionLog())
+    if backend == 'sqlite':
+        db = SqliteDatabase(db_file)
+        import_json_data(db)
+        return Storage(SqliteTaskStore(db), SqliteUserStore(db), SqliteStatsStore(db),
+                       SqliteSessionLog(db), db)
+    raise ValueError(f"Unknown storage backend: {backend}")
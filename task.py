@@ -1,74 +1,311 @@
-import json
-import os
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+from planner import (DEFAULT_PRIORITY, PRIORITY_NAMES, TaskPlanner, parse_due, parse_estimate,
+                     parse_priority, remaining_pomodoros)
+from storage import JsonTaskStore, TaskArchive
+from task_io import chunked, dedupe_key, parse_task
+from task_search import TaskSearch
 from ui import UI
 
 class TaskManager:
-    def __init__(self, user_data):
+    def __init__(self, user_data, store=None, archive_days=7, ui=None):
         self.user_data = user_data
-        self.tasks_file = "tasks.json"
-        self.tasks = self._load_tasks()
-        self.ui = UI()
-
-    def _load_tasks(self):
-        """Load tasks from JSON file."""
-        if os.path.exists(self.tasks_file):
-            try:
-                with open(self.tasks_file, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-        return {}
-
-    def _save_tasks(self):
-        """Save tasks to JSON file."""
-        with open(self.tasks_file, 'w') as f:
-            json.dump(self.tasks, f, indent=4)
+        self.store = store if store is not None else JsonTaskStore()
+        # Completed tasks older than archive_days move to the cold archive
+        self.archive = TaskArchive()
+        self.archive_days = archive_days
+        self.ui = ui if ui is not None else UI()
+        self.search_index = TaskSearch()
+        self.planners = {}  # username -> TaskPlanner, built on first use
+        self._plan_versions = {}  # username -> task store version the plan was synced at
+
+    def _index(self, username):
+        """Return the search index, building a user's the first time it is used."""
+        if not self.search_index.exists(username):
+            self.search_index.add(username, self.store.user_tasks(username))
+        return self.search_index
+
+    def archive_completed(self, username):
+        """Move tasks completed more than archive_days ago into the archive."""
+        cutoff = (datetime.now() - timedelta(days=self.archive_days)).isoformat()
+        expired = [task for task in self.store.completed_tasks(username)
+                   if task['completed_at'] and task['completed_at'] < cutoff]
+        if not expired:
+            return 0
+        self.archive.append(username, expired)
+        task_ids = [task['id'] for task in expired]
+        self.store.delete_many(username, task_ids)
+        self._index(username).remove(username, task_ids)
+        return len(expired)
+
+    def get_task_history(self, username, start=None, end=None):
+        """Get completed tasks, archived or not, completed between two ISO dates.
+
+        Both ends are inclusive and optional; results are oldest first.
+        """
+        history = list(self.archive.tasks(username, start, end))
+        for task in self.store.completed_tasks(username):
+            day = (task['completed_at'] or '')[:10]
+            if (start and day < start) or (end and day > end):
+                continue
+            history.append(task)
+        history.sort(key=lambda task: task['completed_at'] or '')
+        return history
+
+    def display_history(self, username):
+        """Display completed tasks within a date range entered by the user."""
+        start = input("Start date (YYYY-MM-DD, blank for all): ").strip() or None
+        end = input("End date (YYYY-MM-DD, blank for all): ").strip() or None
+        history = self.get_task_history(username, start, end)
+        if not history:
+            print("\nNo completed tasks in that range.")
+            return
+        print("\nCompleted Tasks:")
+        print("-" * 50)
+        for task in history:
+            print(f"[✓] {task['id']}. {task['name']} ({task['completed_at'][:10]})")
+        print("-" * 50)
 
     def get_user_tasks(self, username):
         """Get tasks for a specific user."""
-        if username not in self.tasks:
-            self.tasks[username] = []
-        return self.tasks[username]
-
-    def add_task(self, username, task_name):
-        """Add a new task for a user."""
-        if username not in self.tasks:
-            self.tasks[username] = []
-        
+        return self.store.user_tasks(username)
+
+    def add_task(self, username, task_name, notify=True, priority=DEFAULT_PRIORITY,
+                 estimate=1, due=None):
+        """Add a new task for a user; ``notify=False`` skips the success message.
+
+        ``priority`` is 1 (high) to 3 (low), ``estimate`` the Pomodoros it
+        should take and ``due`` a YYYY-MM-DD date or None.
+        """
         task = {
-            'id': len(self.tasks[username]) + 1,
+            'id': self.store.allocate_id(username),
             'name': task_name,
             'completed': False,
             'created_at': datetime.now().isoformat(),
-            'completed_at': None
+            'completed_at': None,
+            'priority': priority,
+            'estimate': estimate,
+            'due': due,
+            'pomodoros': 0
         }
-        self.tasks[username].append(task)
-        self._save_tasks()
-        self.ui.display_success("Task added successfully!")
+        self.store.add(username, task)
+        self._index(username).add(username, [task])
+        if username in self.planners:
+            self.planners[username].add(task)
+        if notify:
+            self.ui.display_success("Task added successfully!")
         return task
 
-    def complete_task(self, username, task_id):
-        """Mark a task as completed."""
-        if username in self.tasks:
-            for task in self.tasks[username]:
-                if task['id'] == task_id:
-                    task['completed'] = True
-                    task['completed_at'] = datetime.now().isoformat()
-                    self._save_tasks()
-                    self.ui.display_success("Task marked as completed!")
-                    return True
+    def complete_task(self, username, task_id, notify=True):
+        """Mark a task as completed; return False if it does not exist or already was."""
+        if self.store.complete(username, task_id, datetime.now().isoformat()):
+            if username in self.planners:
+                self.planners[username].remove(task_id)
+            if notify:
+                self.ui.display_success("Task marked as completed!")
+            return True
         return False
 
-    def delete_task(self, username, task_id):
+    def delete_task(self, username, task_id, notify=True):
         """Delete a task."""
-        if username in self.tasks:
-            self.tasks[username] = [t for t in self.tasks[username] if t['id'] != task_id]
-            self._save_tasks()
-            self.ui.display_success("Task deleted successfully!")
+        if self.store.delete(username, task_id):
+            self._index(username).remove(username, [task_id])
+            if username in self.planners:
+                self.planners[username].remove(task_id)
+            if notify:
+                self.ui.display_success("Task deleted successfully!")
             return True
         return False
 
+    def import_tasks(self, username, rows, chunk_size=1000, max_errors=20):
+        """Add tasks from (line number, row) pairs, e.g. from task_io.read_rows.
+
+        Rows are validated and streamed through in chunks: each chunk gets
+        its IDs in one allocation and is stored with one write. Rows whose
+        name matches an existing or earlier task (ignoring case and
+        spacing) are skipped; the names seen are kept as digests, so memory
+        still grows with the number of distinct tasks, by a few dozen bytes
+        each, but not with the size of the rows.
+        Returns a report with counts, the first ``max_errors`` invalid rows
+        and the throughput.
+        """
+        start = time.perf_counter()
+        now = datetime.now().isoformat()
+        seen = {dedupe_key(task['name']) for task in self.store.user_tasks(username)}
+        report = {'rows': 0, 'imported': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+
+        def valid_tasks():
+            for line, row in rows:
+                report['rows'] += 1
+                try:
+                    task = parse_task(row, now)
+                except ValueError as e:
+                    report['invalid'] += 1
+                    if len(report['errors']) < max_errors:
+                        report['errors'].append((line, str(e)))
+                    continue
+                key = dedupe_key(task['name'])
+                if key in seen:
+                    report['duplicates'] += 1
+                    continue
+                seen.add(key)
+                yield task
+
+        for chunk in chunked(valid_tasks(), chunk_size):
+            ids = self.store.allocate_ids(username, len(chunk))
+            chunk = [{'id': task_id, **task} for task_id, task in zip(ids, chunk)]
+            self.store.add_many(username, chunk)
+            self._index(username).add(username, chunk)
+            if username in self.planners:
+                for task in chunk:
+                    if not task['completed']:
+                        self.planners[username].add(task)
+            report['imported'] += len(chunk)
+        report['seconds'] = time.perf_counter() - start
+        report['rows_per_second'] = report['rows'] / report['seconds'] if report['seconds'] else 0.0
+        return report
+
+    def export_tasks(self, username, include_archived=False):
+        """Yield a user's tasks, optionally preceded by their archived ones."""
+        if include_archived:
+            yield from self.archive.tasks(username)
+        yield from self.store.user_tasks(username)
+
+    def _planner(self, username):
+        """Return a user's TaskPlanner, re-synced with their active tasks when the store changed."""
+        version = self.store.data_version(username)
+        planner = self.planners.get(username)
+        if planner is None:
+            planner = self.planners[username] = TaskPlanner(self.store.active_tasks(username))
+        elif self._plan_versions.get(username) != version:
+            planner.sync(self.store.active_tasks(username))
+        self._plan_versions[username] = version
+        return planner
+
+    def update_plan(self, username, task_id, **fields):
+        """Change a task's priority, estimate, due date or Pomodoro count and re-plan it."""
+        if not self.store.update(username, task_id, fields):
+            return False
+        task = self.store.find(username, task_id)
+        if username in self.planners and not task['completed']:
+            self.planners[username].add(task)
+        return True
+
+    def record_pomodoro(self, username, task_id):
+        """Count a finished work session towards a task's estimate."""
+        task = self.store.find(username, task_id)
+        if task is not None:
+            self.store.update(username, task_id, {'pomodoros': task['pomodoros'] + 1})
+
+    def planned_tasks(self, username, count):
+        """Return the next ``count`` active tasks to work on, in plan order.
+
+        Tasks added or changed by another Prodomo process (the CLI, the
+        daemon or the API) are planned once the store shows their changes;
+        ones completed or deleted are also dropped as they come up.
+        """
+        planner = self._planner(username)
+        while True:
+            task_ids = planner.upcoming(count)
+            tasks = [self.store.find(username, task_id) for task_id in task_ids]
+            gone = [task_id for task_id, task in zip(task_ids, tasks)
+                    if task is None or task['completed']]
+            if not gone:
+                return tasks
+            for task_id in gone:
+                planner.remove(task_id)
+
+    def next_task(self, username):
+        """Return the active task the next work session should go to, or None."""
+        planner = self._planner(username)
+        while True:
+            task_id = planner.next()
+            if task_id is None:
+                return None
+            task = self.store.find(username, task_id)
+            if task is not None and not task['completed']:
+                return task
+            planner.remove(task_id)
+
+    def display_plan(self, username, sessions=8):
+        """Display which tasks the next work sessions go to."""
+        planned = []
+        session = 1
+        for task in self.planned_tasks(username, sessions):
+            if session > sessions:
+                break
+            last = session + remaining_pomodoros(task) - 1
+            planned.append((session, last, task))
+            session = last + 1
+        if not planned:
+            print("\nNo active tasks to plan.")
+            return
+        print("\nSession Plan:")
+        print("-" * 50)
+        for first, last, task in planned:
+            span = f"{first}" if first == last else f"{first}-{last}"
+            print(f"Session {span}: {task['id']}. {task['name']} {self._plan_label(task)}")
+        print("-" * 50)
+
+    @staticmethod
+    def _plan_label(task):
+        label = f"[{PRIORITY_NAMES[task['priority']]}, {task['pomodoros']}/{task['estimate']} 🍅"
+        if task['due']:
+            label += f", due {task['due']}"
+        return label + "]"
+
+    def _ask_plan(self, task=None):
+        """Ask for a priority, estimate and due date; Enter keeps the current value."""
+        task = task or {'priority': DEFAULT_PRIORITY, 'estimate': 1, 'due': None}
+        fields = {}
+        priority = input(f"Priority (high/medium/low) [{PRIORITY_NAMES[task['priority']]}]: ").strip()
+        if priority:
+            fields['priority'] = parse_priority(priority)
+        estimate = input(f"Estimate in Pomodoros [{task['estimate']}]: ").strip()
+        if estimate:
+            fields['estimate'] = parse_estimate(estimate)
+        due = input(f"Due date (YYYY-MM-DD, '-' for none) [{task['due'] or 'none'}]: ").strip()
+        if due:
+            fields['due'] = None if due == '-' else parse_due(due)
+        return fields
+
+    def search_tasks(self, username, query, limit=10, active_only=False):
+        """Return up to ``limit`` of a user's tasks matching ``query``, best first.
+
+        Words of the query match task names exactly, as a prefix or, when
+        neither finds anything, with a typo or two.
+        """
+        results = []
+        for task_id in self._index(username).search(username, query):
+            task = self.store.find(username, task_id)
+            if task is None or (active_only and task['completed']):
+                continue
+            results.append(task)
+            if len(results) == limit:
+                break
+        return results
+
+    def display_search(self, username):
+        """Display the tasks matching a query entered by the user."""
+        query = input("Search tasks: ").strip()
+        if not query:
+            self.ui.display_error("Search cannot be empty!")
+            return
+        results = self.search_tasks(username, query)
+        if not results:
+            print(f"\nNo tasks match '{query}'.")
+            return
+        print(f"\nBest matches for '{query}':")
+        print("-" * 50)
+        for task in results:
+            status = "✓" if task['completed'] else " "
+            print(f"[{status}] {task['id']}. {task['name']}")
+        print("-" * 50)
+
+    def close(self):
+        """Close the search indexes."""
+        self.search_index.close()
+
     def display_tasks(self, username):
         """Display tasks in a formatted way."""
         tasks = self.get_user_tasks(username)
@@ -79,27 +316,36 @@ class TaskManager:
         print("\nYour Tasks:")
         print("-" * 50)
         for task in tasks:
-            status = "✓" if task['completed'] else " "
-            print(f"[{status}] {task['id']}. {task['name']}")
+            if task['completed']:
+                print(f"[✓] {task['id']}. {task['name']}")
+            else:
+                print(f"[ ] {task['id']}. {task['name']} {self._plan_label(task)}")
         print("-" * 50)
 
     def manage_tasks(self, username):
         """Interactive task management menu."""
         while True:
-            os.system('cls' if os.name == 'nt' else 'clear')
+            self.ui.clear_screen()
             self.display_tasks(username)
             print("\nTask Management:")
             print("1. Add new task")
             print("2. Complete task")
             print("3. Delete task")
-            print("4. Back to main menu")
+            print("4. View completed history")
+            print("5. Search tasks")
+            print("6. Set priority, estimate or due date")
+            print("7. View session plan")
+            print("8. Back to main menu")
             
             choice = input("\nEnter your choice: ").strip()
             
             if choice == '1':
                 task_name = input("Enter task name: ").strip()
                 if task_name:
-                    self.add_task(username, task_name)
+                    try:
+                        self.add_task(username, task_name, **self._ask_plan())
+                    except ValueError as e:
+                        self.ui.display_error(str(e))
                 else:
                     self.ui.display_error("Task name cannot be empty!")
             
@@ -109,7 +355,7 @@ class TaskManager:
                     if self.complete_task(username, int(task_id)):
                         print("Task marked as completed!")
                     else:
-                        self.ui.display_error("Task not found!")
+                        self.ui.display_error("Task not found or already completed!")
                 else:
                     self.ui.display_error("Invalid task ID!")
             
@@ -124,6 +370,30 @@ class TaskManager:
                     self.ui.display_error("Invalid task ID!")
             
             elif choice == '4':
+                self.display_history(username)
+            
+            elif choice == '5':
+                self.display_search(username)
+            
+            elif choice == '6':
+                task_id = input("Enter task ID to plan: ").strip()
+                task = self.store.find(username, int(task_id)) if task_id.isdigit() else None
+                if task is None or task['completed']:
+                    self.ui.display_error("Task not found!")
+                else:
+                    try:
+                        fields = self._ask_plan(task)
+                    except ValueError as e:
+                        self.ui.display_error(str(e))
+                    else:
+                        if fields:
+                            self.update_plan(username, task['id'], **fields)
+                        self.ui.display_success("Task plan updated!")
+            
+            elif choice == '7':
+                self.display_plan(username)
+            
+            elif choice == '8':
                 break
             
             else:
@@ -133,10 +403,8 @@ class TaskManager:
 
     def get_active_tasks(self, username):
         """Get all active (incomplete) tasks for a user."""
-        tasks = self.get_user_tasks(username)
-        return [task for task in tasks if not task['completed']]
+        return self.store.active_tasks(username)
 
     def get_completed_tasks(self, username):
         """Get all completed tasks for a user."""
-        tasks = self.get_user_tasks(username)
-        return [task for task in tasks if task['completed']] 
\ No newline at end of file
+        return self.store.completed_tasks(username) 
\ No newline at end of file
@@ -0,0 +1,151 @@
+import contextlib
+import csv
+import hashlib
+import itertools
+import json
+import os
+import sys
+from datetime import datetime
+from planner import PLAN_DEFAULTS, parse_due, parse_estimate, parse_priority
+
+FORMATS = ('jsonl', 'csv')
+COLUMNS = ('id', 'name', 'completed', 'created_at', 'completed_at',
+           'priority', 'estimate', 'due', 'pomodoros')
+MAX_NAME_LENGTH = 500
+_TRUE = {'1', 'true', 'yes', 'y', 'x', 'done'}
+_FALSE = {'', '0', 'false', 'no', 'n'}
+
+
+def detect_format(path):
+    """Guess the format of a task file from its extension (JSONL by default)."""
+    return 'csv' if os.path.splitext(path)[1].lower() == '.csv' else 'jsonl'
+
+
+def open_task_file(path, mode='r'):
+    """Open a task file for reading or writing; '-' is stdin or stdout (left open)."""
+    if path == '-':
+        return contextlib.nullcontext(sys.stdin if mode == 'r' else sys.stdout)
+    return open(path, mode, newline='', encoding='utf-8')
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, row) pairs from a JSONL or CSV stream.
+
+    A JSONL line that does not parse gives a row of None, so the caller
+    can report it and carry on.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError:
+            yield number, None
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value if value is not None else '').strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"'completed' must be true or false, not {value!r}")
+
+
+def _parse_time(value, field):
+    if value in (None, ''):
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"'{field}' must be an ISO date")
+    try:
+        return datetime.fromisoformat(value.strip()).isoformat()
+    except ValueError:
+        raise ValueError(f"'{field}' must be an ISO date, not {value!r}")
+
+
+def _parse_count(value):
+    text = str(value).strip()
+    if not text.isdigit():
+        raise ValueError(f"'pomodoros' must be a whole number, not {value!r}")
+    return int(text)
+
+
+def _parse_optional(row, field, parse):
+    value = row.get(field)
+    return PLAN_DEFAULTS[field] if value in (None, '') else parse(value)
+
+
+def parse_task(row, now):
+    """Return the task an imported row describes, without an ID.
+
+    Raises ValueError for rows that cannot be imported. ``now`` fills in
+    missing timestamps.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("not a JSON object" if row is not None else "not valid JSON")
+    name = row.get('name')
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("missing 'name'")
+    name = name.strip()
+    if len(name) > MAX_NAME_LENGTH:
+        raise ValueError(f"'name' is longer than {MAX_NAME_LENGTH} characters")
+    completed = _parse_bool(row.get('completed'))
+    created_at = _parse_time(row.get('created_at'), 'created_at') or now
+    completed_at = _parse_time(row.get('completed_at'), 'completed_at')
+    if completed and completed_at is None:
+        completed_at = now
+    return {
+        'name': name,
+        'completed': completed,
+        'created_at': created_at,
+        'completed_at': completed_at if completed else None,
+        'priority': _parse_optional(row, 'priority', parse_priority),
+        'estimate': _parse_optional(row, 'estimate', parse_estimate),
+        'due': parse_due(row.get('due')),
+        'pomodoros': _parse_optional(row, 'pomodoros', _parse_count)
+    }
+
+
+def dedupe_key(name):
+    """Key under which two task names count as duplicates.
+
+    A 16-byte digest of the normalized name: as good as the name itself for
+    telling tasks apart, the same in every process, and smaller than a long
+    name in the set of names seen during an import.
+    """
+    normalized = ' '.join(name.casefold().split())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+
+
+def chunked(iterable, size):
+    """Yield lists of up to ``size`` items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_tasks(tasks, stream, fmt):
+    """Write tasks to a stream as JSONL or CSV; return how many were written."""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        for task in tasks:
+            writer.writerow(task)
+            count += 1
+        return count
+    for task in tasks:
+        stream.write(json.dumps({column: task.get(column) for column in COLUMNS},
+                                separators=(',', ':')) + "\n")
+        count += 1
+    return count
@@ -0,0 +1,190 @@
+import bisect
+import math
+import os
+import re
+from urllib.parse import quote
+from journal import Journal
+
+_WORD = re.compile(r"\w+")
+PREFIX_WEIGHT = 0.75  # a term that starts a longer word
+FUZZY_WEIGHT = 0.5  # a term one or two typos away from a word
+MAX_EXPANSIONS = 50  # words a single prefix or fuzzy term may match
+
+
+def tokenize(text):
+    """Split text into lowercase words."""
+    return _WORD.findall(text.casefold())
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance with adjacent transpositions, or ``limit + 1`` if larger."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+class InvertedIndex:
+    """Word -> task ID postings over one user's task names.
+
+    ``docs`` keeps each task's words so a task can be removed without its
+    name. The vocabulary is kept sorted for prefix lookups and bucketed by
+    length for fuzzy ones; both are derived from the postings when the
+    index is loaded, so nothing is tokenized at startup.
+    """
+
+    def __init__(self, postings=None, docs=None):
+        self.postings = postings or {}  # word -> set of task IDs
+        self.docs = docs or {}  # task ID -> list of words
+        self.vocabulary = sorted(self.postings)
+        self.by_length = {}
+        for word in self.postings:
+            self.by_length.setdefault(len(word), set()).add(word)
+
+    @classmethod
+    def from_json(cls, data):
+        """Build an index from its snapshot."""
+        return cls({word: set(ids) for word, ids in data.get('postings', {}).items()},
+                   {int(task_id): words for task_id, words in data.get('docs', {}).items()})
+
+    def to_json(self):
+        """Return the snapshot of this index."""
+        return {'postings': {word: sorted(ids) for word, ids in self.postings.items()},
+                'docs': self.docs}
+
+    def apply(self, record):
+        """Apply an add or delete record; re-adding a task replaces it."""
+        self._remove(record['id'])
+        if record['op'] == 'add':
+            words = list(dict.fromkeys(record['words']))
+            self.docs[record['id']] = words
+            for word in words:
+                ids = self.postings.get(word)
+                if ids is None:
+                    ids = self.postings[word] = set()
+                    bisect.insort(self.vocabulary, word)
+                    self.by_length.setdefault(len(word), set()).add(word)
+                ids.add(record['id'])
+
+    def _remove(self, task_id):
+        for word in self.docs.pop(task_id, ()):
+            ids = self.postings[word]
+            ids.discard(task_id)
+            if not ids:
+                del self.postings[word]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, word)]
+                self.by_length[len(word)].discard(word)
+
+    def _expand(self, term):
+        """Yield (word, weight) for the indexed words a query term matches."""
+        if term in self.postings:
+            yield term, 1.0
+        found = term in self.postings
+        start = bisect.bisect_left(self.vocabulary, term)
+        for word in self.vocabulary[start:start + MAX_EXPANSIONS + 1]:
+            if not word.startswith(term):
+                break
+            if word != term:
+                found = True
+                yield word, PREFIX_WEIGHT
+        if found or len(term) < 3:
+            return
+        # Only misspelled terms are looked up fuzzily
+        limit = 1 if len(term) <= 5 else 2
+        matches = 0
+        for length in range(len(term) - limit, len(term) + limit + 1):
+            for word in self.by_length.get(length, ()):
+                distance = edit_distance(term, word, limit)
+                if distance <= limit:
+                    yield word, FUZZY_WEIGHT / distance
+                    matches += 1
+                    if matches >= MAX_EXPANSIONS:
+                        return
+
+    def search(self, query):
+        """Return the IDs of tasks matching ``query``, best first.
+
+        Tasks matching more of the query's words rank first; within that,
+        rarer words and closer matches (exact, then prefix, then fuzzy)
+        score higher, and shorter names win ties.
+        """
+        total = len(self.docs)
+        scores = {}
+        matched = {}
+        for term in dict.fromkeys(tokenize(query)):
+            best = {}
+            for word, weight in self._expand(term):
+                ids = self.postings[word]
+                score = weight * math.log(1 + total / len(ids))
+                for task_id in ids:
+                    if score > best.get(task_id, 0):
+                        best[task_id] = score
+            for task_id, score in best.items():
+                scores[task_id] = scores.get(task_id, 0) + score
+                matched[task_id] = matched.get(task_id, 0) + 1
+        return sorted(scores, key=lambda task_id: (-matched[task_id], -scores[task_id],
+                                                   len(self.docs[task_id]), task_id))
+
+
+class TaskSearch:
+    """Per-user InvertedIndex of task names, saved under ``index_dir``.
+
+    Each index is a Journal, so an update appends one record instead of
+    rewriting the index, and starting up only loads the saved postings.
+    """
+
+    def __init__(self, index_dir=os.path.join("data", "search")):
+        self.index_dir = index_dir
+        self.journals = {}
+
+    def _path(self, username):
+        return os.path.join(self.index_dir, quote(username, safe='') + ".json")
+
+    def _journal(self, username):
+        journal = self.journals.get(username)
+        if journal is None:
+            os.makedirs(self.index_dir, exist_ok=True)
+            journal = Journal(self._path(username), InvertedIndex.apply,
+                              decode=InvertedIndex.from_json, encode=InvertedIndex.to_json)
+            self.journals[username] = journal
+        return journal
+
+    def exists(self, username):
+        """Return True if a user's index has been built."""
+        path = self._path(username)
+        return (username in self.journals or os.path.exists(path)
+                or os.path.exists(os.path.splitext(path)[0] + ".journal"))
+
+    def add(self, username, tasks):
+        """Index new or renamed tasks."""
+        records = [{'op': 'add', 'id': task['id'], 'words': tokenize(task['name'])}
+                   for task in tasks]
+        if records:
+            self._journal(username).append_many(records)
+
+    def remove(self, username, task_ids):
+        """Drop tasks from the index."""
+        records = [{'op': 'delete', 'id': task_id} for task_id in task_ids]
+        if records:
+            self._journal(username).append_many(records)
+
+    def search(self, username, query):
+        """Return the IDs of a user's tasks matching ``query``, best first."""
+        journal = self._journal(username)
+        journal.refresh()
+        return journal.state.search(query)
+
+    def close(self):
+        """Close the index journals."""
+        for journal in self.journals.values():
+            journal.close()
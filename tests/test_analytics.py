@@ -0,0 +1,60 @@
+import unittest
+
+try:
+    import numpy as np
+    from analytics import SessionFrame
+except ImportError:
+    np = None
+
+
+def event(start, minutes, session_type='work', user='gardener'):
+    return {'user': user, 'type': session_type, 'start': start, 'duration': minutes * 60,
+            'task': None}
+
+
+@unittest.skipUnless(np, "analytics needs NumPy")
+class SessionFrameTest(unittest.TestCase):
+    def setUp(self):
+        self.frame = SessionFrame.from_events([
+            event('2026-03-02T09:15:00', 25),  # a Monday
+            event('2026-03-02T09:45:00', 5, 'short_break'),
+            event('2026-03-03T14:00:00', 50),
+            event('2026-03-05T09:30:00', 25, user='weeder'),
+        ])
+
+    def test_filter(self):
+        self.assertEqual(len(self.frame.filter(user='gardener')), 3)
+        self.assertEqual(len(self.frame.filter(user='nobody')), 0)
+        self.assertEqual(len(self.frame.filter(session_type='work', start='2026-03-03')), 2)
+        self.assertEqual(len(self.frame.filter(end='2026-03-03')), 2)
+
+    def test_groups(self):
+        work = self.frame.filter(session_type='work')
+        dates, counts, minutes = work.by_day()
+        self.assertEqual([str(day) for day in dates], ['2026-03-02', '2026-03-03', '2026-03-05'])
+        self.assertEqual(list(counts), [1, 1, 1])
+        self.assertEqual(list(minutes), [25, 50, 25])
+        weeks, counts, _ = work.by_week()
+        self.assertEqual(([str(week) for week in weeks], list(counts)), (['2026-03-02'], [3]))
+        counts, minutes = work.by_hour()
+        self.assertEqual((counts[9], minutes[9], minutes[14]), (2, 50, 50))
+        counts, _ = work.by_weekday()
+        self.assertEqual(list(counts), [1, 1, 0, 1, 0, 0, 0])
+
+    def test_daily_series_is_padded_to_the_end_date(self):
+        work = self.frame.filter(user='gardener', session_type='work')
+        dates, minutes = work.daily_series(end='2026-03-05')
+        self.assertEqual([str(day) for day in dates],
+                         ['2026-03-02', '2026-03-03', '2026-03-04', '2026-03-05'])
+        self.assertEqual(list(minutes), [25, 50, 0, 0])
+        dates, averages = work.rolling(window=2, end='2026-03-05')
+        self.assertEqual(list(averages), [12.5, 37.5, 25, 0])
+
+    def test_percentiles(self):
+        work = self.frame.filter(session_type='work')
+        self.assertEqual(work.percentiles((50, 100)), {50: 25.0, 100: 50.0})
+        self.assertEqual(SessionFrame.from_events([]).percentiles((50,)), {50: 0.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
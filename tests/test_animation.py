@@ -0,0 +1,38 @@
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+from animation import FrameScheduler
+
+
+class FrameSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        allowed = mock.patch.object(FrameScheduler, '_animations_allowed', return_value=True)
+        allowed.start()
+        self.addCleanup(allowed.stop)
+        self.frames = FrameScheduler()
+
+    def test_print_waits_for_queued_reveals(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.frames.print("first header")
+            self.frames.reveal(["first story", "first reward"], interval=0.01)
+            self.frames.print("second header")
+            self.frames.reveal(["second story"], interval=0.01)
+            self.frames.print("closing separator")
+            self.frames.wait()
+        self.assertEqual(out.getvalue(), "first header\nfirst story\nfirst reward\n"
+                                         "second header\nsecond story\nclosing separator\n")
+
+    def test_print_without_animations_is_immediate(self):
+        self.frames.set_enabled(False)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.frames.reveal(["story"])
+            self.frames.print("separator")
+        self.assertEqual(out.getvalue(), "story\nseparator\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
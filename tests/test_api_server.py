@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from api_server import ProdomoAPI
+from storage import open_storage
+from task import TaskManager
+from user_data import UserData
+
+
+class ProdomoAPITest(unittest.TestCase):
+    backend = 'json'
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.api = ProdomoAPI(storage_backend=self.backend)
+        self.api.handle('POST', '/users/alice')
+
+    def tearDown(self):
+        self.api.user_data.flush()
+        self.api.task_manager.close()
+        self.api.storage.close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def get(self, path, etag=None):
+        status, headers, body = self.api.handle('GET', path, if_none_match=etag)
+        return status, headers.get('ETag'), json.loads(body) if body else None
+
+    def test_changes_saved_by_another_process_change_the_etag(self):
+        _, etag, _ = self.get('/users/alice/tasks')
+        _, profile_etag, _ = self.get('/users/alice')
+        self.assertEqual(self.get('/users/alice/tasks', etag)[0], 304)
+        # The CLI, with stores of its own
+        storage = open_storage(self.backend)
+        user_data = UserData(storage.users)
+        task_manager = TaskManager(user_data, storage.tasks)
+        task_manager.add_task('alice', "Water the roses", notify=False)
+        user_data.update_tasks_completed(5, username='alice')
+        user_data.flush()
+        task_manager.close()
+        storage.close()
+        status, _, body = self.get('/users/alice/tasks', etag)
+        self.assertEqual(status, 200)
+        self.assertEqual([task['name'] for task in body['tasks']], ["Water the roses"])
+        status, _, body = self.get('/users/alice', profile_etag)
+        self.assertEqual(status, 200)
+        self.assertEqual(body['profile']['tasks_completed'], 5)
+
+    def test_unknown_user_is_not_found_whatever_the_precondition(self):
+        self.assertEqual(self.get('/users/bob/tasks', '*')[0], 404)
+
+    def test_boolean_duration_is_rejected(self):
+        status, _, _ = self.api.handle('POST', '/users/alice/sessions',
+                                       json.dumps({'duration': True}).encode())
+        self.assertEqual(status, 400)
+
+    def test_recorded_session_credits_its_duration(self):
+        status, _, _ = self.api.handle('POST', '/users/alice/sessions',
+                                       json.dumps({'duration': 90}).encode())
+        self.assertEqual(status, 201)
+        self.assertEqual(self.get('/users/alice')[2]['profile']['total_work_time'], 1.5)
+
+    def post(self, path, document=None):
+        status, _, body = self.api.handle('POST', path, json.dumps(document or {}).encode())
+        return status, json.loads(body)
+
+    def test_timer_is_credited_when_it_runs_out(self):
+        clock = self.api.scheduler.clock = mock.Mock(return_value=0.0)
+        status, body = self.post('/users/alice/timer', {'type': 'short break'})
+        self.assertEqual((status, body['timer']['state']), (201, 'running'))
+        self.assertEqual(self.post('/users/alice/timer')[0], 400)
+        _, etag, _ = self.get('/users/alice')
+        clock.return_value = 300.0
+        self.assertEqual(len(self.api.scheduler.run_due()), 1)
+        status, _, body = self.get('/users/alice', etag)
+        self.assertEqual(status, 200)
+        self.assertEqual(body['profile']['total_break_time'], 5.0)
+        self.assertEqual(self.get('/users/alice/timer')[2]['timer'],
+                         {'state': 'completed', 'type': 'SHORT BREAK', 'remaining': 0})
+
+    def test_stopped_timer_credits_the_time_it_ran(self):
+        clock = self.api.scheduler.clock = mock.Mock(return_value=0.0)
+        self.post('/users/alice/timer')
+        clock.return_value = 60.0
+        self.assertEqual(self.post('/users/alice/timer/pause')[1]['timer']['remaining'], 1440)
+        clock.return_value = 600.0
+        self.assertEqual(self.post('/users/alice/timer/resume')[0], 200)
+        clock.return_value = 660.0
+        status, body = self.post('/users/alice/timer/stop')
+        self.assertEqual((status, body['timer']['state']), (200, 'stopped'))
+        self.assertEqual(self.post('/users/alice/timer/stop')[0], 400)
+        self.assertEqual(self.get('/users/alice')[2]['profile']['total_work_time'], 2.0)
+        self.assertEqual(self.api.stats.store.totals('alice')['total_time'], 2.0)
+
+
+class SqliteProdomoAPITest(ProdomoAPITest):
+    backend = 'sqlite'
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import asyncio
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from animation import frames
+from daemon import ProdomoDaemon
+
+
+class ProdomoDaemonTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.addCleanup(frames.set_enabled, frames.enabled)
+        self.daemon = ProdomoDaemon('gardener', storage_backend='json')
+
+    def tearDown(self):
+        self.daemon.user_data.flush()
+        self.daemon.task_manager.close()
+        self.daemon.storage.close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def run_phase(self, *commands):
+        """Start a work phase, send ``commands`` and return the status once it ended."""
+        daemon = self.daemon
+
+        async def scenario():
+            await daemon.cmd_start({'type': 'WORK'})
+            session = daemon.session
+            for command in commands:
+                await daemon.commands[command]({})
+            await asyncio.wait([session])
+            await asyncio.sleep(0)  # Let the done-callback run
+            return await daemon.cmd_status({})
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as output:
+            status = asyncio.run(scenario())
+        return status, output.getvalue()
+
+    def test_timer_messages_are_silenced(self):
+        status, output = self.run_phase('pause', 'resume', 'stop')
+        self.assertEqual(output, "")
+        self.assertEqual((status['running'], status['error']), (False, None))
+        self.assertEqual(self.daemon.stats.store.totals('gardener')['total_sessions'], 1)
+
+    def test_failed_phase_is_logged_and_reported(self):
+        with mock.patch.object(self.daemon.stats, 'record_session',
+                               side_effect=OSError("disk full")):
+            status, output = self.run_phase('stop')
+        self.assertEqual(status['error'], "OSError: disk full")
+        self.assertIn("OSError: disk full", output)
+        self.assertIsNone(self.daemon.session)
+        # The next phase starts afresh
+        status, _ = self.run_phase('stop')
+        self.assertIsNone(status['error'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import unittest
+
+from journal import Journal
+
+
+def apply_record(state, record):
+    if record['op'] == 'set':
+        state[record['key']] = record['value']
+    else:
+        state.pop(record['key'], None)
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def journal(self, **options):
+        journal = Journal('tasks.json', apply_record, **options)
+        self.addCleanup(journal.close)
+        return journal
+
+    def test_state_is_replayed_from_the_journal(self):
+        journal = self.journal()
+        journal.append({'op': 'set', 'key': 'fern', 'value': 1})
+        journal.append_many([{'op': 'set', 'key': 'rose', 'value': 2},
+                             {'op': 'del', 'key': 'fern'}])
+        journal.close()
+        self.assertFalse(os.path.exists('tasks.json'))
+        with open('tasks.journal') as f:
+            self.assertEqual(len(f.readlines()), 3)
+        self.assertEqual(self.journal().state, {'rose': 2})
+
+    def test_torn_last_line_is_ignored(self):
+        self.journal().append({'op': 'set', 'key': 'fern', 'value': 1})
+        with open('tasks.journal', 'a') as f:
+            f.write('{"op":"set","key":"ro')
+        self.assertEqual(self.journal().state, {'fern': 1})
+
+    def test_compaction_folds_the_journal_into_the_snapshot(self):
+        journal = self.journal(compact_threshold=1)
+        journal.append({'op': 'set', 'key': 'fern', 'value': "Mist the leaves " * 10})
+        journal.close()  # Waits for the background compaction
+        self.assertFalse(os.path.exists('tasks.journal'))
+        with open('tasks.json') as f:
+            self.assertEqual(json.load(f), {'fern': "Mist the leaves " * 10})
+        # A journal smaller than the snapshot is left to grow
+        journal = self.journal(compact_threshold=1)
+        journal.append({'op': 'del', 'key': 'fern'})
+        journal.close()
+        self.assertTrue(os.path.exists('tasks.journal'))
+        self.assertEqual(self.journal().state, {})
+
+    def test_interrupted_compaction_is_finished_on_load(self):
+        with open('tasks.json', 'w') as f:
+            json.dump({'fern': 1}, f)
+        # Already part of the snapshot, then one record that is not
+        with open('tasks.journal.old', 'w') as f:
+            f.write('{"op":"set","key":"fern","value":1}\n{"op":"set","key":"rose","value":2}\n')
+        with open('tasks.journal', 'w') as f:
+            f.write('{"op":"del","key":"fern"}\n')
+        journal = self.journal()
+        self.assertEqual(journal.state, {'rose': 2})
+        self.assertFalse(os.path.exists('tasks.journal.old'))
+        self.assertFalse(os.path.exists('tasks.journal'))
+        with open('tasks.json') as f:
+            self.assertEqual(json.load(f), {'rose': 2})
+
+    def test_records_from_another_process_are_kept(self):
+        ours, theirs = self.journal(), self.journal()
+        ours.append({'op': 'set', 'key': 'fern', 'value': 1})
+        theirs.append({'op': 'set', 'key': 'rose', 'value': 2})
+        self.assertEqual(theirs.state, {'fern': 1, 'rose': 2})
+        ours.refresh()
+        self.assertEqual(ours.state, {'fern': 1, 'rose': 2})
+        self.assertEqual(ours.reloads, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from locking import FileLock, fcntl, lock_stats, merge_changes
+from storage import JsonTaskStore, JsonUserStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Adds one to a counter file 200 times, each time under the lock
+INCREMENT = """
+import sys
+from locking import FileLock
+lock = FileLock(sys.argv[1])
+for _ in range(200):
+    with lock:
+        with open(sys.argv[1]) as f:
+            count = int(f.read())
+        with open(sys.argv[1], 'w') as f:
+            f.write(str(count + 1))
+        lock.bump()
+"""
+
+
+class MergeChangesTest(unittest.TestCase):
+    def test_merge(self):
+        base = {'sessions': 3, 'name': "Fern", 'tags': {'a': 1}, 'gone': 1}
+        ours = {'sessions': 5, 'name': "Ferny", 'tags': {'a': 1, 'b': 2}, 'gone': 1}
+        theirs = {'sessions': 4, 'name': "Fernanda", 'tags': {'a': 2}, 'new': 7}
+        self.assertEqual(merge_changes(base, ours, theirs),
+                         {'sessions': 6, 'name': "Ferny", 'tags': {'a': 2, 'b': 2}, 'new': 7})
+        self.assertEqual(merge_changes(base, base, theirs), theirs)
+        self.assertEqual(merge_changes({}, {'count': 2}, {'count': 3}), {'count': 5})
+        self.assertIs(merge_changes(False, True, False), True)
+
+
+@unittest.skipUnless(fcntl, "processes are only locked out where fcntl exists")
+class FileLockTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_version_is_bumped_under_a_reentrant_lock(self):
+        lock = FileLock('tasks.json')
+        self.addCleanup(lock.close)
+        self.assertEqual(lock.version(), 0)
+        with lock:
+            with lock:
+                self.assertEqual(lock.bump(), 1)
+        other = FileLock('tasks.json')
+        self.addCleanup(other.close)
+        self.assertEqual(other.version(), 1)
+
+    def test_processes_take_turns(self):
+        path = os.path.join(self.tmp.name, 'counter')
+        with open(path, 'w') as f:
+            f.write('0')
+        processes = [subprocess.Popen([sys.executable, '-c', INCREMENT, path], cwd=ROOT)
+                     for _ in range(2)]
+        for process in processes:
+            self.assertEqual(process.wait(), 0)
+        with open(path) as f:
+            self.assertEqual(f.read(), '400')
+        lock = FileLock(path)
+        self.addCleanup(lock.close)
+        self.assertEqual(lock.version(), 400)
+
+    def test_concurrent_profile_saves_are_merged(self):
+        ours, theirs = JsonUserStore(), JsonUserStore()
+        self.addCleanup(ours.close)
+        self.addCleanup(theirs.close)
+        ours.put('gardener', {'tasks_completed': 1, 'total_work_time': 25})
+        theirs.get('gardener')
+        theirs.put('gardener', {'tasks_completed': 3, 'total_work_time': 25})
+        conflicts = lock_stats.files.get(ours._lock('gardener').path, {}).get('conflicts', 0)
+        stored = ours.put('gardener', {'tasks_completed': 1, 'total_work_time': 50})
+        self.assertEqual(stored, {'tasks_completed': 3, 'total_work_time': 50})
+        self.assertEqual(lock_stats.files[ours._lock('gardener').path]['conflicts'],
+                         conflicts + 1)
+
+    def test_concurrent_task_adds_keep_unique_ids(self):
+        ours, theirs = JsonTaskStore(), JsonTaskStore()
+        self.addCleanup(ours.close)
+        self.addCleanup(theirs.close)
+        for store in (ours, theirs):
+            store.active_tasks('gardener')  # Both loaded before either writes
+        for store, name in ((ours, "Rake the leaves"), (theirs, "Repot the fern")):
+            store.add('gardener', {'id': 1, 'name': name, 'completed': False,
+                                   'created_at': '2026-03-01T09:00:00', 'completed_at': None})
+        tasks = {task['id']: task['name'] for task in ours.user_tasks('gardener')}
+        self.assertEqual(tasks, {1: "Rake the leaves", 2: "Repot the fern"})
+
+
+if __name__ == "__main__":
+    unittest.main()
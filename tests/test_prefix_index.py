@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+from prefix_index import PrefixSumIndex
+from stats import Statistics
+from storage import JsonSessionLog, JsonStatsStore
+
+
+class PrefixSumIndexTest(unittest.TestCase):
+    def test_range_totals(self):
+        index = PrefixSumIndex()
+        self.assertEqual(index.totals(date(2026, 3, 1), date(2026, 3, 31)),
+                         {'sessions': 0, 'time': 0, 'tasks_completed': 0})
+        index.add(date(2026, 3, 2), sessions=1, time=25)
+        index.add(date(2026, 3, 5), sessions=2, time=50, tasks_completed=1)
+        # Back-filled before the first day, then into a gap
+        index.add(date(2026, 2, 27), sessions=1, time=15)
+        index.add(date(2026, 3, 3), tasks_completed=2)
+        self.assertEqual(index.totals(date(2026, 3, 1), date(2026, 3, 31)),
+                         {'sessions': 3, 'time': 75, 'tasks_completed': 3})
+        self.assertEqual(index.totals(date(2026, 3, 3), date(2026, 3, 4)),
+                         {'sessions': 0, 'time': 0, 'tasks_completed': 2})
+        self.assertEqual(index.total(date(2026, 1, 1), date(2026, 2, 27), 'time'), 15)
+        self.assertEqual(index.total(date(2026, 3, 6), date(2026, 12, 31), 'sessions'), 0)
+        self.assertEqual(index.total(date(2026, 3, 5), date(2026, 3, 2), 'sessions'), 0)
+
+    def test_daily_round_trip(self):
+        daily = [('2026-03-05', {'sessions': 2, 'time': 50, 'tasks_completed': 0}),
+                 ('2026-03-02', {'sessions': 1, 'time': 25, 'tasks_completed': 1})]
+        index = PrefixSumIndex.from_daily(daily)
+        self.assertEqual(list(index.daily('time')), [('2026-03-02', 25), ('2026-03-05', 50)])
+        self.assertEqual(list(index.daily('tasks_completed')), [('2026-03-02', 1)])
+        copy = PrefixSumIndex.from_json(index.to_json())
+        self.assertEqual(copy.totals(date(2026, 3, 1), date(2026, 3, 4)),
+                         index.totals(date(2026, 3, 1), date(2026, 3, 4)))
+
+
+class StatisticsIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def statistics(self):
+        stats = Statistics(JsonStatsStore(), JsonSessionLog(), ui=mock.Mock())
+        self.addCleanup(stats.log.close)
+        stats.set_user('gardener')
+        return stats
+
+    def test_archived_days_stay_in_the_range_totals(self):
+        stats = self.statistics()
+        long_ago = datetime.now() - timedelta(days=120)
+        stats.record_session('work', 1500, start=long_ago)
+        stats.record_session('work', 600)
+        stats.apply_retention()
+        self.assertEqual([day for day, _ in stats.store.daily('gardener')],
+                         [date.today().isoformat()])
+        self.assertEqual(dict(stats.archive.monthly('gardener'))[long_ago.strftime('%Y-%m')],
+                         {'sessions': 1, 'time': 25.0, 'tasks_completed': 0})
+        self.assertEqual(stats.range_totals(long_ago.date(), date.today()),
+                         {'sessions': 2, 'time': 35.0, 'tasks_completed': 0})
+
+    def test_saved_index_is_loaded_instead_of_rebuilt(self):
+        self.statistics().record_session('work', 1500)
+        with mock.patch.object(PrefixSumIndex, 'from_daily', side_effect=AssertionError):
+            stats = self.statistics()
+            self.assertEqual(stats.range_totals(date.today(), date.today())['sessions'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import threading
+import unittest
+from unittest import mock
+
+from scheduler import TimerScheduler, stats_recorder
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TimerSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.completed = []
+        self.scheduler = TimerScheduler(on_complete=self.completed.append, clock=self.clock)
+
+    def advance(self, seconds):
+        self.clock.now += seconds
+        return [session.key for session in self.scheduler.run_due()]
+
+    def test_sessions_complete_in_deadline_order(self):
+        self.scheduler.start('carol', 'carol', 'WORK', 1500)
+        self.scheduler.start('alice', 'alice', 'SHORT BREAK', 300)
+        self.scheduler.start('bob', 'bob', 'LONG BREAK', 900)
+        self.assertEqual(self.advance(299), [])
+        self.assertEqual(self.advance(1), ['alice'])
+        self.assertEqual(self.advance(1200), ['bob', 'carol'])
+        self.assertEqual([session.key for session in self.completed], ['alice', 'bob', 'carol'])
+
+    def test_pause_moves_the_deadline_by_the_paused_time(self):
+        self.scheduler.start('alice', 'alice', 'WORK', 100)
+        self.advance(40)
+        self.assertTrue(self.scheduler.pause('alice'))
+        self.assertFalse(self.scheduler.pause('alice'))
+        self.assertEqual(self.advance(500), [])
+        self.assertEqual(self.scheduler.remaining('alice'), 60)
+        self.assertTrue(self.scheduler.resume('alice'))
+        self.assertEqual(self.advance(59), [])
+        self.assertEqual(self.advance(1), ['alice'])
+        # The entry pushed before the pause is stale and never fires again
+        self.assertEqual(self.advance(1000), [])
+
+    def test_stopped_session_keeps_its_elapsed_time_and_never_completes(self):
+        self.scheduler.start('alice', 'alice', 'WORK', 100)
+        self.advance(30)
+        session = self.scheduler.stop('alice')
+        self.assertEqual(session.elapsed(self.clock.now + 50), 30)
+        self.assertIsNone(self.scheduler.stop('alice'))
+        self.assertEqual(self.advance(100), [])
+        self.assertEqual(self.scheduler.status('alice')['state'], 'stopped')
+
+    def test_a_failing_callback_does_not_stop_the_others(self):
+        self.scheduler.on_complete = mock.Mock(side_effect=[RuntimeError("disk full"), None])
+        self.scheduler.start('alice', 'alice', 'WORK', 10)
+        self.scheduler.start('bob', 'bob', 'WORK', 10)
+        with mock.patch('builtins.print'):
+            self.assertEqual(self.advance(10), ['alice', 'bob'])
+        self.assertEqual(self.scheduler.on_complete.call_count, 2)
+
+    def test_stats_recorder_credits_the_session_user(self):
+        user_data, stats = mock.Mock(), mock.Mock()
+        record = stats_recorder(user_data, stats)
+        session = self.scheduler.start('alice', 'alice', 'WORK', 1500)
+        record(session)
+        record(session, 90)
+        user_data.update_user_stats.assert_has_calls([
+            mock.call('WORK', 25.0, username='alice'), mock.call('WORK', 1.5, username='alice')])
+        stats.record_session.assert_has_calls([
+            mock.call('work', 1500, session.started_at, username='alice'),
+            mock.call('work', 90, session.started_at, username='alice')])
+
+    def test_thread_completes_sessions_as_they_fall_due(self):
+        done = threading.Event()
+        scheduler = TimerScheduler(on_complete=lambda session: done.set())
+        scheduler.start_thread()
+        try:
+            scheduler.start('alice', 'alice', 'WORK', 0.05)
+            self.assertTrue(done.wait(5))
+            self.assertEqual(scheduler.status('alice')['state'], 'completed')
+        finally:
+            scheduler.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
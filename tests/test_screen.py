@@ -0,0 +1,32 @@
+import io
+import os
+import unittest
+from unittest import mock
+
+from screen import Screen
+
+
+class ScreenTest(unittest.TestCase):
+    def setUp(self):
+        size = mock.patch('shutil.get_terminal_size', return_value=os.terminal_size((80, 24)))
+        size.start()
+        self.addCleanup(size.stop)
+        self.out = io.StringIO()
+        self.screen = Screen(self.out)
+        self.screen.clear()
+
+    def test_frame_taller_than_terminal_is_written_once(self):
+        for i in range(10):
+            self.screen.write(f"<line {i}>\n")
+        self.screen.flush()
+        for i in range(10, 30):
+            self.screen.write(f"<line {i}>\n")
+        self.screen.flush()
+        shown = self.out.getvalue().rsplit('\x1b[2J', 1)[1]
+        for i in range(30):
+            self.assertEqual(shown.count(f"<line {i}>"), 1)
+        self.assertFalse(self.screen.active)
+
+
+if __name__ == "__main__":
+    unittest.main()
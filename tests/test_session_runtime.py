@@ -0,0 +1,104 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from animation import frames
+from session_runtime import SessionRuntime
+from storage import JsonTaskStore
+from task import TaskManager
+from timer import Timer
+
+
+class FakeTimer:
+    """Timer whose phases end at once, after pressing the scripted keys."""
+
+    def __init__(self):
+        self.keys = []
+        self.runtime = None
+        self.elapsed = 0
+        self.started_at = datetime.now()
+        self.remaining = 0
+
+    async def run_async(self, session_type, on_tick=None):
+        for key in self.keys:
+            self.runtime.handle_key(key)
+        self.keys = []
+
+
+class Counter:
+    def __init__(self):
+        self.tasks_completed = 0
+        self.sessions = []
+
+    def update_tasks_completed(self, count=1, username=None):
+        self.tasks_completed += count
+
+    def record_task_completed(self, count=1, username=None):
+        self.tasks_completed += count
+
+    def update_user_stats(self, session_type, duration, username=None):
+        self.sessions.append((session_type, duration))
+
+    def record_session(self, *args, **kwargs):
+        pass
+
+
+class SessionRuntimeTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        ui = mock.Mock()
+        self.task_manager = TaskManager(None, JsonTaskStore(), ui=ui)
+        self.user_data, self.stats = Counter(), Counter()
+        self.app = mock.Mock(timer=FakeTimer(), task_manager=self.task_manager, ui=ui,
+                             user_data=self.user_data, stats=self.stats, current_user='gardener')
+        self.runtime = SessionRuntime(self.app)
+        self.app.timer.runtime = self.runtime
+        self.runtime._start_input = lambda: (lambda: None)
+
+    def tearDown(self):
+        self.runtime.close()
+        self.task_manager.close()
+        self.task_manager.store.close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_completion_is_counted_once(self):
+        task = self.task_manager.add_task('gardener', "Water the roses", notify=False)
+        active_tasks = self.task_manager.get_active_tasks('gardener')
+        self.app.timer.keys = ['1']
+        self.runtime.run_phase('WORK', active_tasks, task)
+        self.assertEqual(self.runtime.active_tasks, [])
+        # Completing the same task again, e.g. from a stale list, counts nothing
+        self.app.timer.keys = ['1']
+        self.runtime.run_phase('SHORT BREAK', active_tasks)
+        self.assertTrue(self.task_manager.store.find('gardener', task['id'])['completed'])
+        self.assertEqual(self.user_data.tasks_completed, 1)
+        self.assertEqual(self.stats.tasks_completed, 1)
+
+    def test_stopped_phase_credits_the_time_it_ran(self):
+        self.app.timer.elapsed = 90
+        self.runtime.run_phase('WORK', [])
+        self.assertEqual(self.user_data.sessions, [('WORK', 1.5)])
+
+
+class TimerTest(unittest.TestCase):
+    def test_phase_length_comes_from_the_config(self):
+        config = mock.Mock(config={'work_duration': 0.001, 'short_break_duration': 5,
+                                   'long_break_duration': 15, 'progress_bar_width': 10,
+                                   'progress_refresh_rate': 4})
+        timer = Timer(config)
+        self.addCleanup(frames.set_enabled, frames.enabled)
+        frames.set_enabled(False)
+        with mock.patch('builtins.print'):
+            asyncio.run(timer.run_async('WORK', on_tick=lambda: None))
+        self.assertAlmostEqual(timer.session_duration, 0.06)
+        self.assertFalse(timer.is_running)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+from prefix_index import PrefixSumIndex
+from stats import Statistics
+from storage import JsonSessionLog, SqliteDatabase, SqliteSessionLog, SqliteStatsStore
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class StatisticsTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.databases = [SqliteDatabase('prodomo.db'), SqliteDatabase('prodomo.db')]
+
+    def tearDown(self):
+        for db in self.databases:
+            db.close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def statistics(self, db):
+        stats = Statistics(SqliteStatsStore(db), SqliteSessionLog(db), ui=mock.Mock())
+        stats.set_user('gardener')
+        return stats
+
+    def test_sessions_saved_elsewhere_are_counted(self):
+        ours, theirs = (self.statistics(db) for db in self.databases)
+        today = date.today()
+        ours.record_session('work', 1500)
+        ours.record_session('work', 600, start=datetime.now() - timedelta(days=3))
+        self.assertEqual(ours.range_totals(today, today)['sessions'], 1)
+        theirs.record_session('work', 300)
+        theirs.record_task_completed()
+        self.assertEqual(ours.range_totals(today - timedelta(days=7), today),
+                         {'sessions': 3, 'time': 40.0, 'tasks_completed': 1})
+
+    def test_rebuild_keeps_task_completions_of_archived_days(self):
+        stats = self.statistics(self.databases[0])
+        long_ago = datetime.now() - timedelta(days=120)
+        stats.record_session('work', 1500, start=long_ago)
+        with mock.patch('stats.datetime', wraps=datetime) as clock:
+            clock.now.return_value = long_ago
+            stats.record_task_completed(2)
+        stats.apply_retention()
+        stats.rebuild()
+        expected = {'sessions': 1, 'time': 25.0, 'tasks_completed': 2}
+        self.assertEqual(dict(stats.archive.monthly('gardener'))[long_ago.strftime('%Y-%m')],
+                         expected)
+        self.assertEqual(stats.range_totals(long_ago.date(), long_ago.date()), expected)
+
+    def test_index_saved_as_one_document_is_migrated(self):
+        db = self.databases[0]
+        index = PrefixSumIndex()
+        index.add(date(2026, 1, 1), sessions=2, time=50)
+        index.add(date(2026, 1, 3), sessions=1, time=25)
+        store = SqliteStatsStore(db)
+        store.put_extra('gardener', 'prefix_index', index.to_json())
+        loaded = store.load_prefix_index('gardener')
+        self.assertEqual(loaded.to_json(), index.to_json())
+        self.assertIsNone(store.get_extra('gardener', 'prefix_index'))
+        self.assertEqual(store.load_prefix_index('gardener').to_json(), index.to_json())
+
+    def report(self, display):
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as output:
+            display()
+        return output.getvalue().splitlines()
+
+    @unittest.skipUnless(numpy, "the reports need NumPy")
+    def test_reports_cover_recent_sessions_up_to_today(self):
+        stats = self.statistics(self.databases[0])
+        now = datetime.now()
+        stats.record_session('work', 1500, start=now - timedelta(days=200))
+        stats.record_session('work', 3000, start=now.replace(hour=9) - timedelta(days=5))
+        stats.record_session('short_break', 300, start=now - timedelta(days=5))
+        self.assertEqual(len(stats._session_frame()), 1)
+        lines = self.report(stats._display_hourly_focus)
+        self.assertIn("     09:00 " + "█" * 30 + " 50 min", lines)
+        lines = self.report(stats._display_focus_trend)
+        self.assertTrue(lines[-1].strip().startswith(date.today().isoformat()))
+        self.assertEqual(lines[-1].split()[-2:], ["7", "min"])  # 50 minutes over 7 days
+
+
+class SessionLogTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.db = SqliteDatabase('prodomo.db')
+
+    def tearDown(self):
+        self.db.close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def check_since(self, log):
+        for user, start in (('gardener', '2026-01-10T09:00:00'),
+                            ('gardener', '2026-03-01T09:00:00'),
+                            ('weeder', '2026-03-02T09:00:00')):
+            log.append({'user': user, 'type': 'work', 'start': start, 'duration': 1500,
+                        'task': None})
+        self.assertEqual([event['start'] for event in log.events('gardener', since='2026-02-01')],
+                         ['2026-03-01T09:00:00'])
+        self.assertEqual(len(list(log.events(since='2026-03-01T09:00:00'))), 2)
+        self.assertEqual(len(list(log.events())), 3)
+        log.close()
+
+    def test_json_log_skips_old_lines_without_decoding_them(self):
+        with mock.patch('storage.json.loads', wraps=json.loads) as loads:
+            self.check_since(JsonSessionLog())
+        self.assertEqual(loads.call_count, 2 + 2 + 3)
+
+    def test_sqlite_log(self):
+        self.check_since(SqliteSessionLog(self.db))
+
+
+if __name__ == "__main__":
+    unittest.main()
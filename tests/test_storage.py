@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import unittest
+
+from storage import JsonTaskStore, JsonUserStore
+
+
+def task(task_id, name, completed=False):
+    return {'id': task_id, 'name': name, 'completed': completed,
+            'created_at': '2026-03-01T09:00:00', 'completed_at': None}
+
+
+class ShardSplitTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def write(self, path, data):
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+    def test_legacy_tasks_are_split_into_lazy_shards(self):
+        self.write('tasks.json', {'gardener': [task(1, "Rake the leaves"), task(2, "Mow the lawn")],
+                                  'weeder/2': [task(1, "Pull the thistles")]})
+        # A record the legacy journal had not compacted yet
+        with open('tasks.journal', 'w') as f:
+            f.write(json.dumps({'op': 'complete', 'user': 'gardener', 'id': 2,
+                                'at': '2026-03-02T09:00:00'}) + "\n")
+        store = JsonTaskStore()
+        self.addCleanup(store.close)
+        self.assertEqual(sorted(os.listdir(os.path.join('data', 'tasks'))),
+                         ['gardener.json', 'weeder%2F2.json'])
+        self.assertEqual(store.shards, {})
+        self.assertEqual([t['name'] for t in store.active_tasks('gardener')], ["Rake the leaves"])
+        self.assertEqual([t['name'] for t in store.completed_tasks('gardener')], ["Mow the lawn"])
+        self.assertEqual(list(store.shards), ['gardener'])
+        self.assertEqual([t['name'] for t in store.user_tasks('weeder/2')], ["Pull the thistles"])
+        self.assertEqual(sorted(store.all_tasks()), ['gardener', 'weeder/2'])
+
+    def test_a_change_only_writes_its_users_shard(self):
+        self.write('tasks.json', {'gardener': [task(1, "Rake the leaves")],
+                                  'weeder': [task(1, "Pull the thistles")]})
+        store = JsonTaskStore(journaled=False)
+        self.addCleanup(store.close)
+        weeder_shard = os.path.join('data', 'tasks', 'weeder.json')
+        before = os.stat(weeder_shard).st_mtime_ns
+        store.complete('gardener', 1, '2026-03-02T09:00:00')
+        self.assertEqual(os.stat(weeder_shard).st_mtime_ns, before)
+        with open(os.path.join('data', 'tasks', 'gardener.json')) as f:
+            self.assertTrue(json.load(f)['tasks'][0]['completed'])
+
+    def test_legacy_file_is_only_split_once(self):
+        self.write('tasks.json', {'gardener': [task(1, "Rake the leaves")]})
+        JsonTaskStore().close()
+        self.write('tasks.json', {'gardener': [], 'weeder': [task(1, "Pull the thistles")]})
+        store = JsonTaskStore()
+        self.addCleanup(store.close)
+        self.assertEqual(sorted(store.all_tasks()), ['gardener'])
+        self.assertEqual(len(store.user_tasks('gardener')), 1)
+
+    def test_legacy_profiles_are_split(self):
+        self.write('user_data.json', {'gardener': {'total_work_time': 50},
+                                      'weeder': {'total_work_time': 25}})
+        store = JsonUserStore()
+        self.addCleanup(store.close)
+        self.assertEqual(sorted(os.listdir(os.path.join('data', 'users'))),
+                         ['gardener.json', 'weeder.json'])
+        self.assertEqual(store.get('weeder'), {'total_work_time': 25})
+        self.assertEqual(list(store.user_data), ['weeder'])
+        self.assertIsNone(store.get('nobody'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from planner import TaskPlanner
+from storage import JsonTaskStore, SqliteDatabase, SqliteTaskStore
+from task import TaskManager
+
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.db = SqliteDatabase('prodomo.db')
+
+    def tearDown(self):
+        self.db.close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def check_archive(self, store):
+        task_manager = TaskManager(None, store, archive_days=7, ui=mock.Mock())
+        long_ago = (datetime.now() - timedelta(days=30)).isoformat()
+        for name in ("Prune the hedge", "Rake the leaves", "Mow the lawn"):
+            task = task_manager.add_task('gardener', name, notify=False)
+            store.complete('gardener', task['id'], long_ago)
+        # A pass that stopped after writing the archive
+        task_manager.archive.append('gardener', store.completed_tasks('gardener'))
+        with mock.patch.object(store, 'delete', side_effect=AssertionError):
+            self.assertEqual(task_manager.archive_completed('gardener'), 3)
+        self.assertEqual(store.user_tasks('gardener'), [])
+        history = task_manager.get_task_history('gardener')
+        self.assertEqual(sorted(task['name'] for task in history),
+                         ["Mow the lawn", "Prune the hedge", "Rake the leaves"])
+        task_manager.close()
+
+    def test_json_archive(self):
+        store = JsonTaskStore()
+        self.check_archive(store)
+        store.close()
+
+    def test_sqlite_archive(self):
+        self.check_archive(SqliteTaskStore(self.db))
+
+
+class PlannerTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.databases = [SqliteDatabase('prodomo.db'), SqliteDatabase('prodomo.db')]
+
+    def tearDown(self):
+        for db in self.databases:
+            db.close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def check_plan(self, ours, theirs):
+        ours.add_task('gardener', "Rake the leaves", notify=False)
+        self.assertEqual(ours.next_task('gardener')['name'], "Rake the leaves")
+        # Added by another process, e.g. through the API
+        theirs.add_task('gardener', "Repot the fern", notify=False, priority=1)
+        self.assertEqual(ours.next_task('gardener')['name'], "Repot the fern")
+        self.assertEqual([task['name'] for task in ours.planned_tasks('gardener', 3)],
+                         ["Repot the fern", "Rake the leaves"])
+        for task_manager in (ours, theirs):
+            task_manager.close()
+
+    def test_json_plan(self):
+        stores = [JsonTaskStore(), JsonTaskStore()]
+        self.check_plan(*(TaskManager(None, store, ui=mock.Mock()) for store in stores))
+        for store in stores:
+            store.close()
+
+    def test_json_plan_resyncs_only_after_other_processes_write(self):
+        stores = [JsonTaskStore(), JsonTaskStore()]
+        ours, theirs = (TaskManager(None, store, ui=mock.Mock()) for store in stores)
+        with mock.patch.object(TaskPlanner, 'sync', autospec=True,
+                               side_effect=TaskPlanner.sync) as sync:
+            first = ours.add_task('gardener', "Rake the leaves", notify=False)
+            ours.next_task('gardener')
+            second = ours.add_task('gardener', "Prune the hedge", notify=False)
+            ours.update_plan('gardener', second['id'], priority=1)
+            ours.record_pomodoro('gardener', second['id'])
+            ours.complete_task('gardener', second['id'], notify=False)
+            ours.delete_task('gardener', first['id'], notify=False)
+            ours.import_tasks('gardener', [(1, {'name': "Mow the lawn"})])
+            self.assertEqual([task['name'] for task in ours.planned_tasks('gardener', 3)],
+                             ["Mow the lawn"])
+            self.assertEqual(sync.call_count, 0)
+            theirs.add_task('gardener', "Repot the fern", notify=False)
+            self.assertEqual(len(ours.planned_tasks('gardener', 3)), 2)
+            ours.next_task('gardener')
+            self.assertEqual(sync.call_count, 1)
+        for task_manager in (ours, theirs):
+            task_manager.close()
+        for store in stores:
+            store.close()
+
+    def test_sqlite_plan(self):
+        self.check_plan(*(TaskManager(None, SqliteTaskStore(db), ui=mock.Mock())
+                          for db in self.databases))
+
+
+if __name__ == "__main__":
+    unittest.main()
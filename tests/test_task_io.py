@@ -0,0 +1,113 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from storage import JsonTaskStore
+from task import TaskManager
+from task_io import dedupe_key, detect_format, parse_task, read_rows, write_tasks
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class DedupeKeyTest(unittest.TestCase):
+    def test_names_differing_in_case_and_spacing_are_duplicates(self):
+        self.assertEqual(dedupe_key("Rake the  leaves"), dedupe_key(" rake THE leaves"))
+        self.assertNotEqual(dedupe_key("Rake the leaves"), dedupe_key("Rake the lawn"))
+
+    def test_key_is_the_same_in_every_process(self):
+        code = "from task_io import dedupe_key; print(dedupe_key('Rake the leaves').hex())"
+        keys = {
+            subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True,
+                           check=True, env={**os.environ, 'PYTHONHASHSEED': seed}).stdout.strip()
+            for seed in ('1', '2')
+        }
+        self.assertEqual(keys, {dedupe_key("Rake the leaves").hex()})
+
+
+class ParseTaskTest(unittest.TestCase):
+    now = '2026-03-01T09:00:00'
+
+    def test_defaults_and_conversions(self):
+        task = parse_task({'name': "  Rake the leaves ", 'completed': 'yes', 'priority': '1',
+                           'estimate': '3', 'due': '2026-03-05', 'pomodoros': '2'}, self.now)
+        self.assertEqual(task, {'name': "Rake the leaves", 'completed': True,
+                                'created_at': self.now, 'completed_at': self.now,
+                                'priority': 1, 'estimate': 3, 'due': '2026-03-05',
+                                'pomodoros': 2})
+        task = parse_task({'name': "Mow the lawn", 'completed': '', 'completed_at': self.now},
+                          self.now)
+        self.assertEqual((task['completed'], task['completed_at'], task['pomodoros']),
+                         (False, None, 0))
+
+    def test_invalid_rows(self):
+        for row, error in ((None, "not valid JSON"), ([], "not a JSON object"),
+                           ({'name': " "}, "missing 'name'"),
+                           ({'name': "x" * 501}, "longer than 500"),
+                           ({'name': "Fern", 'completed': 'maybe'}, "'completed'"),
+                           ({'name': "Fern", 'created_at': 'March'}, "'created_at'"),
+                           ({'name': "Fern", 'pomodoros': '-1'}, "'pomodoros'")):
+            with self.assertRaisesRegex(ValueError, error):
+                parse_task(row, self.now)
+
+
+class ImportExportTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.store = JsonTaskStore()
+        self.task_manager = TaskManager(None, self.store, ui=mock.Mock())
+
+    def tearDown(self):
+        self.task_manager.close()
+        self.store.close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_read_rows(self):
+        self.assertEqual(detect_format('tasks.CSV'), 'csv')
+        self.assertEqual(detect_format('tasks.txt'), 'jsonl')
+        rows = list(read_rows(io.StringIO('{"name": "Fern"}\n\n{"name": \n'), 'jsonl'))
+        self.assertEqual(rows, [(1, {'name': "Fern"}), (3, None)])
+        rows = list(read_rows(io.StringIO('name,completed\nFern,yes\nHedge,\n'), 'csv'))
+        self.assertEqual(rows, [(2, {'name': "Fern", 'completed': 'yes'}),
+                                (3, {'name': "Hedge", 'completed': ''})])
+
+    def test_import_reports_duplicates_and_invalid_rows(self):
+        self.task_manager.add_task('gardener', "Rake the leaves", notify=False)
+        lines = ['{"name": "Mow the lawn", "priority": 1}', '{"name": "rake  the LEAVES"}',
+                 '{"completed": true}', '{"name": "Repot the fern", "completed": true}',
+                 'not json', '{"name": "Mow the lawn"}']
+        report = self.task_manager.import_tasks(
+            'gardener', read_rows(io.StringIO("\n".join(lines)), 'jsonl'),
+            chunk_size=1, max_errors=1)
+        self.assertEqual({key: report[key] for key in
+                          ('rows', 'imported', 'duplicates', 'invalid', 'errors')},
+                         {'rows': 6, 'imported': 2, 'duplicates': 2, 'invalid': 2,
+                          'errors': [(3, "missing 'name'")]})
+        self.assertEqual([task['id'] for task in self.store.user_tasks('gardener')], [1, 2, 3])
+        self.assertEqual(self.task_manager.next_task('gardener')['name'], "Mow the lawn")
+
+    def test_export_round_trips(self):
+        for name in ("Rake the leaves", "Repot the fern"):
+            self.task_manager.add_task('gardener', name, notify=False, estimate=2)
+        self.task_manager.complete_task('gardener', 2, notify=False)
+        for fmt in ('jsonl', 'csv'):
+            stream = io.StringIO()
+            self.assertEqual(write_tasks(self.task_manager.export_tasks('gardener'), stream, fmt),
+                             2)
+            stream.seek(0)
+            username = 'weeder-' + fmt
+            report = self.task_manager.import_tasks(username, read_rows(stream, fmt))
+            self.assertEqual((report['imported'], report['invalid']), (2, 0))
+            exported = [{**task, 'id': None} for task in self.store.user_tasks('gardener')]
+            imported = [{**task, 'id': None} for task in self.store.user_tasks(username)]
+            self.assertEqual(imported, exported)
+
+
+if __name__ == "__main__":
+    unittest.main()
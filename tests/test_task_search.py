@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from storage import JsonTaskStore
+from task import TaskManager
+from task_search import InvertedIndex, edit_distance, tokenize
+
+
+class EditDistanceTest(unittest.TestCase):
+    def test_distance(self):
+        self.assertEqual(edit_distance("leaves", "leaves", 2), 0)
+        self.assertEqual(edit_distance("leavs", "leaves", 2), 1)
+        self.assertEqual(edit_distance("laeves", "leaves", 2), 1)  # transposition
+        self.assertEqual(edit_distance("lawn", "leaves", 2), 3)
+        self.assertEqual(edit_distance("fern", "fernery", 1), 2)
+
+
+class InvertedIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = InvertedIndex()
+        for task_id, name in enumerate(("Rake the leaves", "Water the rakeia", "Repot the fern",
+                                        "Mow the lawn"), 1):
+            self.index.apply({'op': 'add', 'id': task_id, 'words': tokenize(name)})
+
+    def test_exact_words_rank_before_prefixes(self):
+        self.assertEqual(self.index.search("rake"), [1, 2])
+        self.assertEqual(self.index.search("rak"), [1, 2])
+        self.assertEqual(self.index.search("rakeia leaves"), [1, 2])
+        self.assertEqual(self.index.search("the lawn"), [4, 1, 2, 3])
+
+    def test_misspelled_words_match_fuzzily(self):
+        self.assertEqual(self.index.search("leavs"), [1])
+        self.assertEqual(self.index.search("frne"), [])  # Two typos in a short word
+
+    def test_removed_tasks_are_not_found(self):
+        self.index.apply({'op': 'delete', 'id': 1})
+        self.assertEqual(self.index.search("leaves"), [])
+        self.assertNotIn("leaves", self.index.vocabulary)
+        copy = InvertedIndex.from_json(self.index.to_json())
+        self.assertEqual(copy.search("rak"), [2])
+
+
+class TaskManagerSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def task_manager(self):
+        store = JsonTaskStore()
+        self.addCleanup(store.close)
+        task_manager = TaskManager(None, store, ui=mock.Mock())
+        self.addCleanup(task_manager.close)
+        return task_manager
+
+    def names(self, tasks):
+        return [task['name'] for task in tasks]
+
+    def test_search_follows_task_changes(self):
+        task_manager = self.task_manager()
+        rake = task_manager.add_task('gardener', "Rake the leaves", notify=False)
+        fern = task_manager.add_task('gardener', "Repot the fern", notify=False)
+        task_manager.add_task('gardener', "Mow the lawn", notify=False)
+        self.assertEqual(self.names(task_manager.search_tasks('gardener', "rep")),
+                         ["Repot the fern"])
+        self.assertEqual(self.names(task_manager.search_tasks('gardener', "leavs")),
+                         ["Rake the leaves"])
+        task_manager.complete_task('gardener', rake['id'], notify=False)
+        self.assertEqual(task_manager.search_tasks('gardener', "leaves", active_only=True), [])
+        task_manager.delete_task('gardener', fern['id'], notify=False)
+        self.assertEqual(task_manager.search_tasks('gardener', "fern"), [])
+        self.assertEqual(len(task_manager.search_tasks('gardener', "the", limit=1)), 1)
+
+    def test_index_is_saved_and_built_for_existing_tasks(self):
+        store = JsonTaskStore()
+        store.add('gardener', {'id': 1, 'name': "Prune the hedge", 'completed': False,
+                               'created_at': '2026-03-01T09:00:00', 'completed_at': None})
+        store.close()
+        task_manager = self.task_manager()
+        self.assertEqual(self.names(task_manager.search_tasks('gardener', "hedge")),
+                         ["Prune the hedge"])
+        task_manager.close()
+        task_manager = self.task_manager()
+        with mock.patch.object(task_manager.store, 'user_tasks', side_effect=AssertionError):
+            self.assertEqual(self.names(task_manager.search_tasks('gardener', "prun")),
+                             ["Prune the hedge"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+import io
+import unittest
+from unittest import mock
+
+from keys import SESSION_KEYS
+from ui import UI
+
+
+class HelpTest(unittest.TestCase):
+    def test_help_lists_the_session_keys(self):
+        ui = UI()
+        with mock.patch.object(ui, 'display_header'), mock.patch('builtins.input'), \
+                mock.patch('sys.stdout', new_callable=io.StringIO) as output:
+            ui.display_help()
+        text = output.getvalue()
+        for key, (_, label) in SESSION_KEYS.items():
+            self.assertIn(f"{key}{ui.colors['reset']} - {label.capitalize()}\n", text)
+        self.assertNotIn("Toggle task completion", text)
+        self.assertNotIn("Complete task with ID", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from storage import JsonUserStore
+from user_data import UserData
+from writebehind import WriteBehind
+
+
+class WriteBehindTest(unittest.TestCase):
+    def test_saves_of_a_pending_key_are_coalesced(self):
+        write = mock.Mock()
+        writer = WriteBehind(write, delay=60)
+        for key in ('gardener', 'gardener', 'weeder', 'gardener'):
+            writer.mark_dirty(key)
+        self.assertTrue(writer.pending)
+        write.assert_not_called()
+        writer.flush()
+        self.assertEqual(sorted(call.args[0] for call in write.call_args_list),
+                         ['gardener', 'weeder'])
+        self.assertEqual((writer.writes, writer.writes_avoided), (2, 2))
+        self.assertFalse(writer.pending)
+        writer.flush()
+        self.assertEqual(write.call_count, 2)
+
+    def test_pending_writes_run_after_the_delay(self):
+        written = threading.Event()
+        writer = WriteBehind(lambda key: written.set(), delay=0.01)
+        writer.mark_dirty('gardener')
+        self.assertTrue(written.wait(5))
+
+
+class UserDataSaveTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def user_data(self):
+        store = JsonUserStore()
+        self.addCleanup(store.close)
+        user_data = UserData(store, save_delay=60)
+        self.addCleanup(user_data.flush)
+        return user_data
+
+    def test_updates_are_written_once_at_the_flush_point(self):
+        user_data = self.user_data()
+        user_data.get_or_create_user('gardener')
+        with mock.patch.object(user_data.store, 'put', wraps=user_data.store.put) as put:
+            for _ in range(3):
+                user_data.update_user_stats('WORK', 25)
+            user_data.update_tasks_completed(2)
+            put.assert_not_called()
+            user_data.flush()
+            self.assertEqual(put.call_count, 1)
+        self.assertEqual(user_data.writes_avoided, 4)
+        store = JsonUserStore()
+        profile = store.get('gardener')
+        store.close()
+        self.assertEqual((profile['total_work_time'], profile['tasks_completed']), (75, 2))
+
+    def test_refresh_writes_pending_changes_before_reloading(self):
+        ours, theirs = self.user_data(), self.user_data()
+        ours.get_or_create_user('gardener')
+        ours.flush()
+        theirs.update_tasks_completed(3, username='gardener')
+        theirs.flush()
+        ours.update_user_stats('WORK', 25)
+        ours.refresh('gardener')
+        profile = ours.get_user('gardener')
+        self.assertEqual((profile['total_work_time'], profile['tasks_completed']), (25, 3))
+        self.assertFalse(ours.writer.pending)
+
+
+if __name__ == "__main__":
+    unittest.main()
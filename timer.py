@@ -1,19 +1,30 @@
+import math
 import time
 import threading
 import os
 from colorama import Fore, Style
 import sys
+from datetime import datetime
 from config import Config
+from animation import ANIMATIONS, frames
+from progress import ProgressBar
 
 class Timer:
-    def __init__(self):
-        self.config = Config()
-        self.work_duration = self.config.config['work_duration'] * 60  # Convert to seconds
-        self.short_break_duration = self.config.config['short_break_duration'] * 60
-        self.long_break_duration = self.config.config['long_break_duration'] * 60
+    def __init__(self, config=None, quiet=False):
+        self.config = config if config is not None else Config()
+        self.quiet = quiet  # No messages, e.g. in the daemon where nobody reads them
         self.remaining_time = 0
+        self.session_duration = 0
+        self.started_at = None
         self.is_running = False
         self.is_paused = False
+        # The countdown is driven by a time.monotonic() deadline; pausing
+        # remembers when it started so resume can shift the deadline exactly.
+        self._deadline = 0.0
+        self._paused_at = None
+        self._lock = threading.Lock()
+        self._wake = None  # asyncio.Event while run_async is active
+        self._progress = None  # ProgressBar of the current session
         self.current_session = None
         self.nature_symbols = {
             'work': '🌱',
@@ -22,77 +33,101 @@ class Timer:
             'growing': '🌱',
             'resting': '💧'
         }
-        self.animations = {
-            'growing': ['🌱', '🌿', '🌳', '🌲'],
-            'working': ['🌱', '🌿', '🌳', '🌲'],
-            'resting': ['💧', '💦', '🌊', '💧'],
-            'recharging': ['☀️', '🌤️', '⛅', '☀️']
-        }
+        self.animations = ANIMATIONS
 
     def _animate(self, animation_type, duration=0.5):
-        """Display an animated sequence."""
-        frames = self.animations[animation_type]
-        for _ in range(2):  # Show animation twice
-            for frame in frames:
-                print(f"\r{frame}", end="", flush=True)
-                time.sleep(duration / len(frames))
-        print("\r", end="", flush=True)
-
-    def start_work_session(self):
-        """Start a work session."""
-        self.work_duration = self.config.config['work_duration'] * 60  # Update from config
-        self._start_timer(self.work_duration, "WORK")
-        self._animate('working')
-
-    def start_short_break(self):
-        """Start a short break."""
-        self.short_break_duration = self.config.config['short_break_duration'] * 60  # Update from config
-        self._start_timer(self.short_break_duration, "SHORT BREAK")
-        self._animate('resting')
-
-    def start_long_break(self):
-        """Start a long break."""
-        self.long_break_duration = self.config.config['long_break_duration'] * 60  # Update from config
-        self._start_timer(self.long_break_duration, "LONG BREAK")
-        self._animate('recharging')
-
-    def _start_timer(self, duration, session_type):
-        """Start the timer with the specified duration and session type."""
+        """Queue an animated sequence without blocking the countdown."""
+        frames.animate(animation_type, duration)
+
+    def _begin(self, duration, session_type):
+        """Reset the timer state and set the deadline for a new session."""
         self.remaining_time = duration
+        self.session_duration = duration
+        self.started_at = datetime.now()
         self.current_session = session_type
         self.is_running = True
         self.is_paused = False
-        self._countdown()
-
-    def _countdown(self):
-        """Handle the countdown logic."""
-        while self.remaining_time > 0 and self.is_running:
-            if not self.is_paused:
-                self._display_time()
-                time.sleep(1)
-                self.remaining_time -= 1
-            else:
-                time.sleep(0.1)
-        
-        if self.remaining_time == 0:
+        self._paused_at = None
+        self._deadline = time.monotonic() + duration
+        symbol = self.nature_symbols['growing' if session_type == "WORK" else 'resting']
+        self._progress = ProgressBar(duration, self.config.config['progress_bar_width'], fill=symbol,
+                                     max_rate=self.config.config['progress_refresh_rate'])
+
+    @property
+    def remaining(self):
+        """Seconds left in the current session, with sub-second precision."""
+        with self._lock:
+            now = self._paused_at if self._paused_at is not None else time.monotonic()
+            return max(0.0, self._deadline - now)
+
+    @property
+    def elapsed(self):
+        """Seconds of the current session that have been counted down."""
+        return self.session_duration - self.remaining
+
+    def _until_next_tick(self):
+        """Seconds until the displayed remaining time changes."""
+        return max(0.0, self.remaining - (self.remaining_time - 1))
+
+    def _finish(self, render):
+        """Show the final tick and notify if the session ran to its end."""
+        if self.is_running and self.remaining <= 0:
+            self.remaining_time = 0
+            render()
+            self.is_running = False
             self._notify_completion()
 
+    async def run_async(self, session_type, on_tick=None):
+        """Run a session as a coroutine on the current event loop.
+
+        ``on_tick`` is called whenever the displayed time changes (default:
+        draw it directly). Between ticks the coroutine sleeps until the next
+        second boundary or until pause, resume or stop wakes it.
+        """
+        import asyncio  # Loaded with the first session rather than at startup
+        from session_runtime import PHASES
+        setting = PHASES[session_type][2]
+        render = on_tick or self._display_time
+        self._begin(self.config.config[setting] * 60, session_type)
+        self._wake = asyncio.Event()
+        try:
+            while self.is_running:
+                if self.is_paused:
+                    await self._wake.wait()
+                    self._wake.clear()
+                    continue
+                remaining = self.remaining
+                if remaining <= 0:
+                    break
+                self.remaining_time = math.ceil(remaining)
+                render()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self._until_next_tick())
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+            self._finish(render)
+        finally:
+            self._wake = None
+
+    def _wake_countdown(self):
+        """Wake the countdown if it is waiting for the next tick."""
+        if self._wake is not None:
+            self._wake.set()
+
     def _display_time(self):
         """Display the current time with a nature-themed progress bar."""
-        minutes = self.remaining_time // 60
-        seconds = self.remaining_time % 60
-        progress = 1 - (self.remaining_time / (self.work_duration if self.current_session == "WORK" else 
-                                             self.short_break_duration if self.current_session == "SHORT BREAK" else 
-                                             self.long_break_duration))
-        
-        symbol = self.nature_symbols['growing' if self.current_session == "WORK" else 'resting']
-        filled_length = int(30 * progress)
-        bar = symbol * filled_length + '░' * (30 - filled_length)
-        
-        print(f"\r[{bar}] {minutes:02d}:{seconds:02d}", end="", flush=True)
+        minutes, seconds = divmod(int(self.remaining_time), 60)
+        self._progress.update(self.session_duration - self.remaining_time, f"{minutes:02d}:{seconds:02d}")
+
+    def _say(self, message):
+        if not self.quiet:
+            print(message)
 
     def _notify_completion(self):
         """Display a completion message with nature-themed notification."""
+        if self.quiet:
+            return
         print("\n")
         if self.current_session == "WORK":
             print(f"{Fore.GREEN}✨ Focus session completed! Time to rest and recharge.{Style.RESET_ALL}")
@@ -105,16 +140,24 @@ class Timer:
     def pause(self):
         """Pause the timer."""
         if self.is_running and not self.is_paused:
+            with self._lock:
+                self._paused_at = time.monotonic()
             self.is_paused = True
-            print(f"\n{Fore.YELLOW}⏸️ Timer paused{Style.RESET_ALL}")
+            self._wake_countdown()
+            self._say(f"\n{Fore.YELLOW}⏸️ Timer paused{Style.RESET_ALL}")
 
     def resume(self):
         """Resume the timer."""
         if self.is_running and self.is_paused:
+            with self._lock:
+                self._deadline += time.monotonic() - self._paused_at
+                self._paused_at = None
             self.is_paused = False
-            print(f"\n{Fore.GREEN}▶️ Timer resumed{Style.RESET_ALL}")
+            self._wake_countdown()
+            self._say(f"\n{Fore.GREEN}▶️ Timer resumed{Style.RESET_ALL}")
 
     def stop(self):
         """Stop the timer."""
         self.is_running = False
-        print(f"\n{Fore.RED}⏹️ Timer stopped{Style.RESET_ALL}") 
\ No newline at end of file
+        self._wake_countdown()
+        self._say(f"\n{Fore.RED}⏹️ Timer stopped{Style.RESET_ALL}") 
\ No newline at end of file
@@ -1,11 +1,15 @@
 import os
-import time
 from colorama import Fore, Style, init
-from art import text2art
+from animation import frames
+from keys import SESSION_KEYS
+from progress import ProgressBar
+from screen import Screen
 
 class UI:
     def __init__(self):
         init()
+        self._progress = None  # ProgressBar reused while the total stays the same
+        self.progress_bar_width = 30  # cells; Config sets the configured width
         self.colors = {
             'primary': Fore.CYAN,
             'secondary': Fore.YELLOW,
@@ -124,8 +128,27 @@ class UI:
             }
         }
 
+    def banner(self, text, font="block", cache_dir="data/cache"):
+        """Return ASCII art for ``text``, rendered once and then read from disk."""
+        cache_file = os.path.join(cache_dir, f"banner-{font}-{text}.txt")
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            pass
+        from art import text2art  # Slow to import; only needed on a cache miss
+        art = text2art(text, font=font)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                f.write(art)
+        except OSError:
+            pass  # A read-only directory only costs the cache
+        return art
+
     def get_user_input(self, prompt):
         """Get user input with a styled prompt."""
+        frames.wait()
         return input(f"{self.colors['primary']}{prompt}{self.colors['reset']}")
 
     def display_quote(self):
@@ -137,43 +160,47 @@ class UI:
     def display_secret(self, level):
         """Display a secret message when reaching certain levels."""
         if level in self.secrets:
-            print(f"\n{self.colors['info']}{self.symbols['secret']} {self.secrets[level]}{self.colors['reset']}\n")
-            time.sleep(2)
+            frames.reveal([f"\n{self.colors['info']}{self.symbols['secret']} {self.secrets[level]}{self.colors['reset']}\n"])
 
     def display_story_progress(self, level, experience):
         """Display story progress with rich narrative."""
         if level in self.story_chapters:
             chapter = self.story_chapters[level]
-            print(f"\n{self.colors['primary']}{'=' * 50}")
-            print(f"{self.symbols['story']} Chapter {level}: {chapter['title']}")
-            print(f"{'=' * 50}{self.colors['reset']}")
-            print(f"\n{self.colors['info']}{chapter['description']}{self.colors['reset']}")
-            print(f"\n{self.colors['success']}{chapter['milestone']}{self.colors['reset']}")
-            print(f"{self.colors['secondary']}{chapter['reward']}{self.colors['reset']}")
-            time.sleep(2)
+            frames.print(f"\n{self.colors['primary']}{'=' * 50}")
+            frames.print(f"{self.symbols['story']} Chapter {level}: {chapter['title']}")
+            frames.print(f"{'=' * 50}{self.colors['reset']}")
+            frames.reveal([
+                f"\n{self.colors['info']}{chapter['description']}{self.colors['reset']}",
+                f"\n{self.colors['success']}{chapter['milestone']}{self.colors['reset']}",
+                f"{self.colors['secondary']}{chapter['reward']}{self.colors['reset']}"
+            ])
 
     def display_achievement_story(self, achievement_id):
         """Display achievement story with rich narrative."""
         if achievement_id in self.achievement_stories:
             achievement = self.achievement_stories[achievement_id]
-            print(f"\n{self.colors['primary']}{'=' * 50}")
-            print(f"{self.symbols['achievement']} Achievement: {achievement['title']}")
-            print(f"{'=' * 50}{self.colors['reset']}")
-            print(f"\n{self.colors['info']}{achievement['story']}{self.colors['reset']}")
-            print(f"\n{self.colors['success']}{achievement['reward']}{self.colors['reset']}")
-            time.sleep(2)
+            frames.print(f"\n{self.colors['primary']}{'=' * 50}")
+            frames.print(f"{self.symbols['achievement']} Achievement: {achievement['title']}")
+            frames.print(f"{'=' * 50}{self.colors['reset']}")
+            frames.reveal([
+                f"\n{self.colors['info']}{achievement['story']}{self.colors['reset']}",
+                f"\n{self.colors['success']}{achievement['reward']}{self.colors['reset']}"
+            ])
 
     def display_level_up(self, new_level):
         """Display level up animation and story."""
-        print(f"\n{self.colors['primary']}{'=' * 50}")
-        print(f"{self.symbols['level_up']} LEVEL UP! {self.symbols['level_up']}")
-        print(f"{'=' * 50}{self.colors['reset']}")
+        frames.print(f"\n{self.colors['primary']}{'=' * 50}")
+        frames.print(f"{self.symbols['level_up']} LEVEL UP! {self.symbols['level_up']}")
+        frames.print(f"{'=' * 50}{self.colors['reset']}")
         self._animate('growing')
-        time.sleep(1)
 
     def clear_screen(self):
-        """Clear the terminal screen."""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        """Start a new screen; only what differs from the last one is redrawn."""
+        screen = Screen.install()
+        if screen is not None:
+            screen.clear()
+        elif os.name == 'nt':
+            os.system('cls')
 
     def display_header(self, title):
         """Display a minimalistic header."""
@@ -209,28 +236,34 @@ class UI:
         
         print(f"\n{self.colors['primary']}Active Tasks:")
         print(f"{'-' * 50}{self.colors['reset']}")
-        for task in tasks:
+        for position, task in enumerate(tasks, 1):
             status = "✓" if task['completed'] else " "
-            print(f"[{status}] {task['id']}. {task['name']}")
+            key = f"{position})" if position <= 3 else "  "  # Session keys 1-3 complete these
+            print(f"{key} [{status}] {task['id']}. {task['name']}")
         print(f"{self.colors['primary']}{'-' * 50}{self.colors['reset']}")
 
+    def display_focus(self, task):
+        """Display the task a work session is for."""
+        if task is None:
+            print(f"{self.colors['info']}No task planned; add tasks to focus on.{self.colors['reset']}")
+            return
+        progress = f"Pomodoro {task['pomodoros'] + 1} of {task['estimate']}"
+        due = f", due {task['due']}" if task['due'] else ""
+        print(f"{self.colors['primary']}🎯 Focus: {task['name']}{self.colors['reset']} ({progress}{due})")
+
     def display_help(self):
         """Display help information with minimalistic design."""
         self.display_header("HELP")
         print(f"{self.colors['info']}Session Commands:")
-        print(f"{self.colors['secondary']}p{self.colors['reset']} - Pause session")
-        print(f"{self.colors['secondary']}r{self.colors['reset']} - Resume session")
-        print(f"{self.colors['secondary']}s{self.colors['reset']} - Stop session")
-        print(f"{self.colors['secondary']}t{self.colors['reset']} - Toggle task completion")
-        print(f"{self.colors['secondary']}q{self.colors['reset']} - Quit to main menu")
-        print(f"\n{self.colors['info']}Task Management:")
-        print(f"{self.colors['secondary']}1-9{self.colors['reset']} - Complete task with ID")
+        for key, (_, label) in SESSION_KEYS.items():
+            print(f"{self.colors['secondary']}{key}{self.colors['reset']} - {label.capitalize()}")
         print(f"\n{self.colors['info']}Press Enter to continue...{self.colors['reset']}")
         input()
 
     def display_session_commands(self):
         """Display available commands during a session."""
-        print(f"\n{self.colors['info']}Commands: p(pause) r(resume) s(stop) t(tasks) q(quit){self.colors['reset']}")
+        commands = ' '.join(f"{key}({label})" for key, (_, label) in SESSION_KEYS.items())
+        print(f"\n{self.colors['info']}Commands: {commands}{self.colors['reset']}")
 
     def display_success(self, message):
         """Display a success message."""
@@ -242,23 +275,11 @@ class UI:
 
     def display_progress(self, progress, total):
         """Display a minimalistic progress bar."""
-        width = 30
-        filled = int(width * progress / total)
-        bar = '█' * filled + '░' * (width - filled)
-        print(f"\r[{bar}] {progress}/{total}", end="", flush=True)
+        if (self._progress is None or self._progress.total != total
+                or self._progress.width != self.progress_bar_width):
+            self._progress = ProgressBar(total, self.progress_bar_width)
+        self._progress.update(progress, f"{progress}/{total}")
 
     def _animate(self, animation_type, duration=0.5):
-        """Display an animated sequence."""
-        animations = {
-            'growing': ['🌱', '🌿', '🌳', '🌲'],
-            'working': ['🌱', '🌿', '🌳', '🌲'],
-            'resting': ['💧', '💦', '🌊', '💧'],
-            'recharging': ['☀️', '🌤️', '⛅', '☀️']
-        }
-        
-        frames = animations[animation_type]
-        for _ in range(2):  # Show animation twice
-            for frame in frames:
-                print(f"\r{frame}", end="", flush=True)
-                time.sleep(duration / len(frames))
-        print("\r", end="", flush=True) 
\ No newline at end of file
+        """Queue an animated sequence without blocking."""
+        frames.animate(animation_type, duration)
@@ -1,12 +1,21 @@
-import json
-import os
+import atexit
+import copy
+import threading
 from datetime import datetime
+from storage import JsonUserStore
+from writebehind import WriteBehind
 
 class UserData:
-    def __init__(self):
-        self.data_file = "user_data.json"
+    def __init__(self, store=None, save_delay=2.0):
+        self.store = store if store is not None else JsonUserStore()
         self.current_user = None
-        self.user_data = self._load_data()
+        # Profiles are fetched from the store the first time a user is touched.
+        self.user_data = {}
+        # Saves are coalesced and written on a background thread; the lock
+        # keeps that thread from saving a profile while it is being updated.
+        self._lock = threading.RLock()
+        self.writer = WriteBehind(self._write_user, delay=save_delay)
+        atexit.register(self.flush)
         self.achievements = {
             'first_session': {'name': 'First Step', 'description': 'Complete your first focus session', 'unlocked': False},
             'task_master': {'name': 'Task Master', 'description': 'Complete 10 tasks', 'unlocked': False},
@@ -17,23 +26,33 @@ class UserData:
             'productivity_guru': {'name': 'Productivity Guru', 'description': 'Reach level 20', 'unlocked': False}
         }
 
-    def _load_data(self):
-        """Load user data from JSON file."""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-        return {}
-
-    def _save_data(self):
-        """Save user data to JSON file."""
-        with open(self.data_file, 'w') as f:
-            json.dump(self.user_data, f, indent=4)
+    def _save_data(self, username=None):
+        """Schedule a user's data (default: the current user's) to be saved to the store."""
+        self.writer.mark_dirty(username or self.current_user)
+
+    def _write_user(self, username):
+        """Write one user's data to the store."""
+        with self._lock:
+            profile = copy.deepcopy(self.user_data[username])
+            stored = self.store.put(username, profile)
+            if stored is not profile:
+                # Another process saved this user too; keep the merged profile
+                self.user_data[username].clear()
+                self.user_data[username].update(stored)
 
     def get_or_create_user(self, username):
-        """Get existing user data or create new user."""
+        """Get existing user data or create new user, and make it the current user."""
+        user = self._load_user(username)
+        self.current_user = username
+        self._save_data()
+        return user
+
+    def _load_user(self, username):
+        """Return a user's profile, loading or creating it on first use."""
+        if username not in self.user_data:
+            profile = self.store.get(username)
+            if profile is not None:
+                self.user_data[username] = profile
         if username not in self.user_data:
             self.user_data[username] = {
                 'created_at': datetime.now().isoformat(),
@@ -62,45 +81,44 @@ class UserData:
             for field, default_value in required_fields.items():
                 if field not in user:
                     user[field] = default_value
-        
-        self.current_user = username
-        self._save_data()
         return self.user_data[username]
 
-    def update_user_stats(self, session_type, duration):
-        """Update user statistics after a session."""
-        if not self.current_user:
+    def update_user_stats(self, session_type, duration, username=None):
+        """Update a user's statistics (default: the current user's) after a session."""
+        username = username or self.current_user
+        if not username:
             return
 
-        user = self.user_data[self.current_user]
-        user['total_sessions'] += 1
-        current_date = datetime.now().date().isoformat()
+        with self._lock:
+            user = self._load_user(username)
+            user['total_sessions'] += 1
+            current_date = datetime.now().date().isoformat()
         
-        # Update streak
-        if user['last_session_date'] != current_date:
-            if user['last_session_date'] and (datetime.fromisoformat(current_date) - datetime.fromisoformat(user['last_session_date'])).days == 1:
-                user['streak'] += 1
-            else:
-                user['streak'] = 1
-            user['last_session_date'] = current_date
+            # Update streak
+            if user['last_session_date'] != current_date:
+                if user['last_session_date'] and (datetime.fromisoformat(current_date) - datetime.fromisoformat(user['last_session_date'])).days == 1:
+                    user['streak'] += 1
+                else:
+                    user['streak'] = 1
+                user['last_session_date'] = current_date
 
-        if session_type == "WORK":
-            user['total_work_time'] += duration
-            user['experience'] += 25
-        else:
-            user['total_break_time'] += duration
-            user['experience'] += 5
+            if session_type == "WORK":
+                user['total_work_time'] += duration
+                user['experience'] += 25
+            else:
+                user['total_break_time'] += duration
+                user['experience'] += 5
 
-        # Check for achievements
-        self._check_achievements(user)
+            # Check for achievements
+            self._check_achievements(user)
 
-        # Level up if experience threshold is reached
-        while user['experience'] >= user['level'] * 100:
-            user['level'] += 1
-            user['experience'] -= (user['level'] - 1) * 100
-            user['story_progress'] += 1
+            # Level up if experience threshold is reached
+            while user['experience'] >= user['level'] * 100:
+                user['level'] += 1
+                user['experience'] -= (user['level'] - 1) * 100
+                user['story_progress'] += 1
 
-        self._save_data()
+            self._save_data(username)
 
     def _check_achievements(self, user):
         """Check and unlock achievements."""
@@ -133,8 +151,49 @@ class UserData:
             return None
         return self.user_data[self.current_user]
 
-    def update_tasks_completed(self, count=1):
-        """Update the number of completed tasks."""
-        if self.current_user:
-            self.user_data[self.current_user]['tasks_completed'] += count
-            self._save_data() 
\ No newline at end of file
+    def get_user(self, username, create=False):
+        """Return a user's profile without making them current.
+
+        Unknown users give None unless ``create`` is set.
+        """
+        with self._lock:
+            if username in self.user_data or self.store.get(username) is not None:
+                return self._load_user(username)
+            if not create:
+                return None
+            user = self._load_user(username)
+            self._save_data(username)
+            return user
+
+    def refresh(self, username):
+        """Reload a user's profile to pick up what another process saved.
+
+        Changes made here are written first, so they are merged in rather
+        than lost.
+        """
+        # Outside the lock: the writer thread takes it to save a profile
+        self.flush()
+        with self._lock:
+            if username not in self.user_data:
+                return
+            stored = self.store.refresh(username)
+            if stored is not None and stored is not self.user_data[username]:
+                self.user_data[username].clear()
+                self.user_data[username].update(stored)
+
+    def update_tasks_completed(self, count=1, username=None):
+        """Update the number of completed tasks of a user (default: the current user)."""
+        username = username or self.current_user
+        if username:
+            with self._lock:
+                self._load_user(username)['tasks_completed'] += count
+                self._save_data(username)
+
+    def flush(self):
+        """Write any coalesced profile changes to the store now."""
+        self.writer.flush()
+
+    @property
+    def writes_avoided(self):
+        """Number of profile writes merged into a later one."""
+        return self.writer.writes_avoided 
\ No newline at end of file
@@ -0,0 +1,50 @@
+import threading
+
+
+class WriteBehind:
+    """Coalesce repeated saves into one delayed write on a background thread.
+
+    ``mark_dirty(key)`` schedules ``write(key)`` to run after ``delay``
+    seconds; further calls for a key that is already pending are merged
+    into that write and counted in ``writes_avoided``. ``flush()`` performs
+    the pending writes immediately.
+    """
+
+    def __init__(self, write, delay=2.0):
+        self.write = write
+        self.delay = delay
+        self.writes = 0
+        self.writes_avoided = 0
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+    def mark_dirty(self, key):
+        """Schedule a write for ``key``, merging it with a pending one."""
+        with self._lock:
+            if key in self._dirty:
+                self.writes_avoided += 1
+                return
+            self._dirty.add(key)
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write every pending key now."""
+        with self._flush_lock:
+            with self._lock:
+                keys, self._dirty = self._dirty, set()
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            for key in keys:
+                self.write(key)
+                self.writes += 1
+
+    @property
+    def pending(self):
+        """Return True if there are writes waiting to be flushed."""
+        return bool(self._dirty)